@@ -0,0 +1,266 @@
+"""
+Benchmark harness for the rocket simulation, runs headless.
+Uses the seeded scenarios, sweeps over rocket counts, and separately times the physics,
+draw call generation and drawing phases of every frame, with warmup and repeats.
+The dispatch phase only measures the Python overhead of calling the canvas methods for the draw calls
+(on a canvas that does nothing), the raster phase actually draws them: it performs them on the
+offscreen RasterCanvas and rasterizes the frame.
+Results are printed, and can be written as JSON or CSV. Compare mode flags regressions between two JSON result files.
+
+    python benchmark.py run --counts 100 1000 10000 --engines rockets fleet --json results.json
+    python benchmark.py compare old.json new.json --threshold 10
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import argparse
+import csv
+import json
+import math
+import platform
+import sys
+import time
+import scenarios
+
+PHASES = ["physics", "drawcalls", "dispatch", "raster"]
+
+
+class NullCanvas(object):
+    """headless stand-in for the Tk canvas: accepts the draw calls and only counts them, nothing is drawn"""
+    def __init__(self, width, height):
+        self.config = {"width": str(width), "height": str(height)}
+        self.items = 0
+
+    def __getitem__(self, option):
+        return self.config[option]
+
+    def _create(self, *args, **kwargs):
+        self.items += 1
+        return self.items
+
+    create_polygon = create_oval = create_rectangle = create_line = create_text = _create
+
+    def delete(self, *items):
+        pass
+
+
+class RocketsEngine(object):
+    """the original way: a list of Rocket objects, updated and drawn one by one"""
+    def __init__(self, rockets, cwidth, cheight):
+        self.rockets = rockets
+        self.cwidth, self.cheight = cwidth, cheight
+
+    def physics(self):
+        for rocket in self.rockets:
+            self.update_rocket(rocket)
+
+    def update_rocket(self, rocket):
+        rocket.update()
+        if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
+            rocket.velocity.flipx()
+        if not(0<rocket.position.y<self.cheight):
+            rocket.velocity.flipy()
+
+    def drawcalls(self):
+        return [call for rocket in self.rockets for call in rocket.draw_calls()]
+
+
+class CachedRocketsEngine(RocketsEngine):
+    """Rocket objects drawn through a drawcache.DrawCallCache"""
+    def __init__(self, rockets, cwidth, cheight):
+        from drawcache import DrawCallCache
+        RocketsEngine.__init__(self, rockets, cwidth, cheight)
+        self.cache = DrawCallCache.for_rockets(len(rockets))
+        for rocket in self.rockets:
+            rocket.draw_cache = self.cache
+
+
+class FleetEngine(object):
+    """the rockets in a NumPy RocketFleet, updated and drawn in batches"""
+    def __init__(self, rockets, cwidth, cheight):
+        from rocketfleet import RocketFleet
+        self.fleet = RocketFleet(cwidth, cheight, len(rockets))
+        for rocket in rockets:
+            self.fleet.append(rocket)
+
+    def physics(self):
+        self.fleet.step(bounce=True)
+
+    def drawcalls(self):
+        return self.fleet.draw_calls()
+
+
+class SleepingRocketsEngine(RocketsEngine):
+    """Rocket objects in a RocketGroup, landed rockets sleep (crashed ones keep bouncing, as in the other engines)"""
+    def __init__(self, rockets, cwidth, cheight):
+        from lifecycle import RocketGroup
+        RocketsEngine.__init__(self, rockets, cwidth, cheight)
+        self.group = RocketGroup(rockets, self.update_rocket, sleep_crashed=False)
+
+    def physics(self):
+        self.group.update()
+
+    def drawcalls(self):
+        return self.group.draw_calls()
+
+
+class SleepingFleetEngine(FleetEngine):
+    """RocketFleet with a FleetLifecycle, landed rockets sleep (crashed ones keep bouncing, as in the other engines)"""
+    def __init__(self, rockets, cwidth, cheight):
+        from lifecycle import FleetLifecycle
+        FleetEngine.__init__(self, rockets, cwidth, cheight)
+        self.lifecycle = FleetLifecycle(self.fleet, sleep_crashed=False)
+
+    def physics(self):
+        self.lifecycle.step(bounce=True)
+
+    def drawcalls(self):
+        return self.lifecycle.draw_calls()
+
+
+ENGINES = {
+    "rockets": RocketsEngine,
+    "fleet": FleetEngine,
+    "rockets-sleep": SleepingRocketsEngine,
+    "rockets-cached": CachedRocketsEngine,
+    "fleet-sleep": SleepingFleetEngine,
+}
+
+
+def perform_draw_calls(canvas, calls):
+    canvas.delete("all")
+    for c in calls:
+        getattr(canvas, c[0])(*c[1], **c[2])
+
+
+def statistics(samples):
+    samples = sorted(samples)
+    n = len(samples)
+    mean = sum(samples) / n
+    median = samples[n//2] if n % 2 else (samples[n//2-1] + samples[n//2]) / 2
+    stdev = math.sqrt(sum((s-mean)**2 for s in samples) / (n-1)) if n > 1 else 0.0
+    return {"mean_ms": mean*1000, "median_ms": median*1000, "stdev_ms": stdev*1000,
+            "min_ms": samples[0]*1000, "max_ms": samples[-1]*1000, "samples": n}
+
+
+def run_benchmark(engine_name, scenario_name, num_rockets, frames, repeats, warmup, seed, cwidth=1000, cheight=1000, raster=True):
+    phases = PHASES if raster else PHASES[:-1]
+    timings = {phase: [] for phase in phases}
+    for repeat in range(repeats):
+        rockets = scenarios.SCENARIOS[scenario_name](num_rockets, cwidth, cheight, seed)
+        engine = ENGINES[engine_name](rockets, cwidth, cheight)
+        canvas = NullCanvas(cwidth, cheight)
+        if raster:
+            from raster import RasterCanvas
+            raster_canvas = RasterCanvas(cwidth, cheight)
+        for frame in range(warmup + frames):
+            t0 = time.perf_counter()
+            engine.physics()
+            t1 = time.perf_counter()
+            calls = engine.drawcalls()
+            t2 = time.perf_counter()
+            perform_draw_calls(canvas, calls)
+            t3 = time.perf_counter()
+            if raster:
+                perform_draw_calls(raster_canvas, calls)
+                raster_canvas.render()
+            t4 = time.perf_counter()
+            if frame >= warmup:
+                timings["physics"].append(t1-t0)
+                timings["drawcalls"].append(t2-t1)
+                timings["dispatch"].append(t3-t2)
+                if raster:
+                    timings["raster"].append(t4-t3)
+    results = []
+    for phase in phases:
+        result = {"engine": engine_name, "scenario": scenario_name, "rockets": num_rockets, "phase": phase}
+        result.update(statistics(timings[phase]))
+        results.append(result)
+    return results
+
+
+def metadata(args):
+    info = {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "machine": platform.machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": args.seed, "frames": args.frames, "repeats": args.repeats, "warmup": args.warmup}
+    try:
+        import numpy
+        info["numpy"] = numpy.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def command_run(args):
+    results = []
+    print("{:14s} {:10s} {:>7s} {:10s} {:>10s} {:>10s} {:>10s}".format("engine", "scenario", "rockets", "phase", "median ms", "mean ms", "stdev ms"))
+    for scenario_name in args.scenarios:
+        for num_rockets in args.counts:
+            for engine_name in args.engines:
+                for result in run_benchmark(engine_name, scenario_name, num_rockets, args.frames, args.repeats,
+                                            args.warmup, args.seed, raster=not args.no_raster):
+                    print("{engine:14s} {scenario:10s} {rockets:7d} {phase:10s} {median_ms:10.3f} {mean_ms:10.3f} {stdev_ms:10.3f}".format(**result))
+                    results.append(result)
+    if args.json:
+        with open(args.json, "w") as outfile:
+            json.dump({"metadata": metadata(args), "results": results}, outfile, indent=2)
+    if args.csv:
+        with open(args.csv, "w") as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+    return 0
+
+
+def command_compare(args):
+    def load(filename):
+        with open(filename) as infile:
+            results = json.load(infile)["results"]
+        return {(r["engine"], r["scenario"], r["rockets"], r["phase"]): r for r in results}
+    old, new = load(args.old), load(args.new)
+    regressions = 0
+    print("{:14s} {:10s} {:>7s} {:10s} {:>10s} {:>10s} {:>8s}".format("engine", "scenario", "rockets", "phase", "old ms", "new ms", "change"))
+    for key in sorted(set(old) & set(new)):
+        old_time, new_time = old[key]["median_ms"], new[key]["median_ms"]
+        change = (new_time - old_time) / old_time * 100 if old_time else 0.0
+        regression = change > args.threshold and new_time - old_time > args.min_difference
+        regressions += regression
+        print("{:14s} {:10s} {:7d} {:10s} {:10.3f} {:10.3f} {:+7.1f}% {}".format(
+            key[0], key[1], key[2], key[3], old_time, new_time, change, "REGRESSION" if regression else ""))
+    for key in sorted(set(old) ^ set(new)):
+        print("only in {}: {}".format(args.old if key in old else args.new, key))
+    print("{:d} regressions".format(regressions))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rocket simulation benchmark harness")
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--engines", nargs="+", default=["rockets", "fleet"], choices=sorted(ENGINES))
+    run_parser.add_argument("--scenarios", nargs="+", default=["swarm"], choices=sorted(scenarios.SCENARIOS))
+    run_parser.add_argument("--counts", nargs="+", type=int, default=[100, 1000])
+    run_parser.add_argument("--frames", type=int, default=20, help="timed frames per repeat")
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--warmup", type=int, default=3, help="untimed frames before every repeat")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--no-raster", action="store_true", help="skip the raster phase")
+    run_parser.add_argument("--json", help="write the results to this JSON file")
+    run_parser.add_argument("--csv", help="write the results to this CSV file")
+    compare_parser = commands.add_parser("compare", help="compare two JSON result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percentage slowdown of the median that is a regression")
+    compare_parser.add_argument("--min-difference", type=float, default=0.05, help="ignore slowdowns smaller than this many ms")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return command_run(args)
+    elif args.command == "compare":
+        return command_compare(args)
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Cache of rocket draw calls, keyed on the quantized pose and the visual state of the rocket.
+A rocket that rests on a launchpad, hovers, or just has the same rotation as a rocket drawn before,
+gets the same geometry again: the cache stores the draw calls relative to the rocket's screen position,
+so a cache hit only costs a translation of the coordinates.
+The rotation is quantized like vectors.RotationTable does it (the geometry of a bucket is the exact rotation
+over the bucket's angle), and so is the engine throttle; the cache is a bounded LRU.
+Set the draw_cache of a Rocket to a DrawCallCache to use it (F6 in the game, C in performancetest.py); it is off
+by default. Rockets can share a cache; DrawCallCache.for_rockets() sizes one from the number of rockets.
+
+A hit is cheaper than drawing the rocket exactly, but a miss is more expensive (it also translates and stores
+the draw calls), so the cache only pays off when the rockets come back to the same poses, and when it is large
+enough to hold them. Measured with performancetest_drawcache.py (500 rockets, the timings vary a lot between runs):
+  - the game, a single rocket that hops and rests: 1.5 to 3 times faster
+  - rockets that don't turn but whose engine throttle varies a little: 1.7 to 3.3 times faster
+  - the swarm of spinning rockets: 0.7 to 1.0 times the speed with capacity 256 (it thrashes),
+    1.0 to 1.8 times with capacity 4000 (sized by for_rockets) and up
+  - the resting rockets: 0.85 to 1.5 times, about break-even
+  - the thrusters scenario (spinning, three throttles, the thrusters on and off): 0.6 to 0.9 times the speed,
+    whatever the capacity; every rotation bucket then has several entries, that are hardly ever reused.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import math
+from collections import OrderedDict
+
+
+class DrawCallCache(object):
+    """
+    LRU cache of at most capacity draw call lists, keyed on (rocket class, rotation bucket, engine throttle step,
+    left and right thruster, simplified). steps is the number of rotation buckets over a full circle,
+    throttle_steps the number of engine throttle steps per unit of throttle (a running engine has at least one step).
+    The options dicts of the draw calls are shared between the calls of a cache entry, they must not be modified.
+    """
+    def __init__(self, capacity=4096, steps=1024, throttle_steps=64):
+        self.capacity = capacity
+        self.steps = steps
+        self.step_angle = 2*math.pi/steps
+        self.throttle_steps = throttle_steps
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def draw_calls(self, rocket, position, rotation_angle, simplified=False):
+        """the draw calls of the rocket at the position (complex) and rotation, see Rocket.draw_calls"""
+        bucket = int(round(rotation_angle/self.step_angle)) % self.steps
+        throttle = rocket.engine_throttle
+        if throttle:
+            throttle = max(1, int(round(throttle*self.throttle_steps)))
+        key = (type(rocket), bucket, throttle, rocket.left_thruster_on, rocket.right_thruster_on, simplified)
+        entries = self.entries
+        entry = entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            entry = []
+            for method, args, options in rocket.geometry(0j, 0.0, bucket*self.step_angle, simplified=simplified,
+                                                         engine_throttle=throttle/self.throttle_steps):
+                if len(args) == 1:
+                    entry.append((method, True, args[0], options))      # a list of points
+                else:
+                    entry.append((method, False, args, options))
+            if len(entries) >= self.capacity:
+                entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+        entries[key] = entry    # (again) the most recently used
+        x0 = rocket.world_width / 2 + position.real
+        y0 = rocket.world_height - 10 - position.imag
+        calls = []
+        for method, points, coords, options in entry:
+            if points:
+                calls.append((method, ([(x0+x, y0+y) for x, y in coords],), options))
+            else:
+                calls.append((method, (coords[0]+x0, coords[1]+y0, coords[2]+x0, coords[3]+y0), options))   # an oval's box
+        return calls
+
+    @classmethod
+    def for_rockets(cls, num_rockets, steps=1024, throttle_steps=64):
+        """
+        a cache sized for num_rockets rockets: a single rocket only needs the few poses it comes back to,
+        a swarm of turning rockets needs several entries for every rotation bucket
+        """
+        return cls(min(16*steps, max(256, 8*num_rockets)), steps, throttle_steps)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats_text(self):
+        total = self.hits + self.misses
+        return "{:d} hits, {:d} misses ({:.1f}% hits), {:d} evictions, {:d} entries".format(
+            self.hits, self.misses, self.hits / total * 100 if total else 0.0, self.evictions, len(self.entries))
@@ -0,0 +1,175 @@
+"""
+Diffing of consecutive frames of draw calls into the minimal canvas operations.
+The draw calls of a frame are given per key (for instance per rocket), and FrameDiffer compares them
+with the previous frame: an item that only shifted becomes a move, an item that changed shape a coords update,
+changed options an itemconfigure, an item that is no longer drawn is hidden (and shown again when it comes back),
+new items are created and the items of keys that are gone are deleted.
+Changes smaller than the threshold (in pixels) are skipped, so a rocket resting on the ground, or moving
+less than a pixel, costs nothing: the render cost tracks the motion in the scene, not the number of rockets.
+
+The diff can be made anywhere, for instance in the simulation thread or process; the operations are plain tuples
+(marshal-able) and a CanvasPatcher applies them to the canvas:
+    ("create", item, method, coords, options)
+    ("move", item, dx, dy)
+    ("coords", item, coords)
+    ("configure", item, options)
+    ("hide", item)
+    ("show", item)
+    ("delete", item)
+An item is identified by (key, method, n): the n-th item of that method in the draw calls of the key,
+so the hull of a rocket stays the same item when its engine flame or thrusters come and go.
+
+Instead of its draw calls, a key can also be given with its pose (see Rocket.draw_pose) and a function that
+returns its draw calls. A key whose pose has the same shape as the pose its items are drawn at, is only
+translated: it costs nothing while that stays within the threshold, and then a move of its items.
+Its draw calls are only built and compared when its shape changed. So when every rocket turns every frame,
+nothing is skipped and the diff costs more than it saves on a canvas that creates items cheaply (the raster canvas).
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+from tkanimation import tkinter
+
+
+class FrameDiffer(object):
+    """keeps the state of the items as the canvas has them, and diffs every new frame against it"""
+    def __init__(self, threshold=0.5):
+        self.threshold = threshold
+        self.items = {}     # key -> {item: [coords, options, visible]}
+        self.poses = {}     # key -> [x, y, shape, dx, dy]: the pose the items are drawn at exactly, moved by dx, dy since
+
+    def diff(self, frame):
+        """
+        the operations that turn the previous frame into this one;
+        frame is a sequence of (key, draw calls) or of (key, pose, draw calls function)
+        """
+        operations = []
+        drawn_keys = set()
+        threshold, poses = self.threshold, self.poses
+        for entry in frame:
+            key = entry[0]
+            drawn_keys.add(key)
+            items = self.items.get(key)
+            if items is None:
+                items = self.items[key] = {}
+            pose = None
+            if len(entry) == 3:
+                pose = entry[1]
+                drawn_pose = poses.get(key)
+                if drawn_pose and drawn_pose[2] == pose[2]:
+                    # the same shape, so the items only have to be translated (when that is more than the threshold)
+                    dx, dy = pose[0] - drawn_pose[0], pose[1] - drawn_pose[1]
+                    if abs(dx) > threshold or abs(dy) > threshold:
+                        for item, state in items.items():
+                            if state[2]:
+                                operations.append(("move", item, dx, dy))
+                        poses[key] = [pose[0], pose[1], pose[2], drawn_pose[3] + dx, drawn_pose[4] + dy]
+                    continue
+                calls = entry[2]()
+            else:
+                calls = entry[1]
+            drawn_pose = poses.pop(key, None)
+            if drawn_pose and (drawn_pose[3] or drawn_pose[4]):
+                self._moved(items, drawn_pose[3], drawn_pose[4])
+            counts, exact = self._diff_calls(key, calls, items, operations)
+            if len(items) > sum(counts.values()):
+                for item, state in items.items():
+                    if state[2] and item[2] >= counts.get(item[1], 0):
+                        operations.append(("hide", item))
+                        state[2] = False
+            if pose and exact:
+                poses[key] = [pose[0], pose[1], pose[2], 0.0, 0.0]
+        for key in [key for key in self.items if key not in drawn_keys]:
+            for item in self.items.pop(key):
+                operations.append(("delete", item))
+            poses.pop(key, None)
+        return operations
+
+    @staticmethod
+    def _moved(items, dx, dy):
+        # the visible items were moved on the canvas, without updating their coordinates here
+        for state in items.values():
+            if state[2]:
+                state[0] = [c + d for c, d in zip(state[0], (dx, dy) * (len(state[0])//2))]
+
+    def _diff_calls(self, key, calls, items, operations):
+        # returns the number of drawn items per method, and whether they are now exactly at the coordinates of the draw calls
+        threshold = self.threshold
+        exact = True
+        counts = {}
+        for method, args, options in calls:
+            n = counts.get(method, 0)
+            counts[method] = n + 1
+            item = (key, method, n)
+            if len(args) == 1:
+                args = args[0]      # a list of points
+            coords = [c for xy in args for c in xy] if args and type(args[0]) in (tuple, list) else list(args)
+            state = items.get(item)
+            if state is None:
+                operations.append(("create", item, method, coords, options))
+                items[item] = [coords, options, True]
+                continue
+            old_coords = state[0]
+            if coords == old_coords:
+                pass
+            elif len(old_coords) != len(coords):
+                operations.append(("coords", item, coords))
+                state[0] = coords
+            elif abs(coords[0] - old_coords[0]) > threshold or abs(coords[1] - old_coords[1]) > threshold or \
+                    any(abs(new - old) > threshold for new, old in zip(coords, old_coords)):
+                dx, dy = coords[0] - old_coords[0], coords[1] - old_coords[1]
+                # a move, when every point shifted the same (the second point already tells when the item turned)
+                if len(coords) == 2 or (abs(coords[2] - old_coords[2] - dx) <= threshold and
+                                        abs(coords[3] - old_coords[3] - dy) <= threshold and
+                                        all(abs(new - old - dx) <= threshold and abs(new_y - old_y - dy) <= threshold
+                                            for new, old, new_y, old_y in zip(coords[4::2], old_coords[4::2],
+                                                                              coords[5::2], old_coords[5::2]))):
+                    operations.append(("move", item, dx, dy))
+                    state[0] = [c + d for c, d in zip(old_coords, (dx, dy) * (len(coords)//2))]   # as the canvas has it
+                    exact = False
+                else:
+                    operations.append(("coords", item, coords))
+                    state[0] = coords
+            else:
+                exact = False   # skipped, within the threshold
+            if state[1] != options:
+                operations.append(("configure", item, options))
+                state[1] = options
+            if not state[2]:
+                operations.append(("show", item))
+                state[2] = True
+        return counts, exact
+
+    def reset(self):
+        """forget all items, the next frame is created from scratch (for instance after the canvas was cleared)"""
+        self.items = {}
+        self.poses = {}
+
+
+class CanvasPatcher(object):
+    """applies the operations of a FrameDiffer to a canvas, and counts them"""
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.ids = {}       # item -> canvas item id
+        self.operations_count = 0
+
+    def apply(self, operations):
+        canvas, ids = self.canvas, self.ids
+        for operation in operations:
+            kind, item = operation[0], operation[1]
+            if kind == "move":
+                canvas.move(ids[item], operation[2], operation[3])
+            elif kind == "coords":
+                canvas.coords(ids[item], *operation[2])
+            elif kind == "create":
+                ids[item] = getattr(canvas, operation[2])(*operation[3], **operation[4])
+            elif kind == "configure":
+                canvas.itemconfigure(ids[item], **operation[2])
+            elif kind == "hide":
+                canvas.itemconfigure(ids[item], state=tkinter.HIDDEN)
+            elif kind == "show":
+                canvas.itemconfigure(ids[item], state=tkinter.NORMAL)
+            elif kind == "delete":
+                canvas.delete(ids.pop(item))
+        self.operations_count = len(operations)
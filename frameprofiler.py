@@ -0,0 +1,153 @@
+"""
+Low overhead per-frame timing instrumentation.
+The timings of the phases of a frame (update, draw call building, updating the canvas items, hiding the unused ones...)
+are kept in a ring buffer of the last frames, to show them in an overlay.
+The phases of a number of frames can also be exported as a Chrome trace (chrome://tracing, Perfetto),
+or the frames can be run under cProfile and written as pstats file.
+When the profiler is disabled, phase() returns a shared do-nothing context manager and end_frame() returns immediately.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import cProfile
+import json
+import os
+import threading
+import time
+
+
+class NullPhase(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class Phase(object):
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class FrameProfiler(object):
+    """
+    Use as:  with profiler.phase("update"): ...   and call end_frame() after every frame.
+    A phase can occur more than once in a frame, its times are added up. The "frame" timing is the time between frames.
+    """
+    def __init__(self, capacity=120):
+        self.capacity = capacity
+        self.enabled = False
+        self.names = ["frame"]
+        self.timings = {"frame": [0.0] * capacity}
+        self.frames = 0
+        self.current = {}
+        self.last_frame_end = None
+        self.trace_events = None
+        self.trace_filename = None
+        self.trace_frames_left = 0
+        self.profile = None
+        self.profile_filename = None
+        self.profile_frames_left = 0
+
+    def enable(self):
+        self.enabled = True
+        self.last_frame_end = None
+
+    def disable(self):
+        if not self.trace_frames_left and not self.profile_frames_left:
+            self.enabled = False
+
+    def phase(self, name):
+        if self.enabled:
+            return Phase(self, name)
+        return NULL_PHASE
+
+    def record(self, name, start, end):
+        self.current[name] = self.current.get(name, 0.0) + end - start
+        if self.trace_events is not None:
+            self.trace_events.append({"name": name, "ph": "X", "ts": start*1e6, "dur": (end-start)*1e6,
+                                      "pid": os.getpid(), "tid": threading.current_thread().ident})
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_frame_end is not None:
+            self.record("frame", self.last_frame_end, now)
+        self.last_frame_end = now
+        index = self.frames % self.capacity
+        for name in self.current:
+            if name not in self.timings:
+                self.names.append(name)
+                self.timings[name] = [0.0] * self.capacity
+        for name in self.names:
+            self.timings[name][index] = self.current.get(name, 0.0)
+        self.current = {}
+        self.frames += 1
+        if self.trace_frames_left:
+            self.trace_frames_left -= 1
+            if not self.trace_frames_left:
+                self.write_trace()
+        if self.profile_frames_left:
+            self.profile_frames_left -= 1
+            if not self.profile_frames_left:
+                self.profile.disable()
+                self.profile.dump_stats(self.profile_filename)
+                print("wrote cProfile stats to", self.profile_filename)
+                self.profile = None
+
+    def stats(self):
+        """(phase name, last, mean, max) in milliseconds, over the frames in the ring buffer"""
+        count = min(self.frames, self.capacity)
+        if not count:
+            return []
+        last = (self.frames - 1) % self.capacity
+        result = []
+        for name in self.names:
+            times = self.timings[name][:count]
+            result.append((name, times[last]*1000, sum(times)/count*1000, max(times)*1000))
+        return result
+
+    def overlay_text(self):
+        lines = ["{:10s} {:>7s} {:>7s} {:>7s}".format("ms", "last", "mean", "max")]
+        for name, last, mean, maximum in self.stats():
+            lines.append("{:10s} {:7.2f} {:7.2f} {:7.2f}".format(name, last, mean, maximum))
+        return "\n".join(lines)
+
+    def trace_frames(self, num_frames, filename):
+        """record the phases of the next frames, and write them as Chrome trace event JSON"""
+        self.trace_events = []
+        self.trace_filename = filename
+        self.trace_frames_left = num_frames
+        self.enable()
+
+    def write_trace(self):
+        with open(self.trace_filename, "w") as outfile:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, outfile)
+        print("wrote {:d} trace events to {:s}".format(len(self.trace_events), self.trace_filename))
+        self.trace_events = None
+
+    def profile_frames(self, num_frames, filename):
+        """run the next frames under cProfile, and write the stats to a file (load with pstats)"""
+        if self.profile:
+            return
+        self.profile = cProfile.Profile()
+        self.profile_filename = filename
+        self.profile_frames_left = num_frames
+        self.enable()
+        self.profile.enable()
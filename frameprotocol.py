@@ -0,0 +1,243 @@
+"""
+Compact binary frame format for draw calls, to send frames from the simulation server to a client.
+
+A frame is:  header, palette, primitive table, vertex data.
+  - header: magic b'RKF1', number of palette entries, number of primitives, number of coordinates  (struct '<4sHII')
+  - palette: the colour names, each one as a length byte followed by the name
+  - primitive table: 4 bytes per primitive: opcode, fill colour index, outline colour index, number of coordinates
+    (bit 7 of the opcode is set on the first primitive of every group: the draw calls of one rocket)
+  - vertex data: all coordinates as little-endian float32 (x,y pairs)
+Colour index 255 means no colour given.
+Such a frame is about 2.9 times smaller than the marshaled draw calls (float32 instead of float64 coordinates,
+and no method names and options per draw call).
+
+A pose frame is much smaller still (about 33 times smaller than the marshaled draw calls):
+it doesn't contain the vertices, but only the pose of each rocket,
+and the client computes the draw calls itself (it knows the shape of the rockets).
+  - header: magic b'RKP1', number of rockets  (struct '<4sI')
+  - per rocket 12 bytes: screen x and y of the rocket origin in 1/16 pixels (int32), rotation in 1/65536
+    of a full circle (uint16), engine throttle in 1/64 (uint8), thruster flags (uint8: 1=left, 2=right)
+The quantization moves the drawn points by at most about 0.2 pixel (the tip of a full throttle flame).
+A position or throttle that doesn't fit in its field is an error, it is not clipped.
+The client builds the draw calls of a pose frame with vectorized vertices and flat coordinate lists, so that
+decoding it costs about as much as unmarshaling the draw calls (see performancetest_frameprotocol.py).
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import array
+import math
+import struct
+import sys
+
+HEADER = struct.Struct("<4sHII")
+MAGIC = b"RKF1"
+POSE_HEADER = struct.Struct("<4sI")
+POSE_MAGIC = b"RKP1"
+POSE_FIELDS = [("x", "<i4"), ("y", "<i4"), ("rotation", "<u2"), ("throttle", "u1"), ("flags", "u1")]
+POSITION_SCALE, ROTATION_SCALE, THROTTLE_SCALE = 16, 65536, 64
+NO_COLOR = 255
+GROUP_START = 0x80
+OPCODES = {"create_polygon": 1, "create_oval": 2, "create_rectangle": 3, "create_line": 4}
+METHODS = {opcode: method for method, opcode in OPCODES.items()}
+
+
+def encode_draw_calls(calls, grouped=False):
+    """
+    pack a list of (method, args, kwargs) draw calls, as Rocket.draw_calls() produces them, into a bytes frame.
+    With grouped=True, calls is a list with the draw calls of each rocket.
+    """
+    palette = {}
+    primitives = array.array("B")
+    coords = array.array("f")
+    group_starts = set()
+    if grouped:
+        grouped_calls, calls = calls, []
+        for rocket_calls in grouped_calls:
+            group_starts.add(len(calls))
+            calls.extend(rocket_calls)
+    for index, (method, args, kwargs) in enumerate(calls):
+        try:
+            opcode = OPCODES[method]
+        except KeyError:
+            raise ValueError("draw call can't be encoded: " + method)
+        if index in group_starts:
+            opcode |= GROUP_START
+        num_coords = len(coords)
+        if len(args) == 1:
+            coords.extend(c for xy in args[0] for c in xy)   # list of points
+        else:
+            coords.extend(args)
+        colors = []
+        for option in ("fill", "outline"):
+            color = kwargs.get(option)
+            if color is None:
+                colors.append(NO_COLOR)
+            else:
+                colors.append(palette.setdefault(color, len(palette)))
+        primitives.extend((opcode, colors[0], colors[1], len(coords) - num_coords))
+    if len(palette) >= NO_COLOR:
+        raise ValueError("too many different colours in one frame")
+    return pack_frame(sorted(palette, key=palette.get), primitives, coords)
+
+
+def pack_frame(palette, primitives, coords):
+    """primitives is an array('B') or NumPy uint8 array, coords an array('f') or little-endian NumPy float32 array"""
+    if sys.byteorder == "big" and isinstance(coords, array.array):
+        coords = array.array("f", coords)
+        coords.byteswap()
+    primitives = primitives.tobytes()
+    header = HEADER.pack(MAGIC, len(palette), len(primitives) // 4, len(coords))
+    palette = b"".join(struct.pack("B", len(color)) + color.encode("ascii") for color in palette)
+    return b"".join([header, palette, primitives, coords.tobytes()])
+
+
+def decode_frame(frame, grouped=False):
+    """
+    generates the (method, args, kwargs) draw calls of a frame.
+    With grouped=True it generates the lists of draw calls of the groups instead (of each rocket).
+    """
+    magic, num_colors, num_primitives, num_coords = HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("not a packed frame")
+    palette = []
+    offset = HEADER.size
+    for _ in range(num_colors):
+        size = struct.unpack_from("B", frame, offset)[0]
+        palette.append(frame[offset+1:offset+1+size].decode("ascii"))
+        offset += size + 1
+    primitives = array.array("B", frame[offset:offset + num_primitives*4])
+    offset += num_primitives*4
+    coords = array.array("f")
+    coords.frombytes(frame[offset:offset + num_coords*4])
+    if sys.byteorder == "big":
+        coords.byteswap()
+    coords = coords.tolist()
+    position = 0
+    group = None
+    for i in range(0, len(primitives), 4):
+        opcode, fill, outline, size = primitives[i:i+4]
+        if grouped and (opcode & GROUP_START or group is None):
+            if group:
+                yield group
+            group = []
+        opcode &= ~GROUP_START
+        kwargs = {}
+        if fill != NO_COLOR:
+            kwargs["fill"] = palette[fill]
+        if outline != NO_COLOR:
+            kwargs["outline"] = palette[outline]
+        if opcode == 1:
+            args = (coords[position:position+size],)
+        else:
+            args = tuple(coords[position:position+size])
+        position += size
+        if grouped:
+            group.append((METHODS[opcode], args, kwargs))
+        else:
+            yield METHODS[opcode], args, kwargs
+    if group:
+        yield group
+
+
+def draw_frame(canvas, frame):
+    """perform the draw calls of a packed frame directly on the canvas"""
+    for method, args, kwargs in decode_frame(frame):
+        getattr(canvas, method)(*args, **kwargs)
+
+
+def encode_fleet(fleet):
+    """
+    Pack the rockets of a RocketFleet into a frame without building the draw calls first.
+    The frame decodes into the same draw calls as RocketFleet.draw_calls() (in float32 precision).
+    """
+    import numpy
+    hull, flame, thrusters = fleet.screen_vertices()
+    n = fleet.count
+    # every rocket gets a fixed slot for each of its 4 possible primitives, then the unused ones are masked out
+    coords = numpy.empty((n, 40), numpy.float32)
+    coords[:, :14] = hull.reshape(n, 14)
+    coords[:, 14:32] = flame.reshape(n, 18)
+    coords[:, 32:34] = thrusters[:, 0] - 3
+    coords[:, 34:36] = thrusters[:, 0] + 3
+    coords[:, 36:38] = thrusters[:, 1] - 3
+    coords[:, 38:40] = thrusters[:, 1] + 3
+    used = numpy.empty((n, 4), bool)
+    used[:, 0] = True
+    used[:, 1] = fleet.engine_throttle != 0
+    used[:, 2] = fleet.left_thruster_on
+    used[:, 3] = fleet.right_thruster_on
+    coords_used = numpy.repeat(used, [14, 18, 4, 4], axis=1)
+    # palette: blue, lightgrey, orange, yellow
+    primitive_types = numpy.array([[1 | GROUP_START, 0, 1, 14], [1, 3, 2, 18], [2, 3, 2, 4], [2, 3, 2, 4]], numpy.uint8)
+    primitives = numpy.broadcast_to(primitive_types, (n, 4, 4))[used]
+    return pack_frame(["blue", "lightgrey", "orange", "yellow"], primitives.astype("<u1"), coords[coords_used].astype("<f4"))
+
+
+def encode_poses(fleet):
+    """pack the pose of every rocket of a RocketFleet into a pose frame"""
+    import numpy
+    poses = numpy.empty(fleet.count, POSE_FIELDS)
+    x = numpy.round((fleet.world_width / 2 + fleet.position.real) * POSITION_SCALE)
+    y = numpy.round((fleet.world_height - 10 - fleet.position.imag) * POSITION_SCALE)
+    throttle = numpy.round(fleet.engine_throttle * THROTTLE_SCALE)
+    if fleet.count:
+        if max(numpy.abs(x).max(), numpy.abs(y).max()) > 2**31 - 1:
+            raise ValueError("rocket position out of range for a pose frame")
+        if throttle.min() < 0 or throttle.max() > 255:
+            raise ValueError("engine throttle out of range for a pose frame")
+    poses["x"] = x
+    poses["y"] = y
+    poses["rotation"] = numpy.round(fleet.rotation * (ROTATION_SCALE / (2*math.pi))).astype(numpy.int64) % ROTATION_SCALE
+    poses["throttle"] = throttle
+    poses["flags"] = fleet.left_thruster_on.view(numpy.uint8) | fleet.right_thruster_on.view(numpy.uint8) << 1
+    return POSE_HEADER.pack(POSE_MAGIC, fleet.count) + poses.tobytes()
+
+
+def decode_poses(frame, rocket_class=None, grouped=False):
+    """
+    The draw calls of the rockets in a pose frame (with grouped=True, a list with the draw calls of each rocket).
+    Like decode_frame() gives them, the coordinates of a polygon are a flat list; the options dicts are shared
+    by the draw calls, they must not be modified. rocket_class defaults to Rocket.
+    """
+    import numpy
+    from rocketsimulator import Rocket
+    from rocketfleet import RocketFleet
+    magic, num_rockets = POSE_HEADER.unpack_from(frame)
+    if magic != POSE_MAGIC:
+        raise ValueError("not a pose frame")
+    poses = numpy.frombuffer(frame, POSE_FIELDS, num_rockets, POSE_HEADER.size)
+    # in a world of size zero, the position of a rocket is the screen position of its origin (with y pointing up, minus 10)
+    fleet = RocketFleet(0, 0, max(num_rockets, 1), rocket_class or Rocket)
+    fleet.set_count(num_rockets)
+    fleet.position[:] = poses["x"] / POSITION_SCALE - 1j * (poses["y"] / POSITION_SCALE + 10)
+    fleet.rotation[:] = poses["rotation"] * (2*math.pi / ROTATION_SCALE)
+    fleet.engine_throttle[:] = poses["throttle"] / THROTTLE_SCALE
+    hull, flame, thrusters = fleet.screen_vertices()
+    hull = hull.reshape(num_rockets, -1).tolist()
+    flame = flame.reshape(num_rockets, -1).tolist()
+    ovals = numpy.concatenate((thrusters - 3, thrusters + 3), axis=2).tolist()     # the boxes of both thrusters
+    hull_colors = {"fill": "blue", "outline": "lightgrey"}
+    flame_colors = {"outline": "orange", "fill": "yellow"}
+    calls = []
+    for hull_coords, flame_coords, (left_oval, right_oval), throttle, flags in \
+            zip(hull, flame, ovals, poses["throttle"].tolist(), poses["flags"].tolist()):
+        rocket_calls = [("create_polygon", (hull_coords,), hull_colors)]
+        if throttle:
+            rocket_calls.append(("create_polygon", (flame_coords,), flame_colors))
+        if flags & 1:
+            rocket_calls.append(("create_oval", tuple(left_oval), flame_colors))
+        if flags & 2:
+            rocket_calls.append(("create_oval", tuple(right_oval), flame_colors))
+        if grouped:
+            calls.append(rocket_calls)
+        else:
+            calls.extend(rocket_calls)
+    return calls
+
+
+def draw_poses(canvas, frame):
+    """perform the draw calls of a pose frame directly on the canvas"""
+    for method, args, kwargs in decode_poses(frame):
+        getattr(canvas, method)(*args, **kwargs)
@@ -0,0 +1,307 @@
+"""
+Streaming of the rocket simulation state from a simulation server to a client, over a local socket.
+The server runs its own simulation clock and pushes every frame, the client renders whatever
+frame is the most recent one, so simulation and rendering overlap fully.
+
+Only the per-rocket state that changed since the previous frame is sent (delta frames),
+with a full keyframe every now and then, and whenever the number of rockets changes or a client connects.
+The rocket state is: x, y, rotation, engine throttle, thrusters (bit 0 = left, bit 1 = right), all float32.
+
+Message:  header (struct '<4sBIII': magic b'RKS1', kind, frame number, number of rockets, body size), body.
+Keyframe body: the state of all rockets, field by field.
+Delta body: per field a mode byte: 0 = unchanged, 1 = all values follow, 2 = a count followed by
+the uint32 indices and the values of the rockets that changed.
+Client commands: struct '<4sI', a command and its value, for instance b'ADDR' (add rockets).
+The simulationserver module has more commands.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import collections
+import select
+import socket
+import struct
+import threading
+import time
+import numpy
+from rocketfleet import RocketFleet
+
+HEADER = struct.Struct("<4sBIII")
+MAGIC = b"RKS1"
+COMMAND = struct.Struct("<4sI")
+KEYFRAME, DELTA = 0, 1
+UNCHANGED, DENSE, SPARSE = 0, 1, 2
+NUM_FIELDS = 5
+
+
+def fleet_state(fleet):
+    """the streamed state of all rockets of the fleet, as a float32 array of shape (5, n)"""
+    state = numpy.empty((NUM_FIELDS, fleet.count), numpy.float32)
+    state[0] = fleet.position.real
+    state[1] = fleet.position.imag
+    state[2] = fleet.rotation
+    state[3] = fleet.engine_throttle
+    state[4] = fleet.left_thruster_on + 2 * fleet.right_thruster_on
+    return state
+
+
+def state_fleet(state, world_width, world_height):
+    """a RocketFleet with the rockets in the given streamed state, for drawing"""
+    fleet = RocketFleet(world_width, world_height, state.shape[1])
+    fleet.set_count(state.shape[1])
+    fleet.position[:] = state[0] + 1j * state[1]
+    fleet.rotation[:] = state[2]
+    fleet.engine_throttle[:] = state[3]
+    fleet.left_thruster_on[:] = state[4].astype(int) & 1
+    fleet.right_thruster_on[:] = state[4].astype(int) & 2
+    return fleet
+
+
+def encode_keyframe(frame_number, state):
+    body = state.astype("<f4").tobytes()
+    return HEADER.pack(MAGIC, KEYFRAME, frame_number, state.shape[1], len(body)) + body
+
+
+def encode_delta(frame_number, state, previous_state):
+    parts = []
+    for values, previous in zip(state, previous_state):
+        changed = numpy.flatnonzero(values != previous)
+        if len(changed) == 0:
+            parts.append(struct.pack("B", UNCHANGED))
+        elif len(changed) * 2 >= len(values):
+            parts.append(struct.pack("B", DENSE))
+            parts.append(values.astype("<f4").tobytes())
+        else:
+            parts.append(struct.pack("<BI", SPARSE, len(changed)))
+            parts.append(changed.astype("<u4").tobytes())
+            parts.append(values[changed].astype("<f4").tobytes())
+    body = b"".join(parts)
+    return HEADER.pack(MAGIC, DELTA, frame_number, state.shape[1], len(body)) + body
+
+
+def decode_message(header, body, state):
+    """applies a message to the given state array (which may be None), returns the new state"""
+    magic, kind, frame_number, num_rockets, _ = header
+    if magic != MAGIC:
+        raise ValueError("invalid stream message")
+    if kind == KEYFRAME:
+        return numpy.frombuffer(body, "<f4").reshape(NUM_FIELDS, num_rockets).astype(numpy.float32)
+    if state is None or state.shape[1] != num_rockets:
+        return None     # can't apply a delta without the preceding keyframe
+    state = state.copy()
+    offset = 0
+    for values in state:
+        mode = body[offset:offset+1]
+        offset += 1
+        if mode == struct.pack("B", DENSE):
+            values[:] = numpy.frombuffer(body, "<f4", num_rockets, offset)
+            offset += num_rockets * 4
+        elif mode == struct.pack("B", SPARSE):
+            count = struct.unpack_from("<I", body, offset)[0]
+            offset += 4
+            indices = numpy.frombuffer(body, "<u4", count, offset)
+            offset += count * 4
+            values[indices] = numpy.frombuffer(body, "<f4", count, offset)
+            offset += count * 4
+    return state
+
+
+def receive_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("connection closed")
+        data += chunk
+    return data
+
+
+class StreamingSimulation(object):
+    """
+    Simulation server that steps a RocketFleet at a fixed frame rate (independent of any client)
+    and pushes the frames to all connected clients.
+    The client sockets are non-blocking, so a slow client never holds up the simulation or the other clients:
+    every client has room for one message that is still being sent. A client that hasn't received all of it
+    by the time the next frame is ready, skips the frames until it has, and then gets a keyframe of the latest
+    frame. A client that hasn't taken a message after max_stall seconds is disconnected.
+    Likewise, the commands are read without blocking: the bytes of a command that hasn't been received
+    completely are kept per client until the rest arrives.
+    """
+    def __init__(self, fleet, address=("localhost", 33445), frame_rate=60, keyframe_interval=120, max_stall=5.0):
+        self.fleet = fleet
+        self.frame_rate = frame_rate
+        self.keyframe_interval = keyframe_interval
+        self.max_stall = max_stall
+        self.add_rockets_function = None    # called with a count when a client asks to add rockets
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind(address)
+        self.server_socket.listen(5)
+        self.clients = []
+        self.pending = {}           # client -> the unsent rest of its current message
+        self.received = {}          # client -> the received start of its next command
+        self.stalled_since = {}     # client -> when its pending message was queued
+        self.needs_keyframe = set()
+        self.frame_number = 0
+        self.previous_state = None
+        self.bytes_sent = 0
+        self.frames_skipped = 0
+
+    def serve_forever(self):
+        next_frame_time = time.perf_counter()
+        while True:
+            self.fleet.step(bounce=True)
+            self.frame_number += 1
+            self.send_frame()
+            next_frame_time += 1 / self.frame_rate
+            if next_frame_time < time.perf_counter():
+                next_frame_time = time.perf_counter()   # too slow to keep up, don't try to catch up
+            self.handle_connections(0)
+            while time.perf_counter() < next_frame_time:
+                # until the next frame: accept clients, read their commands, send the rest of their messages
+                self.handle_connections(max(0.0, next_frame_time - time.perf_counter()))
+
+    def handle_connections(self, timeout):
+        sending = [client for client in self.clients if client in self.pending]
+        readable, writable, _ = select.select([self.server_socket] + self.clients, sending, [], timeout)
+        for sock in readable:
+            if sock is self.server_socket:
+                client, _ = self.server_socket.accept()
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client.setblocking(False)
+                self.clients.append(client)
+                self.needs_keyframe.add(client)
+                continue
+            self.receive_commands(sock)
+        for client in writable:
+            if client in self.pending:
+                self.flush(client)
+
+    def receive_commands(self, client):
+        try:
+            data = client.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except socket.error:
+            data = b""
+        if not data:
+            self.drop_client(client)
+            return
+        data = self.received.pop(client, b"") + data
+        complete = len(data) - len(data) % COMMAND.size
+        for offset in range(0, complete, COMMAND.size):
+            command, count = COMMAND.unpack_from(data, offset)
+            if command == b"ADDR" and self.add_rockets_function:
+                self.add_rockets_function(count)
+        if complete < len(data):
+            self.received[client] = data[complete:]
+
+    def send_frame(self):
+        state = fleet_state(self.fleet)
+        previous_state = self.previous_state
+        self.previous_state = state
+        keyframe = delta = None
+        if previous_state is None or previous_state.shape != state.shape or self.frame_number % self.keyframe_interval == 0:
+            keyframe = encode_keyframe(self.frame_number, state)
+        for client in list(self.clients):
+            if client in self.pending and not self.flush(client):
+                # still busy with an older message: skip this frame, the client gets a keyframe when it's done
+                self.needs_keyframe.add(client)
+                self.frames_skipped += 1
+                if time.perf_counter() - self.stalled_since[client] > self.max_stall:
+                    self.drop_client(client)
+                continue
+            if keyframe or client in self.needs_keyframe:
+                keyframe = keyframe or encode_keyframe(self.frame_number, state)
+                self.needs_keyframe.discard(client)
+                self.send(client, keyframe)
+            else:
+                delta = delta or encode_delta(self.frame_number, state, previous_state)
+                self.send(client, delta)
+
+    def send(self, client, message):
+        self.pending[client] = memoryview(message)
+        self.stalled_since[client] = time.perf_counter()
+        self.flush(client)
+
+    def flush(self, client):
+        """sends as much as possible of the client's pending message, returns whether all of it was sent"""
+        message = self.pending[client]
+        try:
+            sent = client.send(message)
+        except (BlockingIOError, InterruptedError):
+            return False
+        except socket.error:
+            self.drop_client(client)
+            return False
+        self.bytes_sent += sent
+        if sent < len(message):
+            self.pending[client] = message[sent:]
+            return False
+        del self.pending[client]
+        return True
+
+    def drop_client(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+        self.pending.pop(client, None)
+        self.received.pop(client, None)
+        self.stalled_since.pop(client, None)
+        self.needs_keyframe.discard(client)
+        client.close()
+
+
+class FrameStreamClient(threading.Thread):
+    """
+    Receives the streamed frames in a background thread. Every message is applied to the state,
+    but only the most recent frames are kept in a small buffer; older ones are dropped as stale.
+    The address is a (host, port) tuple, or the path of a Unix socket.
+    """
+    def __init__(self, address=("localhost", 33445), buffer_size=2):
+        super(FrameStreamClient, self).__init__()
+        self.daemon = True
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.frames = collections.deque(maxlen=buffer_size)
+        self.frames_lock = threading.Lock()
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.bytes_received = 0
+
+    def run(self):
+        state = None
+        try:
+            while True:
+                header = HEADER.unpack(receive_exactly(self.sock, HEADER.size))
+                body = receive_exactly(self.sock, header[4])
+                self.bytes_received += HEADER.size + len(body)
+                state = decode_message(header, body, state)
+                if state is not None:
+                    with self.frames_lock:
+                        if len(self.frames) == self.frames.maxlen:
+                            self.frames_dropped += 1
+                        self.frames.append((header[2], state))
+                        self.frames_received += 1
+        except (EOFError, socket.error):
+            pass
+
+    def latest_frame(self):
+        """returns (frame number, state) of the most recent frame, dropping older ones. None if there's no new frame."""
+        with self.frames_lock:
+            if not self.frames:
+                return None
+            self.frames_dropped += len(self.frames) - 1
+            frame = self.frames.pop()
+            self.frames.clear()
+            return frame
+
+    def add_rockets(self, count):
+        self.send_command(b"ADDR", count)
+
+    def send_command(self, command, value=0):
+        self.sock.sendall(COMMAND.pack(command, value))
@@ -0,0 +1,149 @@
+"""
+Numerical integrators for the rocket motion, to use instead of the fixed unit step of Rocket.update().
+The time unit is one physics step of the game: an integrator with dt=1 advances the rocket as far
+as a regular update does, dt=2 covers two steps in one update, dt=0.25 a quarter of a step.
+
+The forces are held constant during an update: the acceleration in world coordinates (gravity, ...),
+the thrust in the rocket's own frame (rotating along with the rocket), and the rotation acceleration.
+All integrators work on scalars (a single Rocket) and on NumPy arrays (a RocketFleet) alike:
+the math functions they need come from xp, which is ScalarMath or the numpy module.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import division
+import math
+import cmath
+
+
+class ScalarMath(object):
+    """the few math functions the integrators need, for plain Python numbers (numpy has the same names)"""
+    exp = staticmethod(cmath.exp)
+
+    @staticmethod
+    def where(condition, a, b):
+        return a if condition else b
+
+
+def acceleration_at(acceleration, thrust, rotation, xp):
+    return acceleration + thrust * xp.exp(rotation*1j)
+
+
+class Integrator(object):
+    """
+    Base class. step() integrates position, velocity (complex), rotation and rotation speed
+    over the time dt and returns them; advance() does this over the integrator's own dt.
+    """
+    name = None
+
+    def __init__(self, dt=1.0):
+        self.dt = dt
+
+    def advance(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, xp=ScalarMath):
+        return self.step(position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, self.dt, xp)
+
+    def step(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return "<{:s} dt={:g}>".format(self.name, self.dt)
+
+
+class Euler(Integrator):
+    """The integration of Rocket.update(): with dt=1 it gives exactly the same results."""
+    name = "euler"
+
+    def step(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp):
+        velocity = velocity + acceleration_at(acceleration, thrust, rotation, xp) * dt
+        position = position + velocity * dt
+        rotation = (rotation + rotation_speed * dt) % (2*math.pi)
+        rotation_speed = rotation_speed + rotation_acceleration * dt
+        return position, velocity, rotation, rotation_speed
+
+
+class SemiImplicitEuler(Integrator):
+    """Symplectic Euler: the velocities are updated first, the positions with the new velocities."""
+    name = "semi-implicit"
+
+    def step(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp):
+        velocity = velocity + acceleration_at(acceleration, thrust, rotation, xp) * dt
+        rotation_speed = rotation_speed + rotation_acceleration * dt
+        position = position + velocity * dt
+        rotation = (rotation + rotation_speed * dt) % (2*math.pi)
+        return position, velocity, rotation, rotation_speed
+
+
+class VelocityVerlet(Integrator):
+    """Velocity Verlet: second order, the thrust direction is evaluated at the start and the end of the step."""
+    name = "verlet"
+
+    def step(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp):
+        half_dt2 = dt * dt / 2
+        acceleration1 = acceleration_at(acceleration, thrust, rotation, xp)
+        position = position + velocity * dt + acceleration1 * half_dt2
+        rotation = rotation + rotation_speed * dt + rotation_acceleration * half_dt2
+        rotation_speed = rotation_speed + rotation_acceleration * dt
+        acceleration2 = acceleration_at(acceleration, thrust, rotation, xp)
+        velocity = velocity + (acceleration1 + acceleration2) * (dt / 2)
+        return position, velocity, rotation % (2*math.pi), rotation_speed
+
+
+class RungeKutta4(Integrator):
+    """Classic fourth order Runge-Kutta."""
+    name = "rk4"
+
+    def step(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp):
+        half_dt = dt / 2
+        acceleration1 = acceleration_at(acceleration, thrust, rotation, xp)
+        velocity2 = velocity + acceleration1 * half_dt
+        rotation_speed2 = rotation_speed + rotation_acceleration * half_dt
+        acceleration2 = acceleration_at(acceleration, thrust, rotation + rotation_speed * half_dt, xp)
+        velocity3 = velocity + acceleration2 * half_dt
+        acceleration3 = acceleration_at(acceleration, thrust, rotation + rotation_speed2 * half_dt, xp)
+        velocity4 = velocity + acceleration3 * dt
+        rotation_speed4 = rotation_speed + rotation_acceleration * dt
+        acceleration4 = acceleration_at(acceleration, thrust, rotation + rotation_speed2 * dt, xp)
+        position = position + (velocity + 2*velocity2 + 2*velocity3 + velocity4) * (dt / 6)
+        velocity = velocity + (acceleration1 + 2*acceleration2 + 2*acceleration3 + acceleration4) * (dt / 6)
+        rotation = rotation + (rotation_speed + 4*rotation_speed2 + rotation_speed4) * (dt / 6)
+        return position, velocity, rotation % (2*math.pi), rotation_speed4
+
+
+class Adaptive(Integrator):
+    """
+    Wraps another integrator and uses smaller steps near the ground: rockets lower than the given height
+    are integrated in the given number of substeps, and stop at the first substep that reaches the ground.
+    That way the ground contact check sees the position and velocity at the moment of contact,
+    instead of somewhere below the ground at the end of a large step.
+    """
+    def __init__(self, integrator, height=30.0, substeps=8):
+        super(Adaptive, self).__init__(integrator.dt)
+        self.integrator = integrator
+        self.height = height
+        self.substeps = substeps
+        self.name = "adaptive-" + integrator.name
+
+    def step(self, position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp):
+        step = self.integrator.step
+        near_ground = position.imag < self.height
+        if xp is ScalarMath:
+            if not near_ground:
+                return step(position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, dt, xp)
+            for _ in range(self.substeps):
+                position, velocity, rotation, rotation_speed = step(position, velocity, rotation, rotation_speed,
+                                                                    acceleration, thrust, rotation_acceleration, dt / self.substeps, xp)
+                if position.imag <= 0:
+                    break
+            return position, velocity, rotation, rotation_speed
+        # arrays: every rocket takes all substeps, but with a zero dt where it has nothing more to do
+        for substep in range(self.substeps):
+            if substep == 0:
+                substep_dt = xp.where(near_ground, dt / self.substeps, dt)
+            else:
+                substep_dt = xp.where(near_ground & (position.imag > 0), dt / self.substeps, 0.0)
+            position, velocity, rotation, rotation_speed = step(position, velocity, rotation, rotation_speed,
+                                                                acceleration, thrust, rotation_acceleration, substep_dt, xp)
+        return position, velocity, rotation, rotation_speed
+
+
+INTEGRATORS = {integrator.name: integrator for integrator in (Euler, SemiImplicitEuler, VelocityVerlet, RungeKutta4)}
@@ -0,0 +1,159 @@
+"""
+Optional compiled kernels for the RocketFleet, with Numba.
+A single loop over the flat arrays of the fleet does the physics step and the bounce off the world edges,
+and/or the screen transform of the hull, flame and thruster vertices: RocketFleet.step, screen_vertices and
+step_and_screen_vertices (which does both in one pass) use it when the numba backend is selected.
+Without Numba, RocketFleet uses its NumPy code; the kernel does the same floating point operations
+in the same order, so both backends give identical results.
+
+The backend is selected when this module is imported: "numba" if Numba is installed, "numpy" otherwise.
+Set the environment variable ROCKET_KERNELS to "numba" or "numpy" to force one, or call select_backend().
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import os
+import math
+import cmath
+import numpy
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+BACKENDS = ["numba", "numpy"] if numba else ["numpy"]
+BACKEND = None
+
+
+def select_backend(name=None):
+    """select the "numba" or "numpy" backend, None selects the fastest one that is available"""
+    global BACKEND
+    name = name or BACKENDS[0]
+    if name not in ("numba", "numpy"):
+        raise ValueError("unknown kernel backend: " + name)
+    if name not in BACKENDS:
+        raise ImportError("kernel backend {:s} requires Numba, which is not installed".format(name))
+    BACKEND = name
+
+
+def usable(fleet):
+    """whether the compiled kernels can step this fleet (not with an integrator or with world size arrays)"""
+    return BACKEND == "numba" and not fleet.integrator and numpy.ndim(fleet.world_width) == 0 and numpy.ndim(fleet.world_height) == 0
+
+
+def jit(function):
+    return numba.njit(cache=True)(function) if numba else function
+
+
+@jit
+def _screen_point(point, cos, sin, pivot, scale, x0, y0, world_height):
+    # the same operations as transform_vertices in rocketfleet, for one point
+    point -= pivot
+    return ((cos*point.real - sin*point.imag + pivot.real) * scale + x0,
+            world_height - ((sin*point.real + cos*point.imag + pivot.imag) * scale + y0))
+
+
+@jit
+def fleet_kernel(position, velocity, acceleration, thrust, rotation, rotation_speed, rotation_acceleration,
+                 engine_throttle, crashed, touchdown, left_thruster_on, right_thruster_on, world_width, world_height,
+                 step, bounce, transform, hull, flame_x, flame_y, thrusters, pivot, scale, hull_out, flame_out, thrusters_out):
+    # One pass over the rockets that does the step (the same operations as RocketFleet.step and bounce)
+    # and/or the screen transform of the vertices (the same as RocketFleet.screen_vertices).
+    # (Everything is in this single function: calling a function per rocket that gets the arrays is much slower.)
+    any_thrust = False
+    if step:
+        for value in thrust:
+            if value != 0:
+                any_thrust = True
+                break
+    for i in range(len(position)):
+        p = position[i]
+        r = rotation[i]
+        if step:
+            a = acceleration[i]
+            if any_thrust:
+                rotor = cmath.exp(r*1j)
+                t = thrust[i]
+                a = complex(a.real + (t.real*rotor.real - t.imag*rotor.imag), a.imag + (t.real*rotor.imag + t.imag*rotor.real))
+            v = velocity[i] + a
+            p += v
+            r += rotation_speed[i]
+            if not (0 < r < 2*math.pi):
+                r %= 2*math.pi      # (within that range the remainder would be r itself)
+            rs = rotation_speed[i] + rotation_acceleration[i]
+            acceleration[i] = 0
+            thrust[i] = 0
+            rotation_acceleration[i] = 0.0
+            if p.imag <= 0 and v != 0:
+                # below the ground and moving (the speed is only computed here, abs() is relatively slow)
+                if abs(v) < 2 and abs(r) < 0.15:
+                    # safe touchdown
+                    p = complex(p.real, 0.0)
+                    v = 0j
+                    r = 0.0
+                    rs = 0.0
+                    crashed[i] = False
+                    engine_throttle[i] = 0.0
+                    left_thruster_on[i] = False
+                    right_thruster_on[i] = False
+                else:
+                    crashed[i] = True
+            touchdown[i] = p.imag == 0 and v == 0
+            if p.real <= world_width/-2 or p.real >= world_width/2 or p.imag >= world_height:
+                crashed[i] = True
+            if bounce:
+                if not (-world_width/2 < p.real < world_width/2):
+                    v = -v.conjugate()
+                if not (0 < p.imag < world_height):
+                    v = v.conjugate()
+            position[i] = p
+            velocity[i] = v
+            rotation[i] = r
+            rotation_speed[i] = rs
+        if transform:
+            rotor = cmath.exp(r*1j)
+            cos, sin = rotor.real, rotor.imag
+            x0 = world_width / 2 + p.real
+            y0 = 10 + p.imag
+            for k in range(len(hull)):
+                hull_out[i, k, 0], hull_out[i, k, 1] = _screen_point(hull[k], cos, sin, pivot, scale, x0, y0, world_height)
+            throttle = engine_throttle[i]
+            for k in range(len(flame_x)):
+                point = complex(flame_x[k], 0.0 + flame_y[k]*throttle)
+                flame_out[i, k, 0], flame_out[i, k, 1] = _screen_point(point, cos, sin, pivot, scale, x0, y0, world_height)
+            for k in range(len(thrusters)):
+                thrusters_out[i, k, 0], thrusters_out[i, k, 1] = _screen_point(thrusters[k], cos, sin, pivot, scale, x0, y0, world_height)
+
+
+def _run(fleet, step, bounce, transform):
+    templates = fleet.templates
+    num_rockets = fleet.count if transform else 0
+    vertices = (numpy.empty((num_rockets, len(templates.hull), 2)), numpy.empty((num_rockets, len(templates.flame_x), 2)),
+                numpy.empty((num_rockets, len(templates.thrusters), 2)))
+    fleet_kernel(fleet.position, fleet.velocity, fleet.acceleration, fleet.thrust, fleet.rotation, fleet.rotation_speed,
+                 fleet.rotation_acceleration, fleet.engine_throttle, fleet.crashed, fleet.touchdown,
+                 fleet.left_thruster_on, fleet.right_thruster_on, float(fleet.world_width), float(fleet.world_height),
+                 step, bounce, transform, templates.hull, templates.flame_x, templates.flame_y, templates.thrusters,
+                 templates.pivot, float(templates.scale), *vertices)
+    return vertices
+
+
+def step(fleet, bounce=False):
+    """RocketFleet.step with the compiled kernel"""
+    _run(fleet, True, bounce, False)
+
+
+def screen_vertices(fleet):
+    """RocketFleet.screen_vertices with the compiled kernel"""
+    return _run(fleet, False, False, True)
+
+
+def step_and_screen_vertices(fleet, bounce=False):
+    """RocketFleet.step followed by screen_vertices, fused into one pass over the rockets"""
+    return _run(fleet, True, bounce, True)
+
+
+select_backend(os.environ.get("ROCKET_KERNELS"))
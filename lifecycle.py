@@ -0,0 +1,213 @@
+"""
+Rocket lifecycle management: rockets that crashed or that stand still on the ground are put to sleep.
+Sleeping rockets are no longer updated, and they are drawn from a cached list of static draw calls,
+so the cost per frame scales with the number of active rockets instead of the total number of rockets.
+A sleeping rocket wakes up again when it gets a force or control input through the group.
+In a world where the rockets bounce off the edges, a crashed rocket keeps moving; pass sleep_crashed=False there,
+so that only the rockets standing on the ground fall asleep and the simulation is the same as without sleeping.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import itertools
+import numpy
+
+
+def is_settled(rocket, sleep_crashed=True):
+    """a crashed rocket, or a rocket standing on the ground with its engine off, doesn't change anymore by itself"""
+    return (sleep_crashed and rocket.crashed) or (rocket.touchdown and not rocket.engine_throttle)
+
+
+class RocketGroup(object):
+    """
+    Active and sleeping sets of Rocket objects.
+    update() updates the active rockets with update_rocket (by default Rocket.update) and puts the settled ones to sleep.
+    The rockets are drawn in the order they were added, whether they're sleeping or not.
+    """
+    def __init__(self, rockets=(), update_rocket=None, sleep_crashed=True):
+        self.rockets = []
+        self.active = []
+        self.sleeping_calls = {}    # sleeping rocket -> its draw calls at the time it fell asleep
+        self.update_rocket = update_rocket or (lambda rocket: rocket.update())
+        self.sleep_crashed = sleep_crashed
+        for rocket in rockets:
+            self.add(rocket)
+
+    def __len__(self):
+        return len(self.rockets)
+
+    def __iter__(self):
+        return iter(self.rockets)
+
+    def add(self, rocket):
+        self.rockets.append(rocket)
+        if is_settled(rocket, self.sleep_crashed):
+            self._sleep(rocket)
+        else:
+            self.active.append(rocket)
+
+    def update(self):
+        update_rocket, sleep_crashed = self.update_rocket, self.sleep_crashed
+        for rocket in self.active:
+            update_rocket(rocket)
+        if any(is_settled(rocket, sleep_crashed) for rocket in self.active):
+            active = []
+            for rocket in self.active:
+                if is_settled(rocket, sleep_crashed):
+                    self._sleep(rocket)
+                else:
+                    active.append(rocket)
+            self.active = active
+
+    def _sleep(self, rocket):
+        self.sleeping_calls[rocket] = rocket.draw_calls()
+
+    def wake(self, rocket):
+        if self.sleeping_calls.pop(rocket, None) is not None:
+            self.active.append(rocket)
+
+    def apply_force(self, rocket, force):
+        self.wake(rocket)
+        rocket.apply_force(force)
+
+    def control(self, rocket, engine_throttle=None, left_thruster_on=None, right_thruster_on=None):
+        """change the engine and thruster controls of a rocket (waking it up)"""
+        self.wake(rocket)
+        if engine_throttle is not None:
+            rocket.engine_throttle = engine_throttle
+        if left_thruster_on is not None:
+            rocket.left_thruster_on = left_thruster_on
+        if right_thruster_on is not None:
+            rocket.right_thruster_on = right_thruster_on
+
+    def draw_calls(self):
+        sleeping_calls = self.sleeping_calls
+        calls = []
+        for rocket in self.rockets:
+            rocket_calls = sleeping_calls.get(rocket)
+            calls.extend(rocket.draw_calls() if rocket_calls is None else rocket_calls)
+        return calls
+
+
+class FleetLifecycle(object):
+    """
+    Active and sleeping rockets of a RocketFleet. The rockets in the fleet are kept partitioned:
+    the active ones are at the front, so step() only has to step the view on the first num_active rockets.
+    Rockets are only moved around in the fleet when they fall asleep (to the front of the sleeping part) or wake up
+    (swapped with the rockets at the front of the sleeping part), and they are drawn in fleet order.
+    Because of this, use slots[i] for the current index in the fleet of the i-th rocket that was appended.
+    Forces and controls given through this object wake the rockets up; they take the append-order numbers.
+    """
+    def __init__(self, fleet, sleep_crashed=True):
+        self.fleet = fleet
+        self.sleep_crashed = sleep_crashed
+        self.num_active = 0
+        self.ids = numpy.zeros(0, dtype=numpy.intp)     # for every index in the fleet, the number of the rocket there
+        self.slots = numpy.zeros(0, dtype=numpy.intp)   # for every rocket number, its index in the fleet
+        self.sleeping_calls = []    # the draw calls of every sleeping rocket, in fleet order
+        self._sleeping_flat = []    # all of those draw calls in one list (None when it has to be rebuilt)
+        self._active_view = None
+        self._sync()
+
+    def _sync(self):
+        # rockets appended to the fleet are moved into the active part, unless they're already settled
+        old_count, count = len(self.ids), self.fleet.count
+        if old_count < count:
+            self.ids = numpy.concatenate([self.ids, numpy.arange(old_count, count)])
+            self.slots = numpy.concatenate([self.slots, numpy.arange(old_count, count)])
+            new = self.fleet.view(old_count, count)
+            settled = self._settled(new)
+            settled_calls = iter(new.take(settled).draw_calls(grouped=True))
+            self.sleeping_calls.extend(next(settled_calls) if rocket_settled else None for rocket_settled in settled)
+            self._activate(numpy.flatnonzero(~settled) + old_count)
+            self._sleeping_flat = None
+
+    def _permute(self, start, stop, order):
+        """reorder the rockets in start:stop of the fleet, order holds the indices relative to start"""
+        for name, _ in self.fleet.fields:
+            array = self.fleet.arrays[name]
+            array[start:stop] = array[start:stop][order]
+        self.ids[start:stop] = self.ids[start:stop][order]
+        self.slots[self.ids[start:stop]] = numpy.arange(start, stop)
+
+    def _activate(self, indices):
+        """make the sleeping rockets at the (unique) fleet indices active, by swapping them to the front of the sleeping part"""
+        count = len(indices)
+        if not count:
+            return
+        front = numpy.arange(self.num_active, self.num_active + count)
+        outside = indices[indices >= self.num_active + count]
+        free = front[~numpy.isin(front, indices)]
+        for name, _ in self.fleet.fields:
+            array = self.fleet.arrays[name]
+            array[outside], array[free] = array[free], array[outside]
+        self.ids[outside], self.ids[free] = self.ids[free], self.ids[outside]
+        self.slots[self.ids[outside]] = outside
+        self.slots[self.ids[free]] = free
+        sleeping_calls = self.sleeping_calls
+        for i, j in zip((outside - self.num_active).tolist(), (free - self.num_active).tolist()):
+            sleeping_calls[i], sleeping_calls[j] = sleeping_calls[j], sleeping_calls[i]
+        del sleeping_calls[:count]
+        self.num_active += count
+        self._active_view = None
+
+    def _settled(self, fleet):
+        settled = fleet.touchdown & (fleet.engine_throttle == 0)
+        return settled | fleet.crashed if self.sleep_crashed else settled
+
+    def active(self):
+        """the fleet view on the active rockets"""
+        self._sync()
+        if self._active_view is None:
+            self._active_view = self.fleet.view(0, self.num_active)
+        return self._active_view
+
+    def step(self, bounce=False):
+        active = self.active()
+        active.step(bounce)
+        settled = self._settled(active)
+        if settled.any():
+            # the rockets that fell asleep go to the end of the active part, that becomes the front of the sleeping part
+            indices = numpy.arange(self.num_active)
+            self._permute(0, self.num_active, numpy.concatenate([indices[~settled], indices[settled]]))
+            old_num_active = self.num_active
+            self.num_active -= int(settled.sum())
+            self._active_view = None
+            self.sleeping_calls[0:0] = self.fleet.view(self.num_active, old_num_active).draw_calls(grouped=True)
+            self._sleeping_flat = None
+
+    def wake(self, rockets):
+        """wake up the rockets with the given numbers (in order of appending); this costs the number of woken rockets"""
+        self._sync()
+        slots = numpy.unique(self.slots[rockets])
+        slots = slots[slots >= self.num_active]
+        if len(slots):
+            self._activate(slots)
+            self._sleeping_flat = None
+
+    def apply_force(self, rockets, force):
+        self.wake(rockets)
+        self.fleet.acceleration[self.slots[rockets]] += force
+
+    def apply_gravity(self, gravity):
+        """gravity only acts on the active rockets, it doesn't wake the sleeping ones"""
+        self.active().apply_gravity(gravity)
+
+    def control(self, rockets, engine_throttle=None, left_thruster_on=None, right_thruster_on=None):
+        """change the engine and thruster controls of rockets (waking them up)"""
+        self.wake(rockets)
+        slots = self.slots[rockets]
+        if engine_throttle is not None:
+            self.fleet.engine_throttle[slots] = engine_throttle
+        if left_thruster_on is not None:
+            self.fleet.left_thruster_on[slots] = left_thruster_on
+        if right_thruster_on is not None:
+            self.fleet.right_thruster_on[slots] = right_thruster_on
+
+    def draw_calls(self):
+        """the draw calls of all rockets in fleet order: the active rockets, then the cached ones of the sleeping rockets"""
+        active_calls = self.active().draw_calls()
+        if self._sleeping_flat is None:
+            self._sleeping_flat = list(itertools.chain.from_iterable(self.sleeping_calls))
+        return active_calls + self._sleeping_flat
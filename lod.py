@@ -0,0 +1,74 @@
+"""
+Level of detail for drawing large numbers of rockets.
+Every rocket gets one of three levels: full detail, simplified (a triangle hull, a line for the
+engine flame and no thrusters, see Rocket.draw_calls) or a point sprite. Point sprites are aggregated:
+the rockets drawn as points share one small square per sprite-sized cell of the screen.
+The level depends on the density of rockets on the screen (the number of rockets in the same grid cell)
+and on a budget for the number of rockets at full and at simplified detail. In auto mode the budget
+follows the measured frame time: it shrinks when frames take longer than the frame budget and grows
+back slowly when there is time to spare.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+
+
+FULL, SIMPLE, POINT = 0, 1, 2
+
+
+class LevelOfDetail(object):
+    """
+    Rockets in a screen cell of cell_size pixels with at least simple_density rockets are simplified,
+    with at least point_density rockets they become point sprites.
+    At most max_full rockets get full detail and at most max_simple get simplified, the rest are drawn as points.
+    With a frame_budget (seconds), those two maximums are scaled automatically by adapt().
+    """
+    def __init__(self, cell_size=24, simple_density=3, point_density=8, max_full=300, max_simple=2000, frame_budget=None):
+        self.cell_size = cell_size
+        self.simple_density = simple_density
+        self.point_density = point_density
+        self.max_full = max_full
+        self.max_simple = max_simple
+        self.frame_budget = frame_budget
+        self.scale = 1.0
+        self.min_scale = 0.01
+        self.counts = [0, 0, 0]     # number of rockets per level, in the last frame
+
+    def levels(self, positions):
+        """the level of detail for every (x, y) screen position of a rocket"""
+        cell_size = self.cell_size
+        cells = [(int(x // cell_size), int(y // cell_size)) for x, y in positions]
+        density = {}
+        for cell in cells:
+            density[cell] = density.get(cell, 0) + 1
+        full_budget = int(self.max_full * self.scale)
+        simple_budget = int(self.max_simple * self.scale)
+        levels = []
+        counts = [0, 0, 0]
+        for cell in cells:
+            count = density[cell]
+            level = POINT if count >= self.point_density else SIMPLE if count >= self.simple_density else FULL
+            if level == FULL and counts[FULL] >= full_budget:
+                level = SIMPLE
+            if level == SIMPLE and counts[SIMPLE] >= simple_budget:
+                level = POINT
+            counts[level] += 1
+            levels.append(level)
+        self.counts = counts
+        return levels
+
+    def adapt(self, frame_time):
+        """auto mode: shrink the detail budget quickly when the frame took too long, grow it slowly otherwise"""
+        if self.frame_budget:
+            if frame_time > self.frame_budget:
+                self.scale = max(self.min_scale, self.scale * 0.8)
+            elif frame_time < self.frame_budget * 0.8:
+                self.scale = min(1.0, self.scale * 1.02)
+
+
+def point_sprite_calls(positions, size=3, color="lightgrey"):
+    """draw calls of a square of the given size in pixels for every cell of that size that has rockets in it"""
+    cells = sorted({(int(x // size), int(y // size)) for x, y in positions})
+    return [("create_rectangle", (cx*size, cy*size, cx*size+size-1, cy*size+size-1), {"fill": color, "outline": ""})
+            for cx, cy in cells]
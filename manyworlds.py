@@ -0,0 +1,126 @@
+"""
+Many independent worlds in one process: the landing game as a vectorized environment.
+Every world has one rocket, its own size, launchpads, gravity and reset state, and all worlds
+are stepped together in a few NumPy operations on a RocketFleet, so there is no Python code per world
+in the inner loop. The interface is like a gym vector environment: reset() and step(actions) work on arrays,
+and worlds whose episode ended (crashed, landed or out of time) are reset automatically by step().
+
+Actions: array of shape (n, 3): engine throttle (0, 1 or 2 like the game, or anything in between),
+left thruster on, right thruster on (nonzero means on). As in the game, the left thruster turns the rocket
+the negative way, the right thruster the positive way.
+Observations: array of shape (n, 6): horizontal distance to the target launchpad, altitude,
+horizontal and vertical velocity, rotation (-pi..pi) and rotation speed.
+Rewards: the progress towards the target launchpad in the step (in pixels), plus 100 for landing on the target
+launchpad and minus 100 for crashing.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import math
+import numpy
+from rocketsimulator import Launchpad
+from rocketfleet import RocketFleet
+
+
+class RocketWorlds(object):
+    """
+    num_worlds landing games. world_width, world_height, gravity and launchpad_offset can be a single value
+    for all worlds or an array with a value per world; the launchpad offset defaults to 1/6th of the world width
+    like in RocketSimulator. The rocket starts on the start launchpad, unless the reset_... arrays are changed.
+    """
+    landing_reward = 100.0
+    crash_reward = -100.0
+
+    def __init__(self, num_worlds, world_width=1000, world_height=600, gravity=0.1, launchpad_offset=None, max_steps=3000):
+        self.num_worlds = num_worlds
+        self.world_width = numpy.broadcast_to(numpy.asarray(world_width, dtype=numpy.float64), (num_worlds,)).copy()
+        self.world_height = numpy.broadcast_to(numpy.asarray(world_height, dtype=numpy.float64), (num_worlds,)).copy()
+        self.gravity = numpy.broadcast_to(numpy.asarray(gravity, dtype=numpy.float64), (num_worlds,)).copy()
+        if launchpad_offset is None:
+            launchpad_offset = self.world_width / 6
+        launchpad_offset = numpy.broadcast_to(numpy.asarray(launchpad_offset, dtype=numpy.float64), (num_worlds,))
+        self.start_x = launchpad_offset - self.world_width/2
+        self.target_x = self.world_width/2 - launchpad_offset
+        self.max_steps = max_steps
+        self.reset_position = self.start_x + 0j
+        self.reset_velocity = numpy.zeros(num_worlds, dtype=numpy.complex128)
+        self.reset_rotation = numpy.zeros(num_worlds)
+        self.reset_rotation_speed = numpy.zeros(num_worlds)
+        # one rocket per world: the fleet gets the world size per rocket, its physics work the same on arrays
+        self.fleet = RocketFleet(self.world_width, self.world_height, num_worlds)
+        self.fleet.set_count(num_worlds)
+        self.steps = numpy.zeros(num_worlds, dtype=numpy.int64)
+        self.airborne = numpy.zeros(num_worlds, dtype=numpy.bool_)
+        self.all_worlds = numpy.ones(num_worlds, dtype=numpy.bool_)
+        self.episodes = 0
+        self.reset()
+
+    def reset(self, worlds=None):
+        """reset the given worlds (a boolean mask or indices, default all) to their reset state, returns the observations"""
+        worlds = self.all_worlds if worlds is None else worlds
+        fleet = self.fleet
+        fleet.position[worlds] = self.reset_position[worlds]
+        fleet.velocity[worlds] = self.reset_velocity[worlds]
+        fleet.rotation[worlds] = self.reset_rotation[worlds] % (2*math.pi)
+        fleet.rotation_speed[worlds] = self.reset_rotation_speed[worlds]
+        fleet.acceleration[worlds] = 0
+        fleet.thrust[worlds] = 0
+        fleet.rotation_acceleration[worlds] = 0
+        fleet.engine_throttle[worlds] = 0
+        fleet.left_thruster_on[worlds] = False
+        fleet.right_thruster_on[worlds] = False
+        fleet.crashed[worlds] = False
+        fleet.touchdown[worlds] = (fleet.position.imag[worlds] == 0) & (fleet.velocity[worlds] == 0)
+        self.airborne[worlds] = ~fleet.touchdown[worlds]
+        self.steps[worlds] = 0
+        return self.observations()
+
+    def observations(self):
+        fleet = self.fleet
+        observations = numpy.empty((self.num_worlds, 6))
+        observations[:, 0] = self.target_x - fleet.position.real
+        observations[:, 1] = fleet.position.imag
+        observations[:, 2] = fleet.velocity.real
+        observations[:, 3] = fleet.velocity.imag
+        observations[:, 4] = (fleet.rotation + math.pi) % (2*math.pi) - math.pi
+        observations[:, 5] = fleet.rotation_speed
+        return observations
+
+    def step(self, actions):
+        """
+        Steps all worlds with the given actions. Returns observations, rewards, dones and an info dict with the
+        boolean arrays "landed" (on the target launchpad), "crashed" and "timeout", and the "final_observations"
+        of the worlds that are done; the observations of those worlds are of their new episode already.
+        """
+        fleet = self.fleet
+        actions = numpy.asarray(actions, dtype=numpy.float64)
+        throttle, left, right = actions[:, 0], actions[:, 1] != 0, actions[:, 2] != 0
+        distance = numpy.abs(self.target_x - fleet.position.real)
+        # the forces, like RocketSimulator.update applies them
+        fleet.engine_throttle[:] = throttle
+        fleet.left_thruster_on[:] = left
+        fleet.right_thruster_on[:] = right
+        fleet.apply_thrust(0.2j * throttle)
+        fleet.apply_rotation(numpy.where(right, 0.005, 0.0) - numpy.where(left, 0.005, 0.0))
+        fleet.acceleration -= numpy.where(fleet.touchdown, 0.0, self.gravity) * 1j
+        fleet.step()
+        self.steps += 1
+        touchdown = fleet.touchdown & self.airborne
+        self.airborne |= ~fleet.touchdown
+        offset = fleet.position.real - self.target_x
+        on_target = (-Launchpad.width/2 < offset) & (offset < Launchpad.width/2)    # like Launchpad.is_rocket_above
+        landed = touchdown & on_target
+        crashed = fleet.crashed.copy()
+        timeout = ~crashed & ~touchdown & (self.steps >= self.max_steps)
+        rewards = distance - numpy.abs(self.target_x - fleet.position.real)
+        rewards[landed] += self.landing_reward
+        rewards[crashed] += self.crash_reward
+        dones = crashed | touchdown | timeout
+        info = {"landed": landed, "crashed": crashed, "timeout": timeout}
+        observations = self.observations()
+        if dones.any():
+            info["final_observations"] = observations[dones]
+            self.episodes += int(dones.sum())
+            observations = self.reset(dones)
+        return observations, rewards, dones, info
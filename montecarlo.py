@@ -0,0 +1,138 @@
+"""
+Headless batch runner for the landing game: flies many control scripts and/or randomized
+initial conditions with the RocketSimulator until the rocket crashed or touched down again,
+distributed over a process pool. The results stream out as the chunks complete.
+
+A trial is a dict with (all optional):
+    "id":       anything, returned in the result
+    "initial":  dict with the initial "position" and "velocity" (x, y tuples), "rotation" and "rotation_speed"
+    "script":   list of (step, key, pressed) control events, sorted on step; key as for RocketSimulator.keypress
+The result is a dict with the id, the outcome ("touchdown", "crashed" or "timeout"), the pad it ended on
+("alpha", "beta" or None), the throttle time (seconds at 100% throttle, a fuel equivalent), the thruster time,
+and the flight duration in steps and in seconds.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import collections
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from vectors import Vector2D
+from rocketsimulator import RocketSimulator, RocketSimulatorWindow
+
+
+def run_trial(trial, world_width=1000, world_height=600, max_steps=5000, physics_rate=RocketSimulatorWindow.physics_rate):
+    simulator = RocketSimulator(world_width, world_height)
+    rocket = simulator.rocket
+    initial = trial.get("initial")
+    if initial:
+        rocket.position = Vector2D(initial.get("position", rocket.position.xy))
+        rocket.velocity = Vector2D(initial.get("velocity", (0, 0)))
+        rocket.rotation = initial.get("rotation", 0.0)
+        rocket.rotation_speed = initial.get("rotation_speed", 0.0)
+        rocket.touchdown = False
+        rocket.previous_position = rocket.position.vec
+    script = trial.get("script", [])
+    event_index = 0
+    airborne = not rocket.touchdown
+    throttle_steps = thruster_steps = 0.0
+    outcome = "timeout"
+    for step in range(max_steps):
+        while event_index < len(script) and script[event_index][0] <= step:
+            _, key, pressed = script[event_index]
+            if pressed:
+                simulator.keypress(key)
+            else:
+                simulator.keyrelease(key)
+            event_index += 1
+        throttle_steps += rocket.engine_throttle
+        thruster_steps += rocket.left_thruster_on + rocket.right_thruster_on
+        simulator.update()
+        if rocket.crashed:
+            outcome = "crashed"
+            break
+        if rocket.touchdown:
+            if airborne:
+                outcome = "touchdown"
+                break
+        else:
+            airborne = True
+    return {
+        "id": trial.get("id"),
+        "outcome": outcome,
+        "pad": simulator.landing_pad() if outcome == "touchdown" else None,
+        "throttle_time": throttle_steps / physics_rate,
+        "thruster_time": thruster_steps / physics_rate,
+        "steps": simulator.steps,
+        "duration": simulator.steps / physics_rate,
+    }
+
+
+def run_chunk(trials, world_width, world_height, max_steps):
+    return [run_trial(trial, world_width, world_height, max_steps) for trial in trials]
+
+
+def run_batch(trials, world_width=1000, world_height=600, max_steps=5000, workers=None, chunksize=50):
+    """
+    Generator that yields the result of every trial, in order of completion (not the order of the trials).
+    The trials are sent to the worker processes in chunks of chunksize, to keep the overhead per trial low.
+    With workers=0 the trials run in this process (in order).
+    """
+    trials = list(trials)
+    chunks = [trials[i:i+chunksize] for i in range(0, len(trials), chunksize)]
+    if workers == 0:
+        for chunk in chunks:
+            for result in run_chunk(chunk, world_width, world_height, max_steps):
+                yield result
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_chunk, chunk, world_width, world_height, max_steps) for chunk in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+
+def random_trials(num_trials, world_width=1000, seed=None):
+    """
+    Randomized trials: the rocket starts somewhere in the air above the ground, drifting slowly,
+    and a random script pulses the main engine and the thrusters.
+    """
+    rnd = random.Random(seed)
+    trials = []
+    for trial_id in range(num_trials):
+        initial = {
+            "position": (rnd.uniform(-world_width/2+50, world_width/2-50), rnd.uniform(5, 150)),
+            "velocity": (rnd.uniform(-1, 1), rnd.uniform(-1, 1)),
+            "rotation": rnd.uniform(-0.2, 0.2) % (2*math.pi),
+            "rotation_speed": rnd.uniform(-0.01, 0.01),
+        }
+        script = []
+        step = 0
+        for _ in range(rnd.randint(2, 10)):
+            step += rnd.randint(5, 40)
+            key = rnd.choice(["shift", "shift", "control", "left", "right"])
+            script.append((step, key, True))
+            script.append((step + rnd.randint(1, 10), key, False))
+        script.sort(key=lambda event: event[0])
+        trials.append({"id": trial_id, "initial": initial, "script": script})
+    return trials
+
+
+if __name__ == "__main__":
+    num_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    trials = random_trials(num_trials, seed=42)
+    outcomes = collections.Counter()
+    start = time.time()
+    for count, result in enumerate(run_batch(trials, workers=workers), start=1):
+        outcomes[(result["outcome"], result["pad"])] += 1
+        if count % 500 == 0:
+            print("{:d} trials done...".format(count))
+    duration = time.time() - start
+    print("{:d} trials in {:.2f} sec ({:.0f} trials/sec)".format(num_trials, duration, num_trials/duration))
+    for (outcome, pad), count in sorted(outcomes.items(), key=lambda item: -item[1]):
+        print("  {:10s} {:6s} {:6d}".format(outcome, pad or "", count))
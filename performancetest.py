@@ -1,21 +1,27 @@
 """
 A rocket animation performance test
+With many rockets, the level of detail is lowered automatically to keep up the frame rate (press L to toggle).
+Press C to draw the rockets through a draw call cache (drawcache.py); it is slower when the rockets keep turning.
 
 Copyright by Irmen de Jong (irmen@razorvine.net).
 Open source software license: MIT.
 """
 from __future__ import print_function, division
-import random
 import time
-from vectors import Vector2D
-from tkanimation import AnimationWindow, tkinter
-from rocketsimulator import Rocket
+from tkanimation import AnimationWindow, RetainedCanvas, tkinter
+from drawcache import DrawCallCache
+from scenarios import random_rocket
+from lod import LevelOfDetail, point_sprite_calls, FULL, SIMPLE, POINT
 
 
 class PerformanceTestWindow(AnimationWindow):
     def setup(self):
         self.cwidth, self.cheight = int(self.canvas["width"]), int(self.canvas["height"])
         self.set_frame_rate(60)
+        self.retained = RetainedCanvas(self.canvas)
+        self.lod = LevelOfDetail(frame_budget=self.frame_time*0.8)
+        self.use_lod = True
+        self.draw_cache = None      # a DrawCallCache that all rockets use, or None
         self.rockets = []
         self.framecounter = 0
         self.start_time = time.time()
@@ -23,24 +29,56 @@ class PerformanceTestWindow(AnimationWindow):
             self.add_rocket()
 
     def draw(self):
-        self.update()
-        self.canvas.delete(tkinter.ALL)
-        for rocket in self.rockets:
-            rocket.draw(self.canvas)
+        frame_start = time.perf_counter()
+        with self.profiler.phase("update"):
+            self.update()
+        with self.profiler.phase("drawcalls"):
+            if self.use_lod:
+                positions = [rocket.screen_position() for rocket in self.rockets]
+                levels = self.lod.levels(positions)
+                rocket_calls = [(rocket, rocket.draw_calls(simplified=level == SIMPLE))
+                                for rocket, level in zip(self.rockets, levels) if level != POINT]
+                points = [position for position, level in zip(positions, levels) if level == POINT]
+            else:
+                rocket_calls = [(rocket, rocket.draw_calls()) for rocket in self.rockets]
+                points = []
+        self.retained.begin_frame()
+        with self.profiler.phase("items"):
+            for rocket, calls in rocket_calls:
+                self.retained.draw_calls(rocket, calls)
+            if points:
+                self.retained.draw_calls("points", point_sprite_calls(points))
         # framecounter
         if time.time()-self.start_time:
             fps = round(self.framecounter / (time.time() - self.start_time))
         else:
             fps = 0
-        self.canvas.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(len(self.rockets), fps), fill="yellow", anchor=tkinter.NE)
-        self.canvas.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        hud = self.retained.group("hud")
+        hud.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(len(self.rockets), fps), fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        if self.use_lod:
+            counts = self.lod.counts
+            text = "LOD full/simple/points: {:d}/{:d}/{:d} ".format(counts[FULL], counts[SIMPLE], counts[POINT])
+        else:
+            text = "LOD off "
+        hud.create_text(self.cwidth, 60, text=text + "(L to toggle) ", fill="yellow", anchor=tkinter.NE)
+        if self.draw_cache:
+            text = "draw cache: " + self.draw_cache.stats_text()
+        else:
+            text = "draw cache off"
+        hud.create_text(self.cwidth, 90, text=text + " (C to toggle) ", fill="yellow", anchor=tkinter.NE)
+        with self.profiler.phase("hide"):
+            self.retained.end_frame()
+        if self.root:
+            # let Tk render the canvas now, so the measured frame time includes it
+            with self.profiler.phase("render"):
+                self.root.update_idletasks()
+        if self.use_lod:
+            self.lod.adapt(time.perf_counter() - frame_start)
 
     def add_rocket(self):
-        rocket = Rocket(self.cwidth, self.cheight)
-        rocket.rotation_speed = random.uniform(-.3,.3)
-        rocket.engine_throttle = 1
-        rocket.position = Vector2D((random.randint(-self.cwidth/2,self.cwidth/2), random.randint(0,self.cheight)))
-        rocket.velocity = Vector2D((random.uniform(-10,10), random.uniform(-4,4)))
+        rocket = random_rocket(self.cwidth, self.cheight)
+        rocket.draw_cache = self.draw_cache
         self.rockets.append(rocket)
 
     def keypress(self, char, mouseposition):
@@ -49,6 +87,12 @@ class PerformanceTestWindow(AnimationWindow):
                 self.add_rocket()
             self.start_time = time.time()
             self.framecounter = 0
+        elif char.lower() == 'l':
+            self.use_lod = not self.use_lod
+        elif char.lower() == 'c':
+            self.draw_cache = None if self.draw_cache else DrawCallCache.for_rockets(len(self.rockets))
+            for rocket in self.rockets:
+                rocket.draw_cache = self.draw_cache
 
     def update(self):
         self.framecounter += 1
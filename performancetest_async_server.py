@@ -0,0 +1,42 @@
+"""
+A rocket animation performance test
+This is the asyncio simulation server: one simulation that any number of viewers can watch at the same time.
+Start this in a separate process, then start one or more performancetest_stream.py viewers:
+    performancetest_stream.py localhost:33446 [fps]      or      performancetest_stream.py /tmp/rockets.sock [fps]
+Usage: performancetest_async_server.py [unix socket path]
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import asyncio
+import sys
+from scenarios import random_rocket
+from rocketfleet import RocketFleet
+from simulationserver import SimulationServer
+
+
+class RocketSimulation(object):
+    def __init__(self, cwidth, cheight, start_num_rockets=10):
+        self.cwidth = cwidth
+        self.cheight = cheight
+        self.rockets = RocketFleet(cwidth, cheight)
+        self.add_rockets(start_num_rockets)
+
+    def add_rockets(self, count):
+        for _ in range(count):
+            self.add_rocket()
+
+    def add_rocket(self):
+        rocket = random_rocket(self.cwidth, self.cheight)
+        rocket.engine_throttle = 0.0    # the viewers switch the engines on (the server applies the thrust)
+        self.rockets.append(rocket)
+
+
+if __name__ == "__main__":
+    simulation = RocketSimulation(1000, 600)
+    server = SimulationServer(simulation.rockets, frame_rate=60)
+    server.add_rockets_function = simulation.add_rockets
+    unix_path = sys.argv[1] if len(sys.argv) > 1 else None
+    print("simulation server running on port 33446" + (" and on " + unix_path if unix_path else ""))
+    asyncio.run(server.serve(("localhost", 33446), unix_path))
@@ -0,0 +1,66 @@
+"""
+A rocket collision detection performance test (no display output).
+Checks the uniform grid broadphase against naive pairwise checks, and shows how it scales
+with the number of rockets (at a constant density of rockets in the world).
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import math
+import random
+import time
+import numpy
+from vectors import Vector2D
+from rocketsimulator import Rocket
+from rocketfleet import RocketFleet
+from collisions import bounding_circle, find_collisions, collide_fleet
+
+
+class PerformanceTest(object):
+    rockets_per_megapixel = 200
+
+    def run(self):
+        self.check_broadphase(2000)
+        for num_rockets in (1000, 5000, 10000, 20000, 50000):
+            fleet = self.create_fleet(num_rockets)
+            start_time = time.time()
+            i, _ = find_collisions(fleet.position, fleet.rotation, narrowphase=False)
+            broadphase_duration = time.time() - start_time
+            start_time = time.time()
+            i, _ = collide_fleet(fleet)
+            total_duration = time.time() - start_time
+            print("{:6d} rockets: broadphase {:7.2f} ms, with narrowphase {:7.2f} ms ({:.2f} us per rocket), {:d} collisions"
+                  .format(num_rockets, broadphase_duration*1000, total_duration*1000, total_duration/num_rockets*1e6, len(i)))
+
+    def check_broadphase(self, num_rockets):
+        fleet = self.create_fleet(num_rockets)
+        center_offset, radius = bounding_circle()
+        centers = fleet.position + center_offset
+        start_time = time.time()
+        distances = numpy.abs(centers[:, numpy.newaxis] - centers[numpy.newaxis, :])
+        naive = set(zip(*[a.tolist() for a in numpy.nonzero(numpy.triu(distances < 2*radius, 1))]))
+        naive_duration = time.time() - start_time
+        start_time = time.time()
+        grid = set(zip(*[a.tolist() for a in find_collisions(fleet.position, fleet.rotation, narrowphase=False)]))
+        grid_duration = time.time() - start_time
+        print("broadphase check with {:d} rockets: {:d} pairs, {}; naive {:.2f} ms, grid {:.2f} ms"
+              .format(num_rockets, len(grid), "same as naive" if grid == naive else "DIFFERENT FROM NAIVE!",
+                      naive_duration*1000, grid_duration*1000))
+        assert grid == naive
+
+    def create_fleet(self, num_rockets):
+        random.seed(42)
+        size = int(math.sqrt(num_rockets / self.rockets_per_megapixel) * 1000)
+        fleet = RocketFleet(size, size, num_rockets)
+        for _ in range(num_rockets):
+            rocket = Rocket(size, size)
+            rocket.rotation = random.uniform(0, 2*math.pi)
+            rocket.position = Vector2D((random.uniform(-size/2, size/2), random.uniform(0, size)))
+            fleet.append(rocket)
+        return fleet
+
+
+if __name__ == "__main__":
+    test = PerformanceTest()
+    test.run()
@@ -0,0 +1,115 @@
+"""
+A rocket drawing performance test (no display output) of the draw call cache (drawcache.py).
+It times Rocket.draw_calls() with and without the cache (the best of 3 runs), and reports the cache hits,
+misses and evictions and the maximum positional error of the drawn points compared to exact drawing:
+  - for the game: the rocket hops off launchpad ALPHA and back onto it and waits there, drawn at 60 fps with
+    the physics at 30 Hz (so every other frame is interpolated), like RocketSimulatorWindow does it
+  - for the swarm tests: the scenarios of the benchmark harness, with different cache capacities, and rockets
+    that don't turn but whose engine throttle varies a little every frame (the cache quantizes the throttle)
+The cache is slower than exact drawing in the thrusters scenario, and with a capacity too small for the swarm,
+see drawcache.py. The last capacity of every swarm test is the one DrawCallCache.for_rockets() picks.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import time
+import math
+from rocketsimulator import RocketSimulator
+from drawcache import DrawCallCache
+from scenarios import swarm, resting, thrusters, hop
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        print("the game, a hop of the rocket drawn at 60 fps:")
+        exact_calls, exact_duration = self.best_of(3, self.draw_game, None)
+        for capacity in (64, 4096):
+            cache = DrawCallCache(capacity)
+            calls, duration = self.best_of(3, self.draw_game, cache)
+            self.report(cache, exact_calls, exact_duration, calls, duration)
+        num_frames = 50
+        for name, scenario in (("swarm", swarm), ("resting", resting), ("thrusters", thrusters), ("throttling", self.throttling)):
+            print("{:d} frames with 500 rockets, {:s}:".format(num_frames, name))
+            exact_calls, exact_duration = self.best_of(3, self.draw_rockets, None, scenario, num_frames)
+            for cache in (DrawCallCache(256), DrawCallCache(16384), DrawCallCache.for_rockets(500)):
+                calls, duration = self.best_of(3, self.draw_rockets, cache, scenario, num_frames)
+                self.report(cache, exact_calls, exact_duration, calls, duration)
+
+    def best_of(self, repeats, draw_function, cache, *args):
+        # the fastest of a few runs, each one with an empty cache
+        results = []
+        for _ in range(repeats):
+            if cache:
+                cache.clear()
+            results.append(draw_function(cache, *args))
+        return results[0][0], min(duration for _, duration in results)
+
+    def report(self, cache, exact_calls, exact_duration, calls, duration):
+        print("   capacity {:5d}: speedup {:.2f}x, max positional error {:.3f} pixels, {:s}"
+              .format(cache.capacity, exact_duration/duration, self.max_error(exact_calls, calls), cache.stats_text()))
+
+    def draw_game(self, cache):
+        simulator = RocketSimulator(1000, 600)
+        rocket = simulator.rocket
+        rocket.draw_cache = cache
+        all_calls = []
+        duration = 0.0
+        for step in range(1200):
+            hop(simulator)
+            simulator.update()
+            for alpha in (0.5, 1.0):
+                start_time = time.perf_counter()
+                calls = rocket.draw_calls(alpha)
+                duration += time.perf_counter() - start_time
+                all_calls.append(calls)
+        assert simulator.landing_pad() == "alpha" and rocket.touchdown
+        return all_calls, duration
+
+    def throttling(self, num_rockets, cwidth, cheight, seed=None):
+        # rockets that don't turn, their engine throttle is varied every frame in draw_rockets
+        rockets = swarm(num_rockets, cwidth, cheight, seed)
+        for rocket in rockets:
+            rocket.rotation_speed = 0.0
+        return rockets
+
+    def draw_rockets(self, cache, scenario, num_frames):
+        rockets = scenario(500, self.cwidth, self.cheight, seed=42)
+        for rocket in rockets:
+            rocket.draw_cache = cache
+        all_calls = []
+        duration = 0.0
+        for frame in range(num_frames):
+            for rocket in rockets:
+                rocket.update()
+                if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
+                    rocket.velocity.flipx()
+                if not(0 < rocket.position.y < self.cheight):
+                    rocket.velocity.flipy()
+            if scenario == self.throttling:
+                for index, rocket in enumerate(rockets):
+                    rocket.engine_throttle = 1.0 + 0.05 * math.sin(frame * 0.2 + index)
+            start_time = time.perf_counter()
+            calls = [rocket.draw_calls() for rocket in rockets]
+            duration += time.perf_counter() - start_time
+            if frame % 10 == 0:
+                all_calls.extend(calls)     # (keeping all of them makes the garbage collector dominate the timings)
+        return all_calls, duration
+
+    def max_error(self, calls1, calls2):
+        error = 0.0
+        for rocket_calls1, rocket_calls2 in zip(calls1, calls2):
+            assert [(method, options) for method, _, options in rocket_calls1] == [(method, options) for method, _, options in rocket_calls2]
+            for (method, args1, _), (_, args2, _) in zip(rocket_calls1, rocket_calls2):
+                if method in ("create_polygon", "create_line"):
+                    args1, args2 = [complex(*xy) for xy in args1[0]], [complex(*xy) for xy in args2[0]]
+                else:
+                    args1, args2 = [complex(*args1[i:i+2]) for i in (0, 2)], [complex(*args2[i:i+2]) for i in (0, 2)]
+                error = max(error, max(abs(p1-p2) for p1, p2 in zip(args1, args2)))
+        return error
+
+
+if __name__ == "__main__":
+    PerformanceTest().run()
@@ -0,0 +1,139 @@
+"""
+A rocket simulation performance test (no display output) of the NumPy RocketFleet.
+It first checks that the fleet gives the same results as updating individual Rocket objects,
+and that letting settled rockets sleep doesn't change the rockets that remain active.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import random
+import time
+from vectors import Vector2D
+from rocketsimulator import Rocket
+from rocketfleet import RocketFleet
+from lifecycle import FleetLifecycle
+from scenarios import random_rocket, resting
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        self.check_equivalence(500, 300)
+        self.check_draw_calls(500)
+        self.check_sleeping(2000, 100)
+        num_frames = 200
+        for num_rockets in (200, 1000, 10000, 50000):
+            fleet = RocketFleet(self.cwidth, self.cheight, num_rockets)
+            for _ in range(num_rockets):
+                fleet.append(self.create_rocket())
+            print("simulating {:d} frames with {:d} rockets...".format(num_frames, num_rockets))
+            start_time = time.time()
+            for _ in range(num_frames):
+                fleet.step(bounce=True)
+            duration = time.time() - start_time
+            print("   ... that took {:.2f} seconds; {:.2f} frames/sec".format(duration, num_frames/duration))
+            start_time = time.time()
+            for _ in range(10):
+                fleet.screen_vertices()
+            duration = time.time() - start_time
+            print("   screen vertices of all rockets: {:.2f} frames/sec".format(10/duration))
+
+    def check_equivalence(self, num_rockets, num_frames):
+        random.seed(42)
+        rockets = [self.create_rocket() for _ in range(num_rockets)]
+        # include some rockets that will touch down safely or crash on the ground
+        for x, vy in ((-100, -1.5), (100, -5)):
+            rocket = Rocket(self.cwidth, self.cheight)
+            rocket.position = Vector2D((x, 30))
+            rocket.velocity = Vector2D((0.1, vy))
+            rockets.append(rocket)
+        fleet = RocketFleet(self.cwidth, self.cheight)
+        for rocket in rockets:
+            fleet.append(rocket)
+        for _ in range(num_frames):
+            for rocket in rockets:
+                rocket.update()
+                if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
+                    rocket.velocity.flipx()
+                if not(0<rocket.position.y<self.cheight):
+                    rocket.velocity.flipy()
+            fleet.step(bounce=True)
+        max_position_error = max(abs(rocket.position.vec - fleet.position[i]) for i, rocket in enumerate(rockets))
+        max_rotation_error = max(abs(rocket.rotation - fleet.rotation[i]) for i, rocket in enumerate(rockets))
+        same_status = all(rocket.crashed == fleet.crashed[i] and rocket.touchdown == fleet.touchdown[i]
+                          for i, rocket in enumerate(rockets))
+        print("equivalence check with {:d} rockets over {:d} frames: max position error {:g}, max rotation error {:g}, status {}"
+              .format(len(rockets), num_frames, max_position_error, max_rotation_error, "same" if same_status else "DIFFERENT!"))
+        assert max_position_error < 1e-6 and max_rotation_error < 1e-9 and same_status
+
+    def check_draw_calls(self, num_rockets):
+        random.seed(42)
+        rockets = [self.create_rocket() for _ in range(num_rockets)]
+        for i, rocket in enumerate(rockets):
+            rocket.rotation = random.uniform(0, 6.28)
+            rocket.engine_throttle = i % 3
+            rocket.left_thruster_on = i % 2 == 0
+            rocket.right_thruster_on = i % 5 == 0
+        fleet = RocketFleet(self.cwidth, self.cheight)
+        for rocket in rockets:
+            fleet.append(rocket)
+        start_time = time.time()
+        rocket_calls = [call for rocket in rockets for call in rocket.draw_calls()]
+        rocket_duration = time.time() - start_time
+        start_time = time.time()
+        fleet_calls = fleet.draw_calls()
+        fleet_duration = time.time() - start_time
+        assert len(rocket_calls) == len(fleet_calls)
+        max_error = 0.0
+        for (method1, args1, kwargs1), (method2, args2, kwargs2) in zip(rocket_calls, fleet_calls):
+            assert method1 == method2 and kwargs1 == kwargs2
+            if method1 == "create_polygon":
+                args1, args2 = [c for xy in args1[0] for c in xy], [c for xy in args2[0] for c in xy]
+            max_error = max(max_error, max(abs(c1 - c2) for c1, c2 in zip(args1, args2)))
+        print("draw calls check with {:d} rockets: max coordinate error {:g}, Rocket.draw_calls {:.1f} ms, fleet {:.1f} ms"
+              .format(num_rockets, max_error, rocket_duration*1000, fleet_duration*1000))
+        assert max_error < 1e-6
+
+    def check_sleeping(self, num_rockets, num_frames):
+        rockets = resting(num_rockets, self.cwidth, self.cheight, seed=42)
+        fleet, sleeping_fleet = RocketFleet(self.cwidth, self.cheight), RocketFleet(self.cwidth, self.cheight)
+        for rocket in rockets:
+            fleet.append(rocket)
+            sleeping_fleet.append(rocket)
+        lifecycle = FleetLifecycle(sleeping_fleet, sleep_crashed=False)     # crashed rockets keep bouncing
+        start_time = time.time()
+        for _ in range(num_frames):
+            fleet.step(bounce=True)
+        duration = time.time() - start_time
+        start_time = time.time()
+        for _ in range(num_frames):
+            lifecycle.step(bounce=True)
+        sleeping_duration = time.time() - start_time
+        # only the rockets on the ground sleep, none of the rockets may be affected
+        max_error = abs(fleet.position - sleeping_fleet.position[lifecycle.slots]).max()
+        print("sleeping check with {:d} rockets over {:d} frames: {:d} still active, max position error {:g},"
+              " all awake {:.1f} ms/frame, with sleeping {:.1f} ms/frame"
+              .format(num_rockets, num_frames, lifecycle.num_active, max_error,
+                      duration/num_frames*1000, sleeping_duration/num_frames*1000))
+        assert max_error == 0.0
+        # the rockets are drawn in fleet order, also after some of them were woken up one by one, or fell asleep again
+        assert lifecycle.draw_calls() == sleeping_fleet.draw_calls()
+        sleeping = lifecycle.ids[lifecycle.num_active:]
+        start_time = time.time()
+        for rocket in sleeping[::10]:
+            lifecycle.wake([rocket])
+        wake_duration = (time.time() - start_time) / len(sleeping[::10])
+        assert lifecycle.draw_calls() == sleeping_fleet.draw_calls()
+        lifecycle.step(bounce=True)
+        assert lifecycle.draw_calls() == sleeping_fleet.draw_calls()
+        print("   waking up a single rocket: {:.3f} ms".format(wake_duration*1000))
+
+    def create_rocket(self):
+        return random_rocket(self.cwidth, self.cheight)
+
+
+if __name__ == "__main__":
+    test = PerformanceTest()
+    test.run()
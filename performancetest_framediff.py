@@ -0,0 +1,147 @@
+"""
+A performance test (no display output) of diffing consecutive frames of draw calls (framediff.py).
+It first checks that the canvas, patched with the operations, has exactly the items of the draw calls
+(and with the sub-pixel threshold, that no item is off by more than the threshold).
+Then it counts the canvas calls per frame that the full redraw, the retained canvas (with a group per
+rocket, like the threaded and mproc tests) and the frame diff need, for a scene in which all rockets fly,
+one in which half of them rest on the ground, and one in which they slowly drift.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import time
+from tkanimation import RetainedCanvas
+from raster import RasterCanvas
+from scenarios import swarm, resting, thrusters
+from framediff import FrameDiffer, CanvasPatcher
+
+
+class CountingCanvas(RasterCanvas):
+    """a RasterCanvas that counts the item calls made on it"""
+    def __init__(self, width, height):
+        super(CountingCanvas, self).__init__(width, height)
+        self.calls = 0
+
+    def _create(self, method, args, options):
+        self.calls += 1
+        return super(CountingCanvas, self)._create(method, args, options)
+
+    def coords(self, item_id, *coords):
+        self.calls += 1
+        super(CountingCanvas, self).coords(item_id, *coords)
+
+    def move(self, tag_or_id, dx, dy):
+        self.calls += 1
+        super(CountingCanvas, self).move(tag_or_id, dx, dy)
+
+    def itemconfigure(self, item_id, **options):
+        self.calls += 1
+        super(CountingCanvas, self).itemconfigure(item_id, **options)
+
+    def delete(self, *tags_or_ids):
+        self.calls += 1
+        super(CountingCanvas, self).delete(*tags_or_ids)
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        for with_poses in (False, True):
+            self.check_patched_canvas(thrusters(300, self.cwidth, self.cheight, seed=42), 0.0, with_poses)
+            self.check_patched_canvas(thrusters(300, self.cwidth, self.cheight, seed=42), 0.5, with_poses)
+        num_frames = 50
+        for name, scenario in (("flying", swarm), ("half resting", resting), ("drifting", self.drifting)):
+            for num_rockets in (500, 2000):
+                print("{:d} frames with {:d} rockets, {:s}:".format(num_frames, num_rockets, name))
+                for method in ("full redraw", "retained", "frame diff"):
+                    rockets = scenario(num_rockets, self.cwidth, self.cheight, seed=42)
+                    calls, duration = self.render(rockets, method, num_frames)
+                    print("   {:12s} {:8.0f} canvas calls/frame, {:6.1f} ms/frame"
+                          .format(method, calls/num_frames, duration/num_frames*1000))
+
+    def drifting(self, num_rockets, cwidth, cheight, seed=None):
+        # slowly drifting rockets that don't turn: most frames they move less than a pixel
+        rockets = thrusters(num_rockets, cwidth, cheight, seed)
+        for rocket in rockets:
+            rocket.rotation_speed = 0.0
+            rocket.velocity.vec *= 0.02
+        return rockets
+
+    def update(self, rockets):
+        for rocket in rockets:
+            rocket.update()
+            if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
+                rocket.velocity.flipx()
+            if not(0 < rocket.position.y < self.cheight):
+                rocket.velocity.flipy()
+
+    def render(self, rockets, method, num_frames):
+        # the canvas calls and the time of the draw calls, the diff and the canvas calls (not the rasterizing)
+        canvas = CountingCanvas(self.cwidth, self.cheight)
+        retained = RetainedCanvas(canvas)
+        differ, patcher = FrameDiffer(), CanvasPatcher(canvas)
+        duration = 0.0
+        for _ in range(num_frames + 1):
+            self.update(rockets)
+            if _ == 1:
+                canvas.calls = 0    # don't count the first frame, that creates everything
+            start_time = time.time()
+            if method == "full redraw":
+                canvas.delete("all")
+                for rocket in rockets:
+                    for c in rocket.draw_calls():
+                        getattr(canvas, c[0])(*c[1], **c[2])
+            elif method == "retained":
+                # like the threaded and mproc tests do it: a group with the draw calls of every rocket
+                retained.begin_frame()
+                retained.draw_grouped_calls([rocket.draw_calls() for rocket in rockets])
+                retained.end_frame()
+            else:
+                # the draw calls of a rocket are only built when it did more than move (see Rocket.draw_pose)
+                patcher.apply(differ.diff((index, rocket.draw_pose(), rocket.draw_calls) for index, rocket in enumerate(rockets)))
+            if _ > 0:
+                duration += time.time() - start_time
+        return canvas.calls, duration
+
+    def check_patched_canvas(self, rockets, threshold, with_poses):
+        print("checking the patched canvas against the draw calls, threshold {:g}{:s}..."
+              .format(threshold, ", with poses" if with_poses else ""))
+        canvas = RasterCanvas(self.cwidth, self.cheight)
+        differ, patcher = FrameDiffer(threshold), CanvasPatcher(canvas)
+        for frame in range(100):
+            self.update(rockets)
+            if frame % 10 == 0:
+                for rocket in rockets[::7]:
+                    rocket.engine_throttle = 0.0 if rocket.engine_throttle else 1.0
+                    rocket.left_thruster_on = not rocket.left_thruster_on
+            visible = [rocket for index, rocket in enumerate(rockets) if (index + frame) % 50 != 0]
+            if frame == 50:
+                visible = visible[:len(visible)//2]     # the keys that are gone are deleted
+            if with_poses:
+                patcher.apply(differ.diff((id(rocket), rocket.draw_pose(), rocket.draw_calls) for rocket in visible))
+            else:
+                patcher.apply(differ.diff((id(rocket), rocket.draw_calls()) for rocket in visible))
+            wanted = {}
+            for rocket in visible:
+                counts = {}
+                for method, args, options in rocket.draw_calls():
+                    n = counts.get(method, 0)
+                    counts[method] = n + 1
+                    args = args[0] if len(args) == 1 else args
+                    coords = [c for xy in args for c in xy] if type(args[0]) in (tuple, list) else list(args)
+                    wanted[(id(rocket), method, n)] = (method, coords, options)
+            shown = {item: canvas.items[canvas_id] for item, canvas_id in patcher.ids.items()
+                     if canvas.items[canvas_id][2].get("state") != "hidden"}
+            assert set(shown) == set(wanted), frame
+            assert len(canvas.items) == len(patcher.ids)
+            for item, (method, coords, options) in wanted.items():
+                canvas_method, canvas_coords, canvas_options, _ = shown[item]
+                assert canvas_method == method and len(canvas_coords) == len(coords)
+                assert max(abs(a - b) for a, b in zip(canvas_coords, coords)) <= threshold + 1e-9, (frame, item)
+                assert all(canvas_options[name] == value for name, value in options.items())
+
+
+if __name__ == "__main__":
+    PerformanceTest().run()
@@ -0,0 +1,94 @@
+"""
+A frame serialization performance test (no display output, no Pyro needed).
+Compares the marshaled draw calls that the Pyro simulation server used to send,
+with the compact binary frame format and the pose frames of the frameprotocol module.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import marshal
+import random
+import time
+from vectors import Vector2D
+from rocketsimulator import Rocket
+from rocketfleet import RocketFleet
+import frameprotocol
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        random.seed(42)
+        num_frames = 20
+        for num_rockets in (1000, 5000):
+            rockets = [self.create_rocket() for _ in range(num_rockets)]
+            fleet = RocketFleet(self.cwidth, self.cheight, num_rockets)
+            for rocket in rockets:
+                fleet.append(rocket)
+            print("{:d} rockets:".format(num_rockets))
+            self.check_poses(fleet)
+            self.marshal_size = None
+            self.measure("marshal of Rocket.draw_calls()", num_frames,
+                         lambda: marshal.dumps([call for rocket in rockets for call in rocket.draw_calls()]), marshal.loads)
+            self.measure("marshal of RocketFleet.draw_calls()", num_frames,
+                         lambda: marshal.dumps(fleet.draw_calls()), marshal.loads)
+            self.measure("packed draw calls", num_frames,
+                         lambda: frameprotocol.encode_draw_calls(fleet.draw_calls()), lambda frame: list(frameprotocol.decode_frame(frame)))
+            self.measure("packed fleet", num_frames,
+                         lambda: frameprotocol.encode_fleet(fleet), lambda frame: list(frameprotocol.decode_frame(frame)))
+            self.measure("pose frame", num_frames,
+                         lambda: frameprotocol.encode_poses(fleet), frameprotocol.decode_poses)
+
+    def measure(self, title, num_frames, encode, decode):
+        decode(encode())    # warm up (the numba kernels compile on their first call)
+        start_time = time.time()
+        for _ in range(num_frames):
+            frame = encode()
+        encode_duration = (time.time() - start_time) / num_frames
+        start_time = time.time()
+        for _ in range(num_frames):
+            decode(frame)
+        decode_duration = (time.time() - start_time) / num_frames
+        self.marshal_size = self.marshal_size or len(frame)
+        print("   {:38s} {:9d} bytes per frame ({:5.1f}x smaller), build+encode {:6.2f} ms, decode {:6.2f} ms"
+              .format(title + ":", len(frame), self.marshal_size / len(frame), encode_duration*1000, decode_duration*1000))
+
+    def check_poses(self, fleet):
+        # the draw calls decoded from a pose frame are the same as the fleet's, apart from the quantization
+        fleet = fleet.copy()
+        fleet.engine_throttle[:] = [random.choice([0.0, 0.3, 1.0, 1.77]) for _ in range(fleet.count)]
+        fleet.left_thruster_on[:] = [random.random() < 0.3 for _ in range(fleet.count)]
+        fleet.right_thruster_on[:] = [random.random() < 0.3 for _ in range(fleet.count)]
+        max_error = 0.0
+        for (method1, args1, kwargs1), (method2, args2, kwargs2) in zip(fleet.draw_calls(), frameprotocol.decode_poses(frameprotocol.encode_poses(fleet))):
+            assert method1 == method2 and kwargs1 == kwargs2
+            if method1 == "create_polygon":
+                args1, args2 = [c for xy in args1[0] for c in xy], args2[0]
+            max_error = max(max_error, max(abs(c1 - c2) for c1, c2 in zip(args1, args2)))
+        print("   pose frame check: max coordinate error {:.3f} pixels".format(max_error))
+        assert max_error < 0.25
+        far_away = fleet.copy()
+        far_away.position[:] += 5000.0     # wider than the int16 positions of the first version of the pose frame could hold
+        for (_, args1, _), (_, args2, _) in zip(far_away.draw_calls(grouped=False)[:1], frameprotocol.decode_poses(frameprotocol.encode_poses(far_away))):
+            assert max(abs(c1 - c2) for c1, c2 in zip([c for xy in args1[0] for c in xy], args2[0])) < 0.25
+        far_away.position[:] += 1e9
+        try:
+            frameprotocol.encode_poses(far_away)
+            raise AssertionError("position overflow not detected")
+        except ValueError:
+            pass
+
+    def create_rocket(self):
+        rocket = Rocket(self.cwidth, self.cheight)
+        rocket.rotation = random.uniform(0, 6.28)
+        rocket.engine_throttle = 1
+        rocket.position = Vector2D((random.randint(-self.cwidth/2,self.cwidth/2), random.randint(0,self.cheight)))
+        rocket.velocity = Vector2D((random.uniform(-10,10), random.uniform(-4,4)))
+        return rocket
+
+
+if __name__ == "__main__":
+    test = PerformanceTest()
+    test.run()
@@ -0,0 +1,174 @@
+"""
+A benchmark of the integrators (no display output): speed versus accuracy for different timesteps.
+Every integrator flies the same fleet of rockets, with their engines on while they turn (so the direction
+of the thrust changes during a step), and is compared to RK4 with a tiny timestep as the reference.
+Reported are the simulated physics steps per second of the fleet, the position error at the end
+of the flight, the energy drift of a ballistic flight, and for a descent to the ground the error
+of the speed at the moment of contact and how deep below the ground the contact is detected,
+with and without adaptive steps near the ground.
+It first checks that the euler integrator with dt=1 is exactly the fixed step of Rocket and RocketFleet,
+and that every integrator gives the same results for Rocket objects and for the fleet.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import random
+import time
+import numpy
+from rocketsimulator import Rocket
+from rocketfleet import RocketFleet
+from scenarios import thrusters
+from integrators import INTEGRATORS, Euler, RungeKutta4, Adaptive
+
+
+class PerformanceTest(object):
+    gravity = 0.1
+    flight_time = 240       # in physics steps of the game
+
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        self.check_fixed_step(500, 300)
+        for name in sorted(INTEGRATORS):
+            self.check_rocket_and_fleet(INTEGRATORS[name](0.5), 300, 100)
+        timesteps = (4.0, 2.0, 1.0, 0.5, 0.25)
+        reference = self.fly(RungeKutta4(1/64), 2000)
+        ballistic_reference = self.fly(RungeKutta4(1/64), 2000, thrust=False)
+        print("\n{:d} rockets flying {:d} steps, compared to rk4 with dt=1/64".format(2000, self.flight_time))
+        print("{:16s} {:>6s} {:>12s} {:>14s} {:>14s}".format("integrator", "dt", "steps/sec", "position error", "energy drift"))
+        for name in sorted(INTEGRATORS):
+            for dt in timesteps:
+                integrator = INTEGRATORS[name](dt)
+                fleet, duration = self.fly(integrator, 2000, timed=True)
+                error = numpy.abs(fleet.position - reference.position).max()
+                ballistic_fleet = self.fly(integrator, 2000, thrust=False)
+                drift = numpy.abs(self.energy(ballistic_fleet) - self.energy(ballistic_reference)).max()
+                print("{:16s} {:6g} {:12.0f} {:14.3g} {:14.3g}".format(name, dt, self.flight_time/duration, error, drift))
+        reference_speed, _ = self.descend(RungeKutta4(1/256), 2000)
+        print("\n{:d} rockets descending to the ground, compared to rk4 with dt=1/256".format(2000))
+        print("{:24s} {:>6s} {:>14s} {:>14s}".format("integrator", "dt", "speed error", "max depth"))
+        for name in sorted(INTEGRATORS):
+            for dt in (2.0, 1.0):
+                for integrator in (INTEGRATORS[name](dt), Adaptive(INTEGRATORS[name](dt))):
+                    speed, depth = self.descend(integrator, 2000)
+                    print("{:24s} {:6g} {:14.3g} {:14.3g}"
+                          .format(integrator.name, dt, numpy.abs(speed - reference_speed).max(), depth.max()))
+
+    def check_fixed_step(self, num_rockets, num_frames):
+        # the euler integrator with dt=1 must be exactly the fixed step (the thrust also rotates the same way)
+        rockets = thrusters(num_rockets, self.cwidth, self.cheight, seed=42)
+        states = [rocket.get_state() for rocket in rockets]
+        fleet = self.make_fleet(rockets)
+        euler_fleet = self.make_fleet(rockets)
+        euler_fleet.integrator = Euler(1.0)
+        self.update_rockets(rockets, num_frames)
+        fixed_step_states = [rocket.get_state() for rocket in rockets]
+        for rocket, state in zip(rockets, states):
+            rocket.set_state(state)
+            rocket.integrator = Euler(1.0)
+        self.update_rockets(rockets, num_frames)
+        for _ in range(num_frames):
+            for f in (fleet, euler_fleet):
+                f.apply_thrust(0.2j * f.engine_throttle)
+                f.apply_gravity(self.gravity)
+                f.step(bounce=True)
+        same = fixed_step_states == [rocket.get_state() for rocket in rockets]
+        same_fleet = all((getattr(fleet, name) == getattr(euler_fleet, name)).all() for name, _ in fleet.fields)
+        print("fixed step check with {:d} rockets over {:d} frames: Rocket {}, fleet {}"
+              .format(num_rockets, num_frames, "same" if same else "DIFFERENT!", "same" if same_fleet else "DIFFERENT!"))
+        assert same and same_fleet
+
+    def check_rocket_and_fleet(self, integrator, num_rockets, num_frames):
+        rockets = thrusters(num_rockets, self.cwidth, self.cheight, seed=42)
+        fleet = self.make_fleet(rockets)
+        fleet.integrator = integrator
+        for rocket in rockets:
+            rocket.integrator = integrator
+        self.update_rockets(rockets, num_frames)
+        for _ in range(num_frames):
+            fleet.apply_thrust(0.2j * fleet.engine_throttle)
+            fleet.apply_gravity(self.gravity)
+            fleet.step(bounce=True)
+        max_error = max(abs(rocket.position.vec - fleet.position[i]) for i, rocket in enumerate(rockets))
+        print("{!r} check with {:d} rockets over {:d} frames: max position error between Rocket and fleet {:g}"
+              .format(integrator, num_rockets, num_frames, max_error))
+        assert max_error < 1e-6
+
+    def update_rockets(self, rockets, num_frames):
+        for _ in range(num_frames):
+            for rocket in rockets:
+                rocket.apply_thrust(complex(0, .2 * rocket.engine_throttle))
+                rocket.apply_gravity(self.gravity)
+                rocket.update()
+                if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
+                    rocket.velocity.flipx()
+                if not(0 < rocket.position.y < self.cheight):
+                    rocket.velocity.flipy()
+
+    def make_fleet(self, rockets):
+        fleet = RocketFleet(self.cwidth, self.cheight, len(rockets))
+        for rocket in rockets:
+            fleet.append(rocket)
+        return fleet
+
+    def flying_fleet(self, num_rockets):
+        # high up in a huge world so nothing crashes; the rockets turn while the engine is on
+        rnd = random.Random(42)
+        fleet = RocketFleet(1e7, 1e7, num_rockets)
+        for _ in range(num_rockets):
+            fleet.append(Rocket(1e7, 1e7))
+        fleet.position[:] = [complex(rnd.uniform(-1000, 1000), rnd.uniform(1e5, 2e5)) for _ in range(num_rockets)]
+        fleet.velocity[:] = [complex(rnd.uniform(-5, 5), rnd.uniform(-5, 5)) for _ in range(num_rockets)]
+        fleet.rotation[:] = [rnd.uniform(0, 6.28) for _ in range(num_rockets)]
+        fleet.rotation_speed[:] = [rnd.uniform(-0.05, 0.05) for _ in range(num_rockets)]
+        fleet.engine_throttle[:] = [rnd.choice([0.5, 1.0, 2.0]) for _ in range(num_rockets)]
+        fleet.touchdown[:] = False
+        return fleet
+
+    def fly(self, integrator, num_rockets, thrust=True, timed=False):
+        fleet = self.flying_fleet(num_rockets)
+        fleet.integrator = integrator
+        torque = numpy.where(numpy.arange(num_rockets) % 2, 0.0005, -0.0005)
+        start_time = time.time()
+        for _ in range(int(round(self.flight_time / integrator.dt))):
+            if thrust:
+                fleet.apply_thrust(0.2j * fleet.engine_throttle)
+                fleet.apply_rotation(torque)
+            fleet.apply_gravity(self.gravity)
+            fleet.step()
+        duration = time.time() - start_time
+        return (fleet, duration) if timed else fleet
+
+    def energy(self, fleet):
+        return numpy.abs(fleet.velocity)**2 / 2 + self.gravity * fleet.position.imag
+
+    def descend(self, integrator, num_rockets):
+        """
+        Fly the rockets down (braking with the engine) until they reach the ground.
+        Returns the speed and how far they are below the ground, at the end of the update in which they got there.
+        """
+        rnd = random.Random(42)
+        position = numpy.array([complex(rnd.uniform(-100, 100), rnd.uniform(50, 300)) for _ in range(num_rockets)])
+        velocity = numpy.array([complex(rnd.uniform(-1, 1), rnd.uniform(-4, -1)) for _ in range(num_rockets)])
+        rotation = numpy.array([rnd.uniform(-0.2, 0.2) for _ in range(num_rockets)])
+        rotation_speed = numpy.array([rnd.uniform(-0.01, 0.01) for _ in range(num_rockets)])
+        acceleration = numpy.full(num_rockets, -self.gravity*1j)
+        thrust = numpy.array([rnd.uniform(0.03, 0.09)*1j for _ in range(num_rockets)])
+        rotation_acceleration = numpy.zeros(num_rockets)
+        speed = numpy.zeros(num_rockets)
+        depth = numpy.zeros(num_rockets)
+        flying = numpy.ones(num_rockets, dtype=numpy.bool_)
+        while flying.any():
+            position, velocity, rotation, rotation_speed = integrator.advance(
+                position, velocity, rotation, rotation_speed, acceleration, thrust, rotation_acceleration, numpy)
+            landed = flying & (position.imag <= 0)
+            speed[landed] = numpy.abs(velocity[landed])
+            depth[landed] = -position.imag[landed]
+            flying &= ~landed
+        return speed, depth
+
+
+if __name__ == "__main__":
+    test = PerformanceTest()
+    test.run()
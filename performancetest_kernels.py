@@ -0,0 +1,108 @@
+"""
+A rocket simulation performance test (no display output) of the compiled kernels (kernels.py).
+It first checks that the numba and numpy backends give bit for bit identical fleet states and screen vertices,
+for the scenarios of the benchmark harness and for rockets that are steered down to the ground (so that they
+land or crash), and then times the step, the screen vertices, and the fused step and screen vertices
+with every available backend. Force a backend with the ROCKET_KERNELS environment variable.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import time
+import numpy
+import kernels
+from rocketfleet import RocketFleet
+from scenarios import SCENARIOS
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        print("kernel backends: {:s} (selected: {:s})".format(", ".join(kernels.BACKENDS), kernels.BACKEND))
+        selected_backend = kernels.BACKEND
+        try:
+            if "numba" in kernels.BACKENDS:
+                self.check_equivalence(2000, 300)
+            else:
+                print("Numba is not installed, can't check the numba backend against the numpy backend")
+            num_frames = 100
+            for num_rockets in (1000, 10000, 100000):
+                print("{:d} frames with {:d} rockets:".format(num_frames, num_rockets))
+                for backend in kernels.BACKENDS:
+                    kernels.select_backend(backend)
+                    self.benchmark(backend, num_rockets, num_frames)
+        finally:
+            kernels.select_backend(selected_backend)
+
+    def create_fleet(self, scenario, num_rockets):
+        fleet = RocketFleet(self.cwidth, self.cheight, num_rockets)
+        if scenario == "landing":
+            # rockets that come down slowly or fast, upright or tilted, with random controls (see control())
+            rnd = numpy.random.RandomState(42)
+            fleet.set_count(num_rockets)
+            fleet.position[:] = rnd.uniform(-self.cwidth/2, self.cwidth/2, num_rockets) + 1j*rnd.uniform(1, 40, num_rockets)
+            fleet.velocity[:] = rnd.uniform(-1, 1, num_rockets) - 1j*rnd.uniform(0, 4, num_rockets)
+            fleet.rotation[:] = rnd.choice([0.0, 0.01, 6.2, 0.5], num_rockets)
+            fleet.engine_throttle[:] = rnd.choice([0.0, 0.5, 1.0], num_rockets)
+        else:
+            for rocket in SCENARIOS[scenario](num_rockets, self.cwidth, self.cheight, seed=42):
+                fleet.append(rocket)
+        return fleet
+
+    def control(self, fleet, rnd):
+        fleet.apply_gravity(0.1)
+        fleet.apply_thrust(0.2j * fleet.engine_throttle * (rnd.random_sample(fleet.count) < 0.4))
+        fleet.apply_rotation(rnd.choice([-0.005, 0.0, 0.005], fleet.count))
+
+    def run_backend(self, backend, scenario, num_rockets, num_frames):
+        kernels.select_backend(backend)
+        fleet = self.create_fleet(scenario, num_rockets)
+        rnd = numpy.random.RandomState(1)
+        frames = []
+        for frame in range(num_frames):
+            if scenario == "landing":
+                self.control(fleet, rnd)
+            if frame % 2:
+                vertices = fleet.step_and_screen_vertices(bounce=True)
+            else:
+                fleet.step(bounce=frame % 4 == 0)
+                vertices = fleet.screen_vertices()
+            if frame % 10 == 0:
+                frames.append((fleet.copy(), vertices))
+        return fleet, frames
+
+    def check_equivalence(self, num_rockets, num_frames):
+        for scenario in sorted(SCENARIOS) + ["landing"]:
+            numpy_fleet, numpy_frames = self.run_backend("numpy", scenario, num_rockets, num_frames)
+            numba_fleet, numba_frames = self.run_backend("numba", scenario, num_rockets, num_frames)
+            for (fleet1, vertices1), (fleet2, vertices2) in zip(numpy_frames, numba_frames):
+                for name, _ in RocketFleet.fields:
+                    # compare the bytes, so that even the sign of zeros must be the same
+                    assert getattr(fleet1, name).tobytes() == getattr(fleet2, name).tobytes(), "different " + name
+                for array1, array2 in zip(vertices1, vertices2):
+                    assert array1.tobytes() == array2.tobytes(), "different screen vertices"
+            print("equivalence check {:s} with {:d} rockets over {:d} frames: identical ({:d} touched down, {:d} crashed)"
+                  .format(scenario, num_rockets, num_frames, numpy_fleet.touchdown.sum(), numpy_fleet.crashed.sum()))
+
+    def benchmark(self, backend, num_rockets, num_frames):
+        fleet = self.create_fleet("thrusters", num_rockets)
+        start_time = time.time()
+        fleet.step(bounce=True)
+        fleet.step_and_screen_vertices(bounce=True)    # the first calls of the numba kernels compile them
+        first_duration = time.time() - start_time
+        durations = []
+        for function in (lambda: fleet.step(bounce=True), fleet.screen_vertices,
+                         lambda: (fleet.step(bounce=True), fleet.screen_vertices()),
+                         lambda: fleet.step_and_screen_vertices(bounce=True)):
+            start_time = time.time()
+            for _ in range(num_frames):
+                function()
+            durations.append((time.time() - start_time) / num_frames)
+        print("   {:5s}: step {:7.2f} ms, screen vertices {:7.2f} ms, both {:7.2f} ms, fused {:7.2f} ms  (first calls {:.2f} s)"
+              .format(backend, *[duration*1000 for duration in durations] + [first_duration]))
+
+
+if __name__ == "__main__":
+    PerformanceTest().run()
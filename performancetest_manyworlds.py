@@ -0,0 +1,128 @@
+"""
+A performance test (no display output) of many independent worlds stepped at once (manyworlds.py).
+It first checks that every world flies exactly like a RocketSimulator of the same size, with a scripted hop
+(see scenarios.py) and with random controls, and that worlds are reset automatically when their episode ends.
+Then it measures the world steps per second for a growing number of worlds with random controls,
+compared to stepping RocketSimulator objects one by one.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import random
+import time
+import numpy
+from rocketsimulator import RocketSimulator
+from manyworlds import RocketWorlds
+from scenarios import hop
+
+
+class PerformanceTest(object):
+    world_sizes = [(1000, 600), (800, 500), (1200, 700), (600, 900)]
+
+    def run(self):
+        self.check_equivalence(3000)
+        self.check_reset()
+        num_steps = 300
+        for num_worlds in (100, 1000, 10000, 100000):
+            worlds = RocketWorlds(num_worlds, max_steps=1000)
+            actions = self.random_actions(num_worlds, num_steps, seed=42)
+            print("stepping {:d} worlds {:d} times...".format(num_worlds, num_steps))
+            start_time = time.time()
+            for step in range(num_steps):
+                worlds.step(actions[step])
+            duration = time.time() - start_time
+            print("   ... that took {:.2f} seconds; {:.0f} world steps/sec, {:d} episodes ended"
+                  .format(duration, num_worlds*num_steps/duration, worlds.episodes))
+        num_worlds = 1000
+        simulators = [RocketSimulator(1000, 600) for _ in range(num_worlds)]
+        controls = self.random_actions(num_worlds, num_steps, seed=42)
+        print("stepping {:d} RocketSimulator objects {:d} times...".format(num_worlds, num_steps))
+        start_time = time.time()
+        for step in range(num_steps):
+            for simulator, (throttle, left, right) in zip(simulators, controls[step]):
+                rocket = simulator.rocket
+                rocket.engine_throttle, rocket.left_thruster_on, rocket.right_thruster_on = throttle, left, right
+                simulator.update()
+        duration = time.time() - start_time
+        print("   ... that took {:.2f} seconds; {:.0f} world steps/sec".format(duration, num_worlds*num_steps/duration))
+
+    def random_actions(self, num_worlds, num_steps, seed):
+        rnd = numpy.random.RandomState(seed)
+        actions = numpy.zeros((num_steps, num_worlds, 3))
+        actions[..., 0] = rnd.choice([0.0, 1.0, 2.0], (num_steps, num_worlds), p=[0.3, 0.6, 0.1])
+        actions[..., 1:] = rnd.random_sample((num_steps, num_worlds, 2)) < 0.1
+        return actions
+
+    def check_equivalence(self, max_steps):
+        # every world, with its own size, must fly exactly like RocketSimulator does with the same controls
+        print("checking {:d} worlds against RocketSimulator...".format(len(self.world_sizes) * 2))
+        widths, heights = zip(*(self.world_sizes * 2))
+        worlds = RocketWorlds(len(widths), widths, heights, max_steps=max_steps)
+        simulators = [RocketSimulator(width, height) for width, height in zip(widths, heights)]
+        pilots = [hop for _ in self.world_sizes] + [None] * len(self.world_sizes)
+        rnd = random.Random(42)
+        running = numpy.ones(len(simulators), dtype=bool)
+        outcomes = {}
+        for step in range(max_steps):
+            actions = numpy.zeros((len(simulators), 3))
+            for index, (simulator, pilot) in enumerate(zip(simulators, pilots)):
+                rocket = simulator.rocket
+                if pilot:
+                    pilot(simulator)
+                elif rnd.random() < 0.05:
+                    rocket.engine_throttle = rnd.choice([0.0, 1.0, 2.0])
+                    rocket.left_thruster_on, rocket.right_thruster_on = rnd.random() < 0.2, rnd.random() < 0.2
+                actions[index] = rocket.engine_throttle, rocket.left_thruster_on, rocket.right_thruster_on
+                if running[index]:
+                    simulator.update()
+            observations, rewards, dones, info = worlds.step(actions)
+            done_indices = list(numpy.flatnonzero(dones))
+            for index, simulator in enumerate(simulators):
+                if not running[index]:
+                    continue
+                rocket = simulator.rocket
+                target_x = simulator.world_width/2 - simulator.launchpad_offset
+                expected = [target_x - rocket.position.x, rocket.position.y, rocket.velocity.x, rocket.velocity.y]
+                if dones[index]:
+                    observation = info["final_observations"][done_indices.index(index)]
+                    landed = bool(info["landed"][index])
+                    assert landed == (rocket.touchdown and simulator.landing_pad() == "beta")
+                    assert bool(info["crashed"][index]) == rocket.crashed
+                    running[index] = False
+                    outcomes[index] = "landed" if landed else "crashed" if rocket.crashed else "touchdown"
+                else:
+                    observation = observations[index]
+                    assert not rocket.crashed
+                assert list(observation[:4]) == expected, (index, step)
+            if not running.any():
+                break
+        for index, (width, height) in enumerate(zip(widths, heights)):
+            print("   {:s} {:d}x{:d}: {:s}".format("hop   " if pilots[index] else "random", width, height,
+                                                    outcomes.get(index, "still flying")))
+
+    def check_reset(self):
+        # worlds that ended start over from their own reset state, the others fly on (world 1 dives into the ground)
+        worlds = RocketWorlds(3, gravity=[0.1, 0.1, 0.05], max_steps=60)
+        worlds.reset_position[1] += 200j
+        worlds.reset_rotation[1] = 3.0
+        observations = worlds.reset()
+        assert observations[1, 1] == 200 and not worlds.fleet.touchdown[1]
+        actions = numpy.array([[1.0, 0, 0], [1.0, 0, 0], [1.0, 0, 0]])
+        steps = 0
+        while True:
+            observations, rewards, dones, info = worlds.step(actions)
+            steps += 1
+            if dones[1]:
+                break
+        assert info["crashed"][1] and rewards[1] < -90
+        assert observations[1, 1] == 200 and worlds.steps[1] == 0 and not worlds.fleet.crashed[1]
+        assert worlds.steps[0] == steps and worlds.fleet.position[2].imag > worlds.fleet.position[0].imag
+        for _ in range(60 - steps):
+            observations, rewards, dones, info = worlds.step(actions)
+        assert info["timeout"][0] and info["timeout"][2] and worlds.episodes == 3
+        print("reset check ok")
+
+
+if __name__ == "__main__":
+    PerformanceTest().run()
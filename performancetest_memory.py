@@ -0,0 +1,81 @@
+"""
+A rocket simulation memory test (no display output).
+Reports the bytes per rocket (with tracemalloc), and the allocations of every simulated frame,
+for Rocket objects and for the NumPy RocketFleet:
+  - net blocks: the change of sys.getallocatedblocks() over the frame, the memory blocks that the frame
+    allocated and didn't free again. The first frames show one-time changes (the fleet compiles its kernels,
+    every rocket starts keeping a float object of its own for its previous rotation), after that it should be 0.
+  - peak temporary bytes: how far tracemalloc's peak rises above the memory in use at the start of the frame,
+    the most memory that the frame's temporary objects and arrays held at the same time.
+Usage: performancetest_memory.py [number of rockets, default 100000]
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import random
+import sys
+import time
+import tracemalloc
+from rocketfleet import RocketFleet
+from scenarios import random_rocket
+
+
+class MemoryTest(object):
+    def run(self, num_rockets):
+        self.cwidth = 1000
+        self.cheight = 1000
+        random.seed(42)
+        tracemalloc.start()
+        base_memory = tracemalloc.get_traced_memory()[0]
+        rockets = [self.create_rocket() for _ in range(num_rockets)]
+        rockets_memory = tracemalloc.get_traced_memory()[0] - base_memory
+        base_memory = tracemalloc.get_traced_memory()[0]
+        fleet = RocketFleet(self.cwidth, self.cheight, num_rockets)
+        for rocket in rockets:
+            fleet.append(rocket)
+        fleet_memory = tracemalloc.get_traced_memory()[0] - base_memory
+        tracemalloc.stop()
+        print("{:d} Rocket objects: {:.1f} bytes per rocket".format(num_rockets, rockets_memory/num_rockets))
+        self.measure_frames("Rocket objects", lambda: self.update(rockets), num_rockets)
+        print("{:d} rockets in a RocketFleet: {:.1f} bytes per rocket".format(num_rockets, fleet_memory/num_rockets))
+        self.measure_frames("RocketFleet", lambda: fleet.step(bounce=True), num_rockets)
+
+    def measure_frames(self, title, simulate_frame, num_rockets, num_frames=5):
+        # the net blocks and the timing without tracemalloc (it slows down every allocation)
+        net_blocks = []
+        duration = 0.0
+        for _ in range(num_frames):
+            blocks = sys.getallocatedblocks()
+            start_time = time.perf_counter()
+            simulate_frame()
+            duration += time.perf_counter() - start_time
+            net_blocks.append(sys.getallocatedblocks() - blocks)
+        tracemalloc.start()
+        peak_allocated = 0
+        for _ in range(num_frames):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            simulate_frame()
+            peak_allocated = max(peak_allocated, tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+        print("   {:s}: {:.2f} frames/sec, net blocks of each frame: {:s}".format(
+            title, num_frames/duration, ", ".join(str(blocks) for blocks in net_blocks)))
+        print("   {:s}: peak temporary bytes per frame {:d} ({:.1f} per rocket)".format(
+            title, peak_allocated, peak_allocated/num_rockets))
+
+    def update(self, rockets):
+        for rocket in rockets:
+            rocket.update()
+            if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
+                rocket.velocity.flipx()
+            if not(0<rocket.position.y<self.cheight):
+                rocket.velocity.flipy()
+
+    def create_rocket(self):
+        return random_rocket(self.cwidth, self.cheight)
+
+
+if __name__ == "__main__":
+    test = MemoryTest()
+    test.run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -9,13 +9,19 @@ Open source software license: MIT.
 from __future__ import print_function, division
 import Pyro4
 import time
-from tkanimation import AnimationWindow, tkinter
+from tkanimation import AnimationWindow, RetainedCanvas, tkinter
+import frameprotocol
+from framediff import CanvasPatcher
 
 
 Pyro4.config.SERIALIZER = "marshal"
 
 
 class PerformanceTestWindow(AnimationWindow):
+    pose_frames = True      # get only the rocket poses and compute the draw calls here (the smallest frames)
+    packed_frames = True    # use the compact binary frame format instead of marshaled draw calls
+    diff_frames = False     # get only the canvas operations for what changed (takes precedence over the others)
+
     def setup(self):
         self.cwidth, self.cheight = int(self.canvas["width"]), int(self.canvas["height"])
         self.simulation = Pyro4.Proxy("PYRO:rocket_simulation@localhost:33444")
@@ -23,25 +29,53 @@ class PerformanceTestWindow(AnimationWindow):
         self.framecounter = 0
         self.num_rockets = 10
         self.simulation.init(self.cwidth, self.cheight, self.num_rockets)
+        self.retained = RetainedCanvas(self.canvas)
+        self.patcher = CanvasPatcher(self.canvas)
         self.set_frame_rate(60)
 
     def draw(self):
         # self.update()
-        draw_calls = self.simulation.get_next_frame()
-        self.framecounter += 1
-        self.canvas.delete(tkinter.ALL)
-        self.perform_draw_calls(draw_calls)
+        if self.diff_frames:
+            with self.profiler.phase("update"):
+                operations = self.simulation.get_next_frame_diff()
+            self.framecounter += 1
+            self.retained.begin_frame()
+            with self.profiler.phase("items"):
+                self.patcher.apply(operations)
+        elif self.pose_frames:
+            with self.profiler.phase("update"):
+                frame = self.simulation.get_next_frame_poses()
+            self.framecounter += 1
+            self.retained.begin_frame()
+            with self.profiler.phase("items"):
+                self.retained.draw_grouped_calls(frameprotocol.decode_poses(frame, grouped=True))
+        elif self.packed_frames:
+            with self.profiler.phase("update"):
+                frame = self.simulation.get_next_frame_packed()
+            self.framecounter += 1
+            self.retained.begin_frame()
+            with self.profiler.phase("items"):
+                self.retained.draw_grouped_calls(frameprotocol.decode_frame(frame, grouped=True))
+        else:
+            with self.profiler.phase("update"):
+                draw_calls = self.simulation.get_next_frame_grouped()
+            self.framecounter += 1
+            self.retained.begin_frame()
+            self.perform_draw_calls(draw_calls)
         # framecounter
         if time.time()-self.start_time:
             fps = int(self.framecounter / (time.time() - self.start_time))
         else:
             fps = 0
-        self.canvas.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(self.num_rockets, fps), fill="yellow", anchor=tkinter.NE)
-        self.canvas.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        hud = self.retained.group("hud")
+        hud.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(self.num_rockets, fps), fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        with self.profiler.phase("hide"):
+            self.retained.end_frame()
 
     def perform_draw_calls(self, calls):
-        for c in calls:
-            getattr(self.canvas, c[0])(*c[1], **c[2])
+        with self.profiler.phase("items"):
+            self.retained.draw_grouped_calls(calls)
 
     def keypress(self, char, mouseposition):
         if char==' ':
@@ -6,10 +6,11 @@ Copyright by Irmen de Jong (irmen@razorvine.net).
 Open source software license: MIT.
 """
 from __future__ import print_function, division
-import random
 import Pyro4
-from vectors import Vector2D
-from rocketsimulator import Rocket
+from scenarios import random_rocket
+from rocketfleet import RocketFleet
+import frameprotocol
+from framediff import FrameDiffer
 
 
 class RocketSimulation:
@@ -17,7 +18,8 @@ class RocketSimulation:
     def init(self, cwidth, cheight, start_num_rockets=10):
         self.cwidth = cwidth
         self.cheight = cheight
-        self.rockets = []
+        self.rockets = RocketFleet(cwidth, cheight)
+        self.differ = FrameDiffer()
         self.add_rockets(start_num_rockets)
 
     @Pyro4.expose
@@ -27,23 +29,36 @@ class RocketSimulation:
 
     @Pyro4.expose
     def get_next_frame(self):
-        for rocket in self.rockets:
-            rocket.update()
-            if not(-self.cwidth/2 < rocket.position.x < self.cwidth/2):
-                rocket.velocity.flipx()
-            if not(0<rocket.position.y<self.cheight):
-                rocket.velocity.flipy()
-        draw_calls = []
-        for rocket in self.rockets:
-            draw_calls.extend(rocket.draw_calls())
-        return draw_calls
+        # one flat list with the draw calls of all rockets
+        self.rockets.step(bounce=True)
+        return self.rockets.draw_calls()
+
+    @Pyro4.expose
+    def get_next_frame_grouped(self):
+        # the same frame as get_next_frame, but a list with the draw calls of each rocket
+        self.rockets.step(bounce=True)
+        return self.rockets.draw_calls(grouped=True)
+
+    @Pyro4.expose
+    def get_next_frame_packed(self):
+        # the same frame as get_next_frame, but in the compact binary format of the frameprotocol module
+        self.rockets.step(bounce=True)
+        return frameprotocol.encode_fleet(self.rockets)
+
+    @Pyro4.expose
+    def get_next_frame_poses(self):
+        # only the pose of each rocket, the client computes the draw calls (see the frameprotocol module)
+        self.rockets.step(bounce=True)
+        return frameprotocol.encode_poses(self.rockets)
+
+    @Pyro4.expose
+    def get_next_frame_diff(self):
+        # only the canvas operations for what changed since the previous frame, see the framediff module
+        self.rockets.step(bounce=True)
+        return self.differ.diff(enumerate(self.rockets.draw_calls(grouped=True)))
 
     def add_rocket(self):
-        rocket = Rocket(self.cwidth, self.cheight)
-        rocket.rotation_speed = random.uniform(-.3,.3)
-        rocket.engine_throttle = 1
-        rocket.position = Vector2D((random.randint(-self.cwidth/2,self.cwidth/2), random.randint(0,self.cheight)))
-        rocket.velocity = Vector2D((random.uniform(-10,10), random.uniform(-4,4)))
+        rocket = random_rocket(self.cwidth, self.cheight)
         self.rockets.append(rocket)
 
 
@@ -1,28 +1,25 @@
 """
 A rocket animation performance test (no display output).
+It adds 200 rockets at a time and simulates 200 frames, for the number of rounds given on the command line (default 5).
+For repeatable timings of the separate phases, and comparisons between runs, use benchmark.py.
 
 Copyright by Irmen de Jong (irmen@razorvine.net).
 Open source software license: MIT.
 """
 from __future__ import print_function, division
-import random
 import time
 import sys
-from vectors import Vector2D
-from rocketsimulator import Rocket
-
-if sys.version_info < (3,0):
-    input = raw_input
+from scenarios import random_rocket
 
 
 class PerformanceTest(object):
-    def run(self):
+    def run(self, rounds=5):
         self.cwidth = 1000
         self.cheight = 1000
         self.rockets = []
         rockets_added_per_iteration = 200
         num_frames_per_iteration = 200
-        while True:
+        for _ in range(rounds):
             for _ in range(rockets_added_per_iteration):
                 self.add_rocket()
             print("simulating {:d} frames with {:d} rockets...".format(num_frames_per_iteration, len(self.rockets)))
@@ -30,7 +27,6 @@ class PerformanceTest(object):
             self.simulate(num_frames_per_iteration)
             duration = time.time() - start_time
             print("   ... that took {:.2f} seconds; {:.2f} frames/sec".format(duration, num_frames_per_iteration/duration))
-            input("\nenter to run again with {:d} extra rockets...:".format(rockets_added_per_iteration))
 
     def simulate(self, num_frames=10000):
         class DummyCanvas(object):
@@ -43,11 +39,7 @@ class PerformanceTest(object):
                 rocket.draw(dummycanvas)
 
     def add_rocket(self):
-        rocket = Rocket(self.cwidth, self.cheight)
-        rocket.rotation_speed = random.uniform(-.3,.3)
-        rocket.engine_throttle = 1
-        rocket.position = Vector2D((random.randint(-self.cwidth/2,self.cwidth/2), random.randint(0,self.cheight)))
-        rocket.velocity = Vector2D((random.uniform(-10,10), random.uniform(-4,4)))
+        rocket = random_rocket(self.cwidth, self.cheight)
         self.rockets.append(rocket)
 
     def update(self):
@@ -61,4 +53,4 @@ class PerformanceTest(object):
 
 if __name__ == "__main__":
     test = PerformanceTest()
-    test.run()
+    test.run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,70 @@
+"""
+A rocket animation performance test, rendered offscreen with the NumPy RasterCanvas instead of Tk.
+Runs the performance test window headless and reports the time per frame of drawing and of rasterizing.
+With Numba installed, it first checks that the numba and numpy backends (see kernels.py) rasterize identical frames.
+It also checks that a canvas with more than 256 different colors renders all of them.
+Usage: performancetest_raster.py [number of rockets, default 1000] [frames.raw | frame{:04d}.png]
+The frames are optionally written as raw rgb24 video stream or as a PNG sequence.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import sys
+import time
+import kernels
+from raster import RasterCanvas, RawVideoWriter, PngSequenceWriter, color_rgb
+from performancetest import PerformanceTestWindow
+
+
+if __name__ == "__main__":
+    num_rockets = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+    num_frames = 100
+    writer = None
+    if output and output.endswith(".png"):
+        writer = PngSequenceWriter(output)
+    elif output:
+        writer = RawVideoWriter(open(output, "wb"))
+
+    def render_frame(canvas):
+        frame = canvas.render()
+        if writer:
+            writer.write(frame)
+
+    def check_many_colors(num_colors=300):
+        canvas = RasterCanvas(num_colors * 2, 2)
+        colors = ["#{:02x}{:02x}{:02x}".format(i % 256, i // 256, 7) for i in range(num_colors)]
+        for i, color in enumerate(colors):
+            canvas.create_rectangle(i*2, 0, i*2+1, 1, fill=color, outline=color)
+        frame = canvas.render()
+        assert [tuple(frame[0, i*2]) for i in range(num_colors)] == [color_rgb(color) for color in colors]
+
+    selected_backend = kernels.BACKEND
+    for backend in kernels.BACKENDS:
+        kernels.select_backend(backend)
+        check_many_colors()
+    kernels.select_backend(selected_backend)
+    print("check of 300 different colors: ok")
+    window = PerformanceTestWindow(1000, 600, canvas=RasterCanvas(1000, 600))
+    for _ in range(num_rockets - len(window.rockets)):
+        window.add_rocket()
+    if "numba" in kernels.BACKENDS:
+        window.run_headless(1)
+        frames = []
+        for backend in ("numpy", "numba"):
+            kernels.select_backend(backend)
+            frames.append(window.canvas.render())
+        kernels.select_backend(selected_backend)
+        assert (frames[0] == frames[1]).all(), "numba and numpy backends rasterize different frames"
+        print("equivalence check of the raster backends with {:d} items: identical".format(len(window.canvas.items)))
+    window.profiler.enable()
+    print("rendering {:d} frames with {:d} rockets...".format(num_frames, len(window.rockets)))
+    start_time = time.time()
+    window.run_headless(num_frames, render_frame)
+    duration = time.time() - start_time
+    print("   ... that took {:.2f} seconds; {:.2f} frames/sec".format(duration, num_frames/duration))
+    print(window.profiler.overlay_text())
+    if writer:
+        writer.close()
+        print("{:d} frames written to {:s}".format(writer.frames, output))
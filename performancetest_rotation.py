@@ -0,0 +1,68 @@
+"""
+A rocket drawing performance test (no display output) of the quantized rotation tables.
+Reports the speedup of Rocket.draw_calls() (the best of 3 runs) and the maximum positional error
+of the drawn points compared to exact rotation, for various angular resolutions.
+The speedup is small, see vectors.RotationTable.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import random
+import time
+from vectors import Vector2D, RotationTable
+from rocketsimulator import Rocket
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        num_frames = 50
+        random.seed(42)
+        rockets = [self.create_rocket() for _ in range(500)]
+        exact_calls, exact_duration = self.draw_frames(rockets, None, num_frames)
+        print("exact rotation: {:.2f} frames/sec with {:d} rockets".format(num_frames/exact_duration, len(rockets)))
+        for steps in (64, 256, 1024, 4096, 16384):
+            table = RotationTable(steps)
+            calls, duration = self.draw_frames(rockets, table, num_frames)
+            print("{:5d} steps: {:.2f} frames/sec, speedup {:.2f}x, max positional error {:.4f} pixels, {:d} cached templates"
+                  .format(steps, num_frames/duration, exact_duration/duration, self.max_error(exact_calls, calls), len(table.templates)))
+
+    def draw_frames(self, rockets, table, num_frames, repeats=3):
+        Rocket.rotation_table = table
+        try:
+            durations = []
+            for _ in range(repeats):
+                start_time = time.perf_counter()
+                for _ in range(num_frames):
+                    calls = [rocket.draw_calls() for rocket in rockets]
+                durations.append(time.perf_counter() - start_time)
+            return calls, min(durations)
+        finally:
+            Rocket.rotation_table = None
+
+    def max_error(self, calls1, calls2):
+        error = 0.0
+        for rocket_calls1, rocket_calls2 in zip(calls1, calls2):
+            for (method, args1, _), (_, args2, _) in zip(rocket_calls1, rocket_calls2):
+                if method == "create_polygon":
+                    args1, args2 = [complex(*xy) for xy in args1[0]], [complex(*xy) for xy in args2[0]]
+                else:
+                    args1, args2 = [complex(*args1[:2])], [complex(*args2[:2])]
+                error = max(error, max(abs(p1-p2) for p1, p2 in zip(args1, args2)))
+        return error
+
+    def create_rocket(self):
+        rocket = Rocket(self.cwidth, self.cheight)
+        rocket.rotation = random.uniform(0, 6.28)
+        rocket.engine_throttle = random.uniform(0.5, 2)    # (any throttle shares the cached flame)
+        rocket.left_thruster_on = random.random() < 0.5
+        rocket.right_thruster_on = random.random() < 0.5
+        rocket.position = Vector2D((random.randint(-self.cwidth/2,self.cwidth/2), random.randint(0,self.cheight)))
+        return rocket
+
+
+if __name__ == "__main__":
+    test = PerformanceTest()
+    test.run()
@@ -0,0 +1,85 @@
+"""
+A rocket animation performance test
+The rocket simulation runs in multiple worker processes that share the rocket state in shared memory,
+the 'rendering' (drawing) in the main process.
+Usage: performancetest_sharedmem.py [number of workers]
+       performancetest_sharedmem.py benchmark [number of rockets]    (no display, scaling over worker counts)
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import sys
+import time
+from tkanimation import AnimationWindow, RetainedCanvas, tkinter
+from sharedsimulation import SharedMemorySimulation
+
+
+class PerformanceTestWindow(AnimationWindow):
+    num_workers = None
+
+    def setup(self):
+        self.cwidth, self.cheight = int(self.canvas["width"]), int(self.canvas["height"])
+        self.simulation = SharedMemorySimulation(self.cwidth, self.cheight, 10, self.num_workers)
+        self.simulation.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.retained = RetainedCanvas(self.canvas)
+        self.set_frame_rate(60)
+
+    def close(self):
+        self.simulation.close()
+        self.root.destroy()
+
+    def draw(self):
+        # get the completed frame, while the simulation runs in the worker processes for the next frame
+        with self.profiler.phase("update"):
+            frame = self.simulation.next_frame()
+        with self.profiler.phase("drawcalls"):
+            calls = frame.draw_calls(grouped=True)
+        self.retained.begin_frame()
+        self.perform_draw_calls(calls)
+        # framecounter
+        if time.time()-self.simulation.start_time:
+            fps = int(self.simulation.framecounter / (time.time() - self.simulation.start_time))
+        else:
+            fps = 0
+        hud = self.retained.group("hud")
+        hud.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(len(self.simulation), fps), fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        with self.profiler.phase("hide"):
+            self.retained.end_frame()
+
+    def perform_draw_calls(self, calls):
+        with self.profiler.phase("items"):
+            self.retained.draw_grouped_calls(calls)
+
+    def keypress(self, char, mouseposition):
+        if char==' ':
+            self.simulation.add_rockets(10)
+            self.simulation.framecounter = 0
+            self.simulation.start_time = time.time()
+
+
+def benchmark(num_rockets, num_frames=200):
+    for num_workers in (1, 2, 4, 8):
+        simulation = SharedMemorySimulation(1000, 1000, num_rockets, num_workers, capacity=num_rockets)
+        try:
+            simulation.start()
+            simulation.done_barrier.wait()
+            start_time = time.time()
+            for _ in range(num_frames):
+                simulation.start_barrier.wait()
+                simulation.done_barrier.wait()
+            duration = time.time() - start_time
+            print("{:d} workers, {:d} rockets: {:.2f} frames/sec".format(num_workers, num_rockets, num_frames/duration))
+        finally:
+            simulation.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
+    else:
+        PerformanceTestWindow.num_workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+        window = PerformanceTestWindow(1000, 600, "Rocket animation performance test")
+        window.mainloop()
@@ -0,0 +1,93 @@
+"""
+A rocket animation performance test
+The rocket simulation runs in a separate server process (performancetest_stream_server.py,
+or the asyncio server performancetest_async_server.py that many viewers can watch at once)
+that pushes its frames to us, the 'rendering' (drawing) in this process.
+Usage: performancetest_stream.py [host:port or unix socket path, default localhost:33445] [fps, default 60]
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import sys
+import time
+from tkanimation import AnimationWindow, RetainedCanvas, tkinter
+from framestream import FrameStreamClient, state_fleet
+
+
+class PerformanceTestWindow(AnimationWindow):
+    address = ("localhost", 33445)
+    frame_rate = 60
+
+    def setup(self):
+        self.cwidth, self.cheight = int(self.canvas["width"]), int(self.canvas["height"])
+        self.stream = FrameStreamClient(self.address)
+        self.stream.send_command(b"RATE", self.frame_rate)    # the asyncio server sends us frames at this rate
+        self.stream.start()
+        self.start_time = time.time()
+        self.framecounter = 0
+        self.num_rockets = 0
+        self.retained = RetainedCanvas(self.canvas)
+        self.set_frame_rate(self.frame_rate)
+
+    def draw(self):
+        frame = self.stream.latest_frame()
+        if frame is None:
+            return      # no new frame from the server yet
+        frame_number, state = frame
+        self.framecounter += 1
+        self.num_rockets = state.shape[1]
+        with self.profiler.phase("drawcalls"):
+            calls = state_fleet(state, self.cwidth, self.cheight).draw_calls(grouped=True)
+        self.retained.begin_frame()
+        self.perform_draw_calls(calls)
+        # framecounter
+        if time.time()-self.start_time:
+            fps = int(self.framecounter / (time.time() - self.start_time))
+        else:
+            fps = 0
+        kbytes_per_frame = self.stream.bytes_received / max(1, self.stream.frames_received) / 1024
+        hud = self.retained.group("hud")
+        hud.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(self.num_rockets, fps), fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 60, text="server frame {0:d}, dropped {1:d}, {2:.1f} kb/frame "
+                        .format(frame_number, self.stream.frames_dropped, kbytes_per_frame), fill="yellow", anchor=tkinter.NE)
+        with self.profiler.phase("hide"):
+            self.retained.end_frame()
+
+    def perform_draw_calls(self, calls):
+        with self.profiler.phase("items"):
+            self.retained.draw_grouped_calls(calls)
+
+    def keypress(self, char, mouseposition):
+        if char==' ':
+            self.stream.add_rockets(10)
+            self.framecounter = 0
+            self.start_time = time.time()
+        else:
+            self.control(char, True)
+
+    def keyrelease(self, char, mouseposition):
+        self.control(char, False)
+
+    def control(self, char, pressed):
+        # engine and thrusters of all rockets, the keys are the same as in the game (the asyncio server only)
+        char = char.lower()
+        if char.startswith("shift"):
+            self.stream.send_command(b"ENGN", 100 if pressed else 0)
+        elif char.startswith("control"):
+            self.stream.send_command(b"ENGN", 200 if pressed else 0)
+        elif char == "left":
+            self.stream.send_command(b"THRR", pressed)
+        elif char == "right":
+            self.stream.send_command(b"THRL", pressed)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        host, _, port = sys.argv[1].rpartition(":")
+        PerformanceTestWindow.address = (host, int(port)) if host and port.isdigit() else sys.argv[1]
+    if len(sys.argv) > 2:
+        PerformanceTestWindow.frame_rate = int(sys.argv[2])
+    window = PerformanceTestWindow(1000, 600, "Rocket animation performance test")
+    window.mainloop()
@@ -0,0 +1,36 @@
+"""
+A rocket animation performance test
+This is the streaming simulation server part. Start this in a separate process,
+then start performancetest_stream.py to view it.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+from scenarios import random_rocket
+from rocketfleet import RocketFleet
+from framestream import StreamingSimulation
+
+
+class RocketSimulation(object):
+    def __init__(self, cwidth, cheight, start_num_rockets=10):
+        self.cwidth = cwidth
+        self.cheight = cheight
+        self.rockets = RocketFleet(cwidth, cheight)
+        self.add_rockets(start_num_rockets)
+
+    def add_rockets(self, count):
+        for _ in range(count):
+            self.add_rocket()
+
+    def add_rocket(self):
+        rocket = random_rocket(self.cwidth, self.cheight)
+        self.rockets.append(rocket)
+
+
+if __name__ == "__main__":
+    simulation = RocketSimulation(1000, 600)
+    server = StreamingSimulation(simulation.rockets, ("localhost", 33445), frame_rate=60)
+    server.add_rockets_function = simulation.add_rockets
+    print("streaming simulation server running on port 33445")
+    server.serve_forever()
@@ -2,17 +2,18 @@
 A rocket animation performance test
 The rocket simulation and animations run in their own thread
 the 'rendering' (drawing) in the main thread.
+The simulation thread also diffs the draw calls of every rocket with the previous frame (see framediff.py),
+so the main thread only performs the canvas operations for what visibly changed. Press D to toggle this.
 
 Copyright by Irmen de Jong (irmen@razorvine.net).
 Open source software license: MIT.
 """
 from __future__ import print_function, division
-import random
 import time
 import threading
-from vectors import Vector2D
-from tkanimation import AnimationWindow, tkinter
-from rocketsimulator import Rocket
+from tkanimation import AnimationWindow, RetainedCanvas, tkinter
+from scenarios import random_rocket
+from framediff import FrameDiffer, CanvasPatcher
 
 
 class RocketSimulation(threading.Thread):
@@ -21,7 +22,9 @@ class RocketSimulation(threading.Thread):
         self.cwidth = cwidth
         self.cheight = cheight
         self.rockets = []
-        self.draw_calls = []
+        self.draw_calls = []    # per rocket
+        self.operations = []
+        self.differ = None      # a FrameDiffer to diff the frames with, or None to just produce the draw calls
         self.framecounter = 0
         self.start_simulate = threading.Event()
         self.start_simulate.set()
@@ -44,18 +47,16 @@ class RocketSimulation(threading.Thread):
                     rocket.velocity.flipx()
                 if not(0<rocket.position.y<self.cheight):
                     rocket.velocity.flipy()
-            self.draw_calls = []
-            for rocket in self.rockets:
-                self.draw_calls.extend(rocket.draw_calls())
+            if self.differ:
+                self.operations = self.differ.diff((index, rocket.draw_pose(), rocket.draw_calls)
+                                                   for index, rocket in enumerate(self.rockets))
+            else:
+                self.draw_calls = [rocket.draw_calls() for rocket in self.rockets]
             self.framecounter += 1
             self.frame_done.set()
 
     def add_rocket(self):
-        rocket = Rocket(self.cwidth, self.cheight)
-        rocket.rotation_speed = random.uniform(-.3,.3)
-        rocket.engine_throttle = 1
-        rocket.position = Vector2D((random.randint(-self.cwidth/2,self.cwidth/2), random.randint(0,self.cheight)))
-        rocket.velocity = Vector2D((random.uniform(-10,10), random.uniform(-4,4)))
+        rocket = random_rocket(self.cwidth, self.cheight)
         self.rockets.append(rocket)
 
 
@@ -63,36 +64,67 @@ class PerformanceTestWindow(AnimationWindow):
     def setup(self):
         self.cwidth, self.cheight = int(self.canvas["width"]), int(self.canvas["height"])
         self.simulation = RocketSimulation(self.cwidth, self.cheight, 10)
+        self.simulation.differ = FrameDiffer()
         self.simulation.start()
+        self.retained = RetainedCanvas(self.canvas)
+        self.patcher = CanvasPatcher(self.canvas)
         self.set_frame_rate(60)
 
     def draw(self):
         # self.update()
         # wait for the simulation to complete the data for the new frame
-        self.simulation.frame_done.wait()
+        with self.profiler.phase("update"):
+            self.simulation.frame_done.wait()
         self.simulation.frame_done.clear()
-        draw_calls = self.simulation.draw_calls
+        differ = self.simulation.differ
+        draw_calls, operations = self.simulation.draw_calls, self.simulation.operations
         self.simulation.start_simulate.set()
-        # clear the screen and draw the next frame, while the simulation runs in the background thread for the next frame
-        self.canvas.delete(tkinter.ALL)
-        self.perform_draw_calls(draw_calls)
+        # draw the next frame, while the simulation runs in the background thread for the next frame
+        self.retained.begin_frame()
+        if differ:
+            with self.profiler.phase("items"):
+                self.patcher.apply(operations)
+        else:
+            self.perform_draw_calls(draw_calls)
         # framecounter
         if time.time()-self.simulation.start_time:
             fps = int(self.simulation.framecounter / (time.time() - self.simulation.start_time))
         else:
             fps = 0
-        self.canvas.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(len(self.simulation.rockets), fps), fill="yellow", anchor=tkinter.NE)
-        self.canvas.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        hud = self.retained.group("hud")
+        hud.create_text(self.cwidth, 0, text="#ROCKETS: {0:d}  FPS: {1:d} ".format(len(self.simulation.rockets), fps), fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 30, text="press SPACE to add 10 more ", fill="yellow", anchor=tkinter.NE)
+        hud.create_text(self.cwidth, 60, text="frame diff (D): {0:s}, {1:d} canvas operations "
+                        .format("on" if differ else "off", self.patcher.operations_count if differ else sum(len(calls) for calls in draw_calls)),
+                        fill="yellow", anchor=tkinter.NE)
+        with self.profiler.phase("hide"):
+            self.retained.end_frame()
 
     def perform_draw_calls(self, calls):
-        for c in calls:
-            getattr(self.canvas, c[0])(*c[1], **c[2])
+        with self.profiler.phase("items"):
+            self.retained.draw_grouped_calls(calls)
 
     def keypress(self, char, mouseposition):
         if char==' ':
             self.simulation.add_rockets(10)
             self.simulation.framecounter = 0
             self.simulation.start_time = time.time()
+        elif char in ('d', 'D'):
+            self.toggle_frame_diff()
+
+    def toggle_frame_diff(self):
+        # switch between the diffed operations and the retained draw calls; each one starts from a clean canvas
+        simulation = self.simulation
+        simulation.frame_done.wait()
+        if simulation.differ:
+            for canvas_id in self.patcher.ids.values():
+                self.canvas.delete(canvas_id)
+            self.patcher = CanvasPatcher(self.canvas)
+            simulation.differ = None
+        else:
+            self.retained.remove_grouped()
+            simulation.differ = FrameDiffer()
+        simulation.draw_calls, simulation.operations = [], []
 
 
 if __name__ == "__main__":
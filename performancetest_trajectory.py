@@ -0,0 +1,128 @@
+"""
+A rocket simulation performance test (no display output) of trajectory logging (trajectory.py).
+It measures the overhead of recording every frame (and every 10th frame, in single precision, and with
+the status field) of a large RocketFleet run into a memory-mapped file, the best of 3 runs each,
+and checks that reading back slices by rocket and by step range gives exactly what was recorded.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import os
+import tempfile
+import time
+import numpy
+from rocketfleet import RocketFleet
+from scenarios import thrusters
+from trajectory import TrajectoryRecorder, Trajectory, DEFAULT_FIELDS, TOUCHDOWN, LEFT_THRUSTER, RIGHT_THRUSTER, CRASHED
+
+
+class PerformanceTest(object):
+    def run(self):
+        self.cwidth = 1000
+        self.cheight = 1000
+        self.directory = tempfile.mkdtemp()
+        self.check_read_back(1000, 200)
+        self.check_default_overhead(10000, 1000)
+        num_frames = 300
+        for num_rockets in (1000, 10000, 50000):
+            print("simulating {:d} frames with {:d} rockets...".format(num_frames, num_rockets))
+            base_duration = None
+            for name, stride, single_precision, fields in (("without logging", None, False, None),
+                                                            ("double, stride  1", 1, False, DEFAULT_FIELDS),
+                                                            ("single, stride  1", 1, True, DEFAULT_FIELDS),
+                                                            ("double, stride 10", 10, False, DEFAULT_FIELDS),
+                                                            ("single, stride 10", 10, True, DEFAULT_FIELDS),
+                                                            ("status, stride  1", 1, False, DEFAULT_FIELDS + ["status"])):
+                duration, size = min(self.simulate(num_rockets, num_frames, stride, single_precision, fields) for _ in range(3))
+                if stride is None:
+                    base_duration = duration
+                    print("   {:s}:   {:.3f} seconds; {:.2f} frames/sec".format(name, duration, num_frames/duration))
+                else:
+                    print("   {:s}: {:.3f} seconds; overhead {:5.1f}%, {:.1f} Mb"
+                          .format(name, duration, (duration - base_duration) / base_duration * 100, size / 1024 / 1024))
+        os.rmdir(self.directory)
+
+    def check_default_overhead(self, num_rockets, num_frames, max_overhead=5.0):
+        # the recorder with its default settings must stay under a few percent of the step time;
+        # both are timed within the same run, because the run to run variation is larger than that
+        print("checking the overhead of the default recorder settings with {:d} rockets...".format(num_rockets))
+        fleet = self.create_fleet(num_rockets)
+        fleet.step(bounce=True)     # (compiles the kernels, if that backend is selected)
+        filename = os.path.join(self.directory, "default.rktj")
+        recorder = TrajectoryRecorder(filename, num_rockets, num_frames // 10 + 1)
+        step_duration = record_duration = 0.0
+        for _ in range(num_frames):
+            start_time = time.perf_counter()
+            fleet.step(bounce=True)
+            step_duration += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            recorder.record(fleet)
+            record_duration += time.perf_counter() - start_time
+        recorder.close()
+        os.remove(filename)
+        overhead = record_duration / step_duration * 100
+        print("   default (single, stride 10): overhead {:.1f}%".format(overhead))
+        assert overhead < max_overhead, "logging overhead {:.1f}% at {:d} rockets".format(overhead, num_rockets)
+
+    def create_fleet(self, num_rockets):
+        fleet = RocketFleet(self.cwidth, self.cheight, num_rockets)
+        for rocket in thrusters(num_rockets, self.cwidth, self.cheight, seed=42):
+            fleet.append(rocket)
+        return fleet
+
+    def simulate(self, num_rockets, num_frames, stride, single_precision, fields):
+        fleet = self.create_fleet(num_rockets)
+        filename = os.path.join(self.directory, "trajectory.rktj")
+        recorder = None
+        if stride:
+            recorder = TrajectoryRecorder(filename, num_rockets, num_frames // stride + 1, stride, fields, single_precision)
+        start_time = time.time()
+        for _ in range(num_frames):
+            fleet.step(bounce=True)
+            if recorder:
+                recorder.record(fleet)
+        duration = time.time() - start_time
+        size = 0
+        if recorder:
+            recorder.close()
+            size = os.path.getsize(filename)
+            os.remove(filename)
+        return duration, size
+
+    def check_read_back(self, num_rockets, num_frames):
+        print("checking the trajectory read back...")
+        fleet = self.create_fleet(num_rockets)
+        filename = os.path.join(self.directory, "check.rktj")
+        recorder = TrajectoryRecorder(filename, num_rockets, num_frames, stride=3,
+                                      fields=["position", "rotation", "engine_throttle", "status"], single_precision=False)
+        expected = []
+        for step in range(num_frames):
+            fleet.step(bounce=True)
+            if recorder.record(fleet):
+                expected.append((step, fleet.copy()))
+        recorder.close()
+        trajectory = Trajectory(filename)
+        assert trajectory.num_frames == len(expected) and trajectory.stride == 3
+        assert trajectory.field_names == ["position", "rotation", "engine_throttle", "status"]
+        steps, data = trajectory.read(rockets=[5, 17, 999], start_step=30, stop_step=91)
+        frames = [(step, copy) for step, copy in expected if 30 <= step < 91]
+        assert list(steps) == [step for step, _ in frames] == list(range(30, 91, 3))
+        for i, (step, copy) in enumerate(frames):
+            assert numpy.array_equal(data["position"][i], copy.position[[5, 17, 999]])
+            assert numpy.array_equal(data["rotation"][i], copy.rotation[[5, 17, 999]])
+        steps, data = trajectory.read(["status", "engine_throttle"], rockets=slice(0, 6))
+        status = data["status"][-1]
+        copy = expected[-1][1]
+        assert numpy.array_equal((status & TOUCHDOWN) != 0, copy.touchdown[:6])
+        assert numpy.array_equal((status & LEFT_THRUSTER) != 0, copy.left_thruster_on[:6])
+        assert numpy.array_equal((status & RIGHT_THRUSTER) != 0, copy.right_thruster_on[:6])
+        assert numpy.array_equal((status & CRASHED) != 0, copy.crashed[:6])
+        assert numpy.array_equal(data["engine_throttle"][-1], copy.engine_throttle[:6])
+        assert numpy.array_equal(trajectory.field("position")[:, 42], [copy.position[42] for _, copy in expected])
+        trajectory.close()
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    PerformanceTest().run()
@@ -0,0 +1,360 @@
+"""
+Offscreen raster rendering without Tk: RasterCanvas has the item methods of a tkinter Canvas that the
+animations use (create_polygon, create_oval, create_rectangle, create_line, coords, move, itemconfigure,
+delete, tag_raise) and rasterizes its items into a NumPy RGB frame buffer with a scanline polygon fill.
+All polygons of a frame are filled in one vectorized pass; ovals are drawn as 16-sided polygons.
+With the numba kernel backend (see kernels.py) a compiled kernel paints the items one by one instead,
+into exactly the same pixels; that is a lot faster, because it doesn't need the arrays of all spans and pixels.
+Text items are kept but not rendered (there is no font rasterizer).
+The frame buffer holds uint16 palette indices, so a canvas can use up to 65536 different colors over its lifetime.
+The frames can be written as a raw rgb24 video stream (for instance piped into ffmpeg) or as a PNG sequence.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import math
+import struct
+import zlib
+import numpy
+import kernels
+
+COLORS = {
+    "black": (0, 0, 0), "white": (255, 255, 255), "red": (255, 0, 0), "green": (0, 255, 0), "blue": (0, 0, 255),
+    "yellow": (255, 255, 0), "orange": (255, 165, 0), "pink": (255, 192, 203), "lightgrey": (211, 211, 211),
+    "gray60": (153, 153, 153), "gray80": (204, 204, 204), "chocolate": (210, 105, 30), "sienna": (160, 82, 45),
+    "green3": (0, 205, 0), "green4": (0, 139, 0),
+}
+
+MAX_COLORS = 65536      # the pixels are uint16 palette indices
+OVAL_SIDES = 16
+OVAL_DIRECTIONS = [(math.cos(2*math.pi*i/OVAL_SIDES), math.sin(2*math.pi*i/OVAL_SIDES)) for i in range(OVAL_SIDES)]
+
+
+def color_rgb(color):
+    """Tk color name or #rrggbb to an (r, g, b) tuple"""
+    if color.startswith("#") and len(color) == 7:
+        return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+    try:
+        return COLORS[color.lower()]
+    except KeyError:
+        raise ValueError("unknown color name: " + color)
+
+
+class RasterCanvas(object):
+    """
+    A drop-in for the tkinter Canvas (as far as the animations use it) that renders to a NumPy array.
+    Call render() to get the frame as an (height, width, 3) uint8 array.
+    """
+    defaults = {
+        "create_polygon": {"fill": "black", "outline": ""},
+        "create_oval": {"fill": "", "outline": "black"},
+        "create_rectangle": {"fill": "", "outline": "black"},
+        "create_line": {"fill": "black"},
+        "create_text": {"fill": "black"},
+    }
+
+    def __init__(self, width, height, background="black"):
+        self.width, self.height = width, height
+        self.background = background
+        self.items = {}         # item id -> [method, coords, options, tags], in stacking order
+        self.next_id = 1
+        self.palette = {}       # color -> index
+        self.palette_rgb = []
+
+    def __getitem__(self, option):
+        if option == "width":
+            return str(self.width)
+        if option == "height":
+            return str(self.height)
+        if option == "background":
+            return self.background
+        raise KeyError(option)
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def _create(self, method, args, options):
+        if len(args) == 1:
+            args = args[0]      # a list of points or coordinates
+        coords = [float(c) for xy in args for c in xy] if args and type(args[0]) in (tuple, list) else [float(c) for c in args]
+        item_options = dict(self.defaults[method])
+        item_options.update(options)
+        tags = item_options.pop("tags", ())
+        item_id = self.next_id
+        self.next_id += 1
+        self.items[item_id] = [method, coords, item_options, (tags,) if isinstance(tags, str) else tuple(tags)]
+        return item_id
+
+    def create_polygon(self, *args, **options):
+        return self._create("create_polygon", args, options)
+
+    def create_oval(self, *args, **options):
+        return self._create("create_oval", args, options)
+
+    def create_rectangle(self, *args, **options):
+        return self._create("create_rectangle", args, options)
+
+    def create_line(self, *args, **options):
+        return self._create("create_line", args, options)
+
+    def create_text(self, *args, **options):
+        return self._create("create_text", args, options)
+
+    def _find(self, tag_or_id):
+        if tag_or_id == "all":
+            return list(self.items)
+        if tag_or_id in self.items:
+            return [tag_or_id]
+        return [item_id for item_id, item in self.items.items() if tag_or_id in item[3]]
+
+    def coords(self, item_id, *coords):
+        self.items[item_id][1] = [float(c) for c in coords]
+
+    def move(self, tag_or_id, dx, dy):
+        for item_id in self._find(tag_or_id):
+            coords = self.items[item_id][1]
+            coords[0::2] = [x + dx for x in coords[0::2]]
+            coords[1::2] = [y + dy for y in coords[1::2]]
+
+    def itemconfigure(self, item_id, **options):
+        tags = options.pop("tags", None)
+        for i in self._find(item_id):
+            self.items[i][2].update(options)
+            if tags is not None:
+                self.items[i][3] = (tags,) if isinstance(tags, str) else tuple(tags)
+
+    itemconfig = itemconfigure
+
+    def delete(self, *tags_or_ids):
+        for tag_or_id in tags_or_ids:
+            for item_id in self._find(tag_or_id):
+                del self.items[item_id]
+
+    def tag_raise(self, tag_or_id):
+        for item_id in self._find(tag_or_id):
+            self.items[item_id] = self.items.pop(item_id)
+
+    def _color_index(self, color):
+        index = self.palette.get(color)
+        if index is None:
+            if len(self.palette_rgb) >= MAX_COLORS:
+                raise ValueError("too many different colors on the raster canvas (max {:d})".format(MAX_COLORS))
+            index = self.palette[color] = len(self.palette_rgb)
+            self.palette_rgb.append(color_rgb(color))
+        return index
+
+    def render(self):
+        """rasterizes the visible items, in stacking order, and returns the frame as an (height, width, 3) uint8 array"""
+        polygons = {}       # number of coordinates -> (item numbers, coordinates)
+        boxes = {"create_oval": ([], []), "create_rectangle": ([], [])}
+        fills, outlines, lines = [], [], []
+        for method, coords, options, _ in self.items.values():
+            if options.get("state") == "hidden" or method == "create_text":
+                continue
+            number = len(fills)
+            if method == "create_line":
+                fills.append(-1)
+                outlines.append(self._color_index(options["fill"]) if options["fill"] else -1)
+                lines.append(number)
+            else:
+                fills.append(self._color_index(options["fill"]) if options["fill"] else -1)
+                outlines.append(self._color_index(options["outline"]) if options["outline"] else -1)
+            group = boxes[method] if method in boxes else polygons.setdefault(len(coords), ([], []))
+            group[0].append(number)
+            group[1].append(coords)
+        edges = []
+        for numbers, coords in polygons.values():
+            edges.append(polygon_edges(numpy.array(coords).reshape(len(numbers), -1, 2), numbers))
+        for method, (numbers, coords) in boxes.items():
+            if numbers:
+                x0, y0, x1, y1 = numpy.array(coords).T
+                if method == "create_rectangle":
+                    vertices = numpy.stack([numpy.stack([x0, x1, x1, x0], axis=1), numpy.stack([y0, y0, y1, y1], axis=1)], axis=2)
+                else:
+                    directions = numpy.array(OVAL_DIRECTIONS)
+                    vertices = numpy.empty((len(numbers), OVAL_SIDES, 2))
+                    vertices[..., 0] = ((x0+x1)/2)[:, numpy.newaxis] + ((x1-x0)/2)[:, numpy.newaxis] * directions[:, 0]
+                    vertices[..., 1] = ((y0+y1)/2)[:, numpy.newaxis] + ((y1-y0)/2)[:, numpy.newaxis] * directions[:, 1]
+                edges.append(polygon_edges(vertices, numbers))
+        pixels = numpy.full(self.width * self.height, self._color_index(self.background), dtype=numpy.uint16)
+        if edges:
+            edges = numpy.concatenate(edges)
+            edges = edges[numpy.argsort(edges[:, 4], kind="stable")]   # in stacking order
+            fills, outlines = numpy.array(fills), numpy.array(outlines)
+            if kernels.BACKEND == "numba":
+                bounds = numpy.searchsorted(edges[:, 4], numpy.arange(len(fills) + 1))
+                is_line = numpy.zeros(len(fills), dtype=numpy.bool_)
+                is_line[lines] = True
+                paint_items(pixels, edges, bounds, fills, outlines, is_line, self.width, self.height)
+                return self._rgb(pixels)
+            filled = fills[edges[:, 4].astype(numpy.intp)] >= 0
+            span_starts, span_lengths, span_items = fill_spans(edges[filled], self.width, self.height)
+            outlined = outlines[edges[:, 4].astype(numpy.intp)] >= 0
+            if lines:
+                outlined &= ~(numpy.isin(edges[:, 4], lines) & (edges[:, 5] == 1))     # lines are not closed
+            outline_pixels, outline_items = edge_pixels(edges[outlined], self.width, self.height)
+            # paint in stacking order: per item first its fill spans, then its outline pixels (spans of length 1).
+            # Both are in item order already, so they only have to be merged.
+            outline_positions = numpy.searchsorted(span_items, outline_items, side="right") + numpy.arange(len(outline_items))
+            is_span = numpy.ones(len(span_items) + len(outline_items), dtype=numpy.bool_)
+            is_span[outline_positions] = False
+            starts = numpy.empty(len(is_span), dtype=numpy.intp)
+            starts[is_span] = span_starts
+            starts[outline_positions] = outline_pixels
+            lengths = numpy.ones(len(is_span), dtype=numpy.intp)
+            lengths[is_span] = span_lengths
+            colors = numpy.empty(len(is_span), dtype=numpy.uint16)
+            colors[is_span] = fills[span_items]
+            colors[outline_positions] = outlines[outline_items]
+            offsets = numpy.repeat(starts - (numpy.cumsum(lengths) - lengths), lengths)
+            pixels[offsets + numpy.arange(len(offsets))] = numpy.repeat(colors, lengths)
+        return self._rgb(pixels)
+
+    def _rgb(self, pixels):
+        # look up the colors as 32 bits words, that is a lot faster than a lookup of rgb triples
+        palette = numpy.zeros((len(self.palette_rgb), 4), dtype=numpy.uint8)
+        palette[:, :3] = self.palette_rgb
+        return palette.view(numpy.uint32)[pixels].view(numpy.uint8).reshape(self.height, self.width, 4)[:, :, :3]
+
+
+def polygon_edges(vertices, numbers):
+    """
+    The edges of polygons given as an (n,k,2) array, as rows of (x0, y0, x1, y1, item number, closing edge).
+    The closing edge goes from the last vertex back to the first.
+    """
+    count, size, _ = vertices.shape
+    edges = numpy.empty((count, size, 6))
+    edges[:, :, 0:2] = vertices
+    edges[:, :, 2:4] = numpy.roll(vertices, -1, axis=1)
+    edges[:, :, 4] = numpy.array(numbers)[:, numpy.newaxis]
+    edges[:, :, 5] = 0
+    edges[:, -1, 5] = 1
+    return edges.reshape(-1, 6)
+
+
+def fill_spans(edges, width, height):
+    """
+    Scanline fill (even-odd rule, sampled at the pixel centers) of the polygons the edges belong to.
+    Every edge crosses the scanlines between its end points; the crossings are sorted per item and scanline,
+    and every pair of crossings is a span of pixels to fill.
+    Returns the spans as start pixel indices, lengths and item numbers, in item order.
+    """
+    x0, y0, x1, y1, items = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3], edges[:, 4].astype(numpy.intp)
+    first_row = numpy.clip(numpy.ceil(numpy.minimum(y0, y1) - 0.5), 0, height).astype(numpy.intp)
+    end_row = numpy.clip(numpy.ceil(numpy.maximum(y0, y1) - 0.5), 0, height).astype(numpy.intp)
+    num_rows = numpy.maximum(end_row - first_row, 0)
+    edge = numpy.repeat(numpy.arange(len(edges)), num_rows)
+    rows = first_row[edge] + numpy.arange(len(edge)) - numpy.repeat(numpy.cumsum(num_rows) - num_rows, num_rows)
+    xs = x0[edge] + (rows + 0.5 - y0[edge]) * ((x1 - x0) / numpy.where(y1 == y0, 1, y1 - y0))[edge]
+    key = (items[edge] * height + rows) * (width + 2.0) + numpy.clip(xs, -1, width) + 1
+    order = numpy.argsort(key)
+    xs, rows, edge_items = xs[order], rows[order], items[edge][order]
+    start = numpy.clip(numpy.ceil(xs[0::2] - 0.5), 0, width).astype(numpy.intp)
+    end = numpy.clip(numpy.ceil(xs[1::2] - 0.5), 0, width).astype(numpy.intp)
+    return rows[0::2] * width + start, numpy.maximum(end - start, 0), edge_items[0::2]
+
+
+@kernels.jit
+def paint_items(pixels, edges, bounds, fills, outlines, is_line, width, height):
+    # Paints every item in stacking order: its fill spans, then its outline pixels, the same pixels
+    # as fill_spans and edge_pixels give. The edges of item i are edges[bounds[i]:bounds[i+1]].
+    xs = numpy.empty(len(edges))
+    for item in range(len(bounds) - 1):
+        first, last = bounds[item], bounds[item+1]
+        if fills[item] >= 0:
+            top, bottom = height, 0
+            for e in range(first, last):
+                top = min(top, max(math.ceil(min(edges[e, 1], edges[e, 3]) - 0.5), 0))
+                bottom = max(bottom, min(math.ceil(max(edges[e, 1], edges[e, 3]) - 0.5), height))
+            for row in range(top, bottom):
+                # the crossings of the edges with this scanline, sorted on x (clipped to -1..width)
+                count = 0
+                for e in range(first, last):
+                    x0, y0, x1, y1 = edges[e, 0], edges[e, 1], edges[e, 2], edges[e, 3]
+                    if math.ceil(min(y0, y1) - 0.5) <= row < math.ceil(max(y0, y1) - 0.5):
+                        x = x0 + (row + 0.5 - y0) * ((x1 - x0) / (1.0 if y1 == y0 else y1 - y0))
+                        key = min(max(x, -1.0), width)
+                        k = count
+                        while k > 0 and min(max(xs[k-1], -1.0), width) > key:
+                            xs[k] = xs[k-1]
+                            k -= 1
+                        xs[k] = x
+                        count += 1
+                for k in range(0, count - 1, 2):
+                    start = min(max(math.ceil(xs[k] - 0.5), 0), width)
+                    end = min(max(math.ceil(xs[k+1] - 0.5), 0), width)
+                    if end > start:
+                        pixels[row*width+start:row*width+end] = fills[item]
+        if outlines[item] >= 0:
+            for e in range(first, last):
+                if is_line[item] and edges[e, 5] == 1:
+                    continue    # lines are not closed
+                x0, y0 = edges[e, 0], edges[e, 1]
+                dx, dy = edges[e, 2] - x0, edges[e, 3] - y0
+                if dx == 0 and dy == 0:
+                    continue
+                steps = math.ceil(max(abs(dx), abs(dy))) + 1
+                divisor = max(steps - 1, 1)
+                for k in range(steps):
+                    t = k / divisor
+                    x = math.floor(x0 + t * dx)
+                    y = math.floor(y0 + t * dy)
+                    if 0 <= x < width and 0 <= y < height:
+                        pixels[y*width+x] = outlines[item]
+
+
+def edge_pixels(edges, width, height):
+    """the pixels along the edges (one pixel wide lines), with the item number of every pixel, in edge order"""
+    start, delta = edges[:, 0:2], edges[:, 2:4] - edges[:, 0:2]
+    steps = numpy.ceil(numpy.abs(delta).max(axis=1)).astype(numpy.intp) + 1
+    steps[numpy.all(delta == 0, axis=1)] = 0
+    edge = numpy.repeat(numpy.arange(len(edges)), steps)
+    t = (numpy.arange(len(edge)) - numpy.repeat(numpy.cumsum(steps) - steps, steps)) / numpy.maximum(steps - 1, 1)[edge]
+    x = numpy.floor(start[edge, 0] + t * delta[edge, 0]).astype(numpy.intp)
+    y = numpy.floor(start[edge, 1] + t * delta[edge, 1]).astype(numpy.intp)
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    return (y * width + x)[inside], edges[edge, 4].astype(numpy.intp)[inside]
+
+
+def png_bytes(frame):
+    """encodes an (height, width, 3) uint8 frame as PNG"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    height, width, _ = frame.shape
+    rows = numpy.zeros((height, width * 3 + 1), dtype=numpy.uint8)
+    rows[:, 1:] = frame.reshape(height, width * 3)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(rows.tobytes(), 1)) + chunk(b"IEND", b""))
+
+
+class PngSequenceWriter(object):
+    """writes every frame to its own PNG file, the pattern is formatted with the frame number"""
+    def __init__(self, pattern="frame{:06d}.png"):
+        self.pattern = pattern
+        self.frames = 0
+
+    def write(self, frame):
+        with open(self.pattern.format(self.frames), "wb") as outfile:
+            outfile.write(png_bytes(frame))
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class RawVideoWriter(object):
+    """
+    Writes the frames as a raw rgb24 video stream to a binary file object, for instance
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s 1000x600 -r 60 -i frames.raw video.mp4
+    """
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self.frames = 0
+
+    def write(self, frame):
+        self.outfile.write(numpy.ascontiguousarray(frame).tobytes())
+        self.frames += 1
+
+    def close(self):
+        self.outfile.flush()
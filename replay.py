@@ -0,0 +1,172 @@
+"""
+Recording and replay of landing game runs.
+A recording is the input timeline of a run: the key press and release events with the physics step
+at which they happened, plus the initial state of the rocket and periodic snapshots of its state.
+Because the physics run at a fixed rate, replaying the events gives exactly the same flight again.
+A replay runs headless as fast as possible, and can seek to any step by restoring the nearest
+snapshot before it and simulating the remaining steps from there.
+
+The file format is a stream of binary records, so it can be written while the game is running
+and read back (or skipped through) record by record:
+    header:     b"RKTR", version, world width, world height, snapshot interval
+    records:    one type byte followed by its data
+        b"E":   event: step, pressed flag, length of the key name, key name (utf-8)
+        b"S":   snapshot: step, rocket state (see Rocket.get_state)
+        b"Z":   end of the recording: the number of steps
+
+Usage: replay.py recording.rkr [...]        prints the outcome of every recording and the replay speed
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import bisect
+import struct
+import sys
+import time
+from rocketsimulator import RocketSimulator
+
+
+MAGIC = b"RKTR"
+VERSION = 2
+header_struct = struct.Struct("<4sHHHI")
+event_struct = struct.Struct("<IBB")
+step_struct = struct.Struct("<I")
+state_struct = struct.Struct("<12d4?3d")
+
+
+class Recorder(object):
+    """
+    Records the controls of a RocketSimulator to a binary file object, while it runs.
+    Every snapshot_interval steps a snapshot of the rocket state is written as well (0 means: only the initial state).
+    """
+    def __init__(self, simulator, outfile, snapshot_interval=300):
+        self.outfile = outfile
+        self.snapshot_interval = snapshot_interval
+        self.steps = simulator.steps
+        outfile.write(header_struct.pack(MAGIC, VERSION, int(simulator.world_width), int(simulator.world_height), snapshot_interval))
+        self.snapshot(simulator)
+        simulator.recorder = self
+
+    def event(self, step, pressed, key):
+        key = key.encode("utf-8")
+        self.outfile.write(b"E" + event_struct.pack(step, pressed, len(key)) + key)
+
+    def step(self, simulator):
+        """called by the simulator at the end of every update"""
+        self.steps = simulator.steps
+        if self.snapshot_interval and simulator.steps % self.snapshot_interval == 0:
+            self.snapshot(simulator)
+
+    def snapshot(self, simulator):
+        # the snapshot of step n is the state after n updates, before the events that happen at step n
+        self.outfile.write(b"S" + step_struct.pack(simulator.steps) + state_struct.pack(*simulator.rocket.get_state()))
+
+    def end_record(self):
+        return b"Z" + step_struct.pack(self.steps)
+
+    def close(self):
+        self.outfile.write(self.end_record())
+        self.outfile.flush()
+
+
+def read_records(infile):
+    """
+    Generator that reads the recording from the binary file object: first it yields the header
+    as ("header", world_width, world_height, snapshot_interval), then every record as
+    ("event", step, pressed, key), ("snapshot", step, state) or ("end", num_steps).
+    """
+    magic, version, world_width, world_height, snapshot_interval = header_struct.unpack(infile.read(header_struct.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a rocket recording or unsupported version")
+    yield "header", world_width, world_height, snapshot_interval
+    while True:
+        record_type = infile.read(1)
+        if record_type == b"E":
+            step, pressed, keylength = event_struct.unpack(infile.read(event_struct.size))
+            yield "event", step, bool(pressed), infile.read(keylength).decode("utf-8")
+        elif record_type == b"S":
+            step, = step_struct.unpack(infile.read(step_struct.size))
+            yield "snapshot", step, state_struct.unpack(infile.read(state_struct.size))
+        elif record_type == b"Z":
+            yield "end", step_struct.unpack(infile.read(step_struct.size))[0]
+            return
+        elif not record_type:
+            return      # recording was cut off (still being written, or the game was killed)
+        else:
+            raise ValueError("invalid record type {!r}".format(record_type))
+
+
+class Recording(object):
+    """A recording loaded in memory: the events sorted on step, and the snapshots by step."""
+    def __init__(self, infile):
+        self.events = []
+        self.snapshots = {}
+        self.num_steps = 0
+        records = read_records(infile)
+        _, self.world_width, self.world_height, self.snapshot_interval = next(records)
+        for record in records:
+            if record[0] == "event":
+                self.events.append(record[1:])
+                self.num_steps = max(self.num_steps, record[1])
+            elif record[0] == "snapshot":
+                self.snapshots[record[1]] = record[2]
+                self.num_steps = max(self.num_steps, record[1])
+            else:
+                self.num_steps = record[1]
+        self.event_steps = [event[0] for event in self.events]
+        self.snapshot_steps = sorted(self.snapshots)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "rb") as infile:
+            return cls(infile)
+
+
+class Replay(object):
+    """Headless, deterministic replay of a Recording, as fast as possible."""
+    def __init__(self, recording):
+        self.recording = recording
+
+    def simulator_at(self, step):
+        """a RocketSimulator in the state at the given step: restored from the nearest snapshot and simulated from there"""
+        recording = self.recording
+        snapshot_step = recording.snapshot_steps[max(0, bisect.bisect_right(recording.snapshot_steps, step) - 1)]
+        simulator = RocketSimulator(recording.world_width, recording.world_height)
+        simulator.rocket.set_state(recording.snapshots[snapshot_step])
+        simulator.steps = snapshot_step
+        self.simulate(simulator, step)
+        return simulator
+
+    def simulate(self, simulator, step):
+        """simulate from the current step of the simulator until the given step, applying the recorded events"""
+        events, event_steps = self.recording.events, self.recording.event_steps
+        event_index = bisect.bisect_left(event_steps, simulator.steps)
+        while simulator.steps < step:
+            while event_index < len(events) and event_steps[event_index] <= simulator.steps:
+                _, pressed, key = events[event_index]
+                if pressed:
+                    simulator.keypress(key)
+                else:
+                    simulator.keyrelease(key)
+                event_index += 1
+            simulator.update()
+
+    def run(self):
+        """replay the whole recording, returns the simulator at the end of it"""
+        return self.simulator_at(self.recording.num_steps)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("give the file names of the recordings to replay")
+    for filename in sys.argv[1:]:
+        recording = Recording.load(filename)
+        start_time = time.time()
+        simulator = Replay(recording).run()
+        duration = time.time() - start_time
+        rocket = simulator.rocket
+        outcome = "crashed" if rocket.crashed else "touchdown" if rocket.touchdown else "airborne"
+        print("{:s}: {:d} steps, {:d} events, {:s} {:s}  (replayed in {:.3f} sec)"
+              .format(filename, recording.num_steps, len(recording.events), outcome,
+                      (simulator.landing_pad() or "") if rocket.touchdown else "", duration))
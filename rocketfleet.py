@@ -0,0 +1,336 @@
+"""
+Structure-of-arrays rocket fleet: simulates many rockets at once using NumPy.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import math
+import numpy
+from vectors import Vector2D
+from rocketsimulator import Rocket
+import kernels
+
+
+class RocketTemplates(object):
+    """
+    The local (unrotated, unscaled) hull, flame and thruster points of a rocket class,
+    as complex NumPy arrays relative to the rotation point. Computed only once per class.
+    """
+    _cache = {}
+
+    def __init__(self, rocket_class):
+        self.pivot = complex(*rocket_class.rotation_point)
+        self.scale = rocket_class.draw_scale
+        self.hull = numpy.array([complex(*xy) for xy in rocket_class.rocket_vertices])
+        self.flame_x = numpy.array([x for x, _ in rocket_class.engine_flame_vertices], dtype=float)
+        self.flame_y = numpy.array([y for _, y in rocket_class.engine_flame_vertices], dtype=float)
+        self.thrusters = numpy.array([complex(*xy) for xy in rocket_class.thruster_positions])
+
+    @classmethod
+    def of(cls, rocket_class):
+        templates = cls._cache.get(rocket_class)
+        if templates is None:
+            templates = cls._cache[rocket_class] = cls(rocket_class)
+        return templates
+
+
+def transform_vertices(points, rotations, positions, world_width, world_height, templates):
+    """
+    Rotates the local points around the rotation point, scales them, moves them to the rocket positions
+    and flips the y axis, in one vectorized pass over all rockets (the same math as Rocket.draw_calls).
+    points is either one template of shape (k,) shared by all rockets, or an array of shape (n,k).
+    Returns the screen coordinates as a float array of shape (n,k,2).
+    The rotation is written out in real arithmetic, rather than as a complex multiplication (which NumPy may
+    compute with fused multiply-adds, depending on the cpu), so that the compiled kernels can give identical results.
+    """
+    rotors = numpy.exp(rotations * 1j)[:, numpy.newaxis]
+    cos, sin = rotors.real, rotors.imag
+    points = points - templates.pivot
+    x, y = points.real, points.imag
+    result = numpy.empty(numpy.broadcast(cos, x).shape + (2,))
+    result[..., 0] = (cos*x - sin*y + templates.pivot.real) * templates.scale + (world_width / 2 + positions.real)[:, numpy.newaxis]
+    result[..., 1] = world_height - ((sin*x + cos*y + templates.pivot.imag) * templates.scale + (10 + positions.imag)[:, numpy.newaxis])
+    return result
+
+
+class RocketFleet(object):
+    """
+    Keeps the state of many rockets in contiguous NumPy arrays, one array per attribute,
+    and updates all of them in a single batched step. The physics are identical to Rocket.update().
+    Just like Vector2D, the (x,y) coordinates are stored as complex numbers.
+    The arrays have a fixed capacity (growing it reallocates them); the attributes are views
+    on the part of the arrays that is in use, so they can be modified in place.
+    The arrays can also be laid out in a buffer that you provide (such as shared memory),
+    see buffer_size(). Such a fleet can't grow beyond its capacity.
+    Set integrator to an integrators.Integrator to use that instead of the fixed unit step.
+    The world size can also be an array with the size per rocket, for the physics (see manyworlds.py), not for drawing.
+    The step and the screen vertices are computed by the compiled kernels of kernels.py if that backend is selected.
+    """
+    integrator = None
+    fields = [
+        ("position", numpy.complex128),
+        ("velocity", numpy.complex128),
+        ("acceleration", numpy.complex128),
+        ("thrust", numpy.complex128),
+        ("rotation", numpy.float64),
+        ("rotation_speed", numpy.float64),
+        ("rotation_acceleration", numpy.float64),
+        ("engine_throttle", numpy.float64),
+        ("crashed", numpy.bool_),
+        ("touchdown", numpy.bool_),
+        ("left_thruster_on", numpy.bool_),
+        ("right_thruster_on", numpy.bool_),
+    ]
+
+    def __init__(self, world_width, world_height, capacity=1000, rocket_class=Rocket, buffer=None):
+        self.world_width, self.world_height = world_width, world_height
+        self.rocket_class = rocket_class
+        self.templates = RocketTemplates.of(rocket_class)
+        self.buffer = buffer
+        self.count = 0
+        self._allocate(max(capacity, 1))
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def buffer_size(cls, capacity):
+        """the number of bytes a buffer must have to hold the arrays for the given capacity"""
+        return sum(cls._array_size(dtype, capacity) for _, dtype in cls.fields)
+
+    @staticmethod
+    def _array_size(dtype, capacity):
+        return (numpy.dtype(dtype).itemsize * capacity + 15) // 16 * 16     # keep every array 16-byte aligned
+
+    def _allocate(self, capacity):
+        old_arrays = getattr(self, "arrays", None)
+        if self.buffer is None:
+            arrays = {name: numpy.zeros(capacity, dtype) for name, dtype in self.fields}
+        elif old_arrays:
+            raise ValueError("can't grow a fleet beyond the capacity of its buffer")
+        else:
+            if self.buffer_size(capacity) > len(self.buffer):
+                raise ValueError("buffer is too small for the fleet capacity")
+            arrays, offset = {}, 0
+            for name, dtype in self.fields:
+                arrays[name] = numpy.ndarray(capacity, dtype, buffer=self.buffer, offset=offset)
+                offset += self._array_size(dtype, capacity)
+        if old_arrays:
+            for name, array in old_arrays.items():
+                arrays[name][:self.count] = array[:self.count]
+        self.capacity = capacity
+        self.arrays = arrays
+        self._update_views()
+
+    def _update_views(self):
+        for name, _ in self.fields:
+            setattr(self, name, self.arrays[name][:self.count])
+
+    def set_count(self, count):
+        """change the number of rockets in use (within the capacity), for instance when another process added some"""
+        if not 0 <= count <= self.capacity:
+            raise ValueError("count must be between 0 and the fleet capacity")
+        self.count = count
+        self._update_views()
+
+    def view(self, start, stop):
+        """returns a fleet of the rockets in the range start:stop, that shares the arrays with this fleet"""
+        fleet = RocketFleet.__new__(RocketFleet)
+        fleet.__dict__.update(self.__dict__)
+        fleet.arrays = {name: array[start:stop] for name, array in self.arrays.items()}
+        fleet.buffer = None
+        fleet.count = fleet.capacity = len(fleet.arrays["position"])
+        fleet._update_views()
+        return fleet
+
+    def copy(self):
+        """returns an independent copy of the rockets in use"""
+        fleet = RocketFleet(self.world_width, self.world_height, self.count, self.rocket_class)
+        fleet.set_count(self.count)
+        for name, _ in self.fields:
+            getattr(fleet, name)[:] = getattr(self, name)
+        return fleet
+
+    def take(self, indices):
+        """returns an independent copy of the rockets at the given indices (an index array or a boolean mask)"""
+        indices = numpy.flatnonzero(indices) if numpy.asarray(indices).dtype == numpy.bool_ else indices
+        fleet = RocketFleet(self.world_width, self.world_height, len(indices), self.rocket_class)
+        fleet.set_count(len(indices))
+        for name, _ in self.fields:
+            getattr(fleet, name)[:] = getattr(self, name)[indices]
+        return fleet
+
+    def put(self, indices, fleet):
+        """store the state of the rockets of the given fleet (for instance from take()) back at the given indices"""
+        for name, _ in self.fields:
+            getattr(self, name)[indices] = getattr(fleet, name)
+
+    def release(self):
+        """drop the arrays, so that the buffer they were laid out in can be closed"""
+        self.arrays = {}
+        for name, _ in self.fields:
+            setattr(self, name, None)
+        self.count = self.capacity = 0
+
+    def append(self, rocket):
+        """add a rocket to the fleet, copying the state of the given Rocket object"""
+        if self.count >= self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self.count += 1
+        self._update_views()
+        self.position[i] = rocket.position.vec
+        self.velocity[i] = rocket.velocity.vec
+        self.acceleration[i] = rocket.acceleration.vec
+        self.thrust[i] = rocket.thrust
+        self.rotation[i] = rocket.rotation
+        self.rotation_speed[i] = rocket.rotation_speed
+        self.rotation_acceleration[i] = rocket.rotation_acceleration
+        self.engine_throttle[i] = rocket.engine_throttle
+        self.crashed[i] = rocket.crashed
+        self.touchdown[i] = rocket.touchdown
+        self.left_thruster_on[i] = rocket.left_thruster_on
+        self.right_thruster_on[i] = rocket.right_thruster_on
+        return i
+
+    def rocket(self, index):
+        """returns a new Rocket object with a copy of the state of the rocket at the given index"""
+        rocket = self.rocket_class(self.world_width, self.world_height)
+        rocket.position = Vector2D(complex(self.position[index]))
+        rocket.velocity = Vector2D(complex(self.velocity[index]))
+        rocket.acceleration = Vector2D(complex(self.acceleration[index]))
+        rocket.thrust = complex(self.thrust[index])
+        rocket.rotation = float(self.rotation[index])
+        rocket.rotation_speed = float(self.rotation_speed[index])
+        rocket.rotation_acceleration = float(self.rotation_acceleration[index])
+        rocket.engine_throttle = float(self.engine_throttle[index])
+        rocket.crashed = bool(self.crashed[index])
+        rocket.touchdown = bool(self.touchdown[index])
+        rocket.left_thruster_on = bool(self.left_thruster_on[index])
+        rocket.right_thruster_on = bool(self.right_thruster_on[index])
+        return rocket
+
+    def apply_force(self, force):
+        """force is a complex number or an array of them (one per rocket)"""
+        self.acceleration += force
+
+    def apply_thrust(self, force):
+        """force along the rockets' own axes, see Rocket.apply_thrust"""
+        self.thrust += force
+
+    def apply_rotation(self, force):
+        self.rotation_acceleration += numpy.where(self.touchdown, 0.0, force)
+
+    def apply_gravity(self, gravity):
+        self.acceleration[~self.touchdown] -= gravity * 1j    # gravity is a force pointing downwards
+
+    def step(self, bounce=False):
+        """
+        Updates all rockets, like calling Rocket.update() on each of them.
+        If bounce is True, rockets bounce off the world edges like in the performance tests.
+        """
+        if kernels.usable(self):
+            kernels.step(self, bounce)
+            return
+        if self.integrator:
+            self.position[:], self.velocity[:], self.rotation[:], self.rotation_speed[:] = self.integrator.advance(
+                self.position, self.velocity, self.rotation, self.rotation_speed,
+                self.acceleration, self.thrust, self.rotation_acceleration, numpy)
+        else:
+            if self.thrust.any():
+                # thrust * exp(rotation*1j), in real arithmetic like transform_vertices
+                rotors = numpy.exp(self.rotation*1j)
+                self.acceleration.real += self.thrust.real * rotors.real - self.thrust.imag * rotors.imag
+                self.acceleration.imag += self.thrust.real * rotors.imag + self.thrust.imag * rotors.real
+            self.velocity += self.acceleration
+            self.position += self.velocity
+            self.rotation += self.rotation_speed
+            numpy.remainder(self.rotation, 2*math.pi, out=self.rotation)
+            self.rotation_speed += self.rotation_acceleration
+        self.acceleration[:] = 0
+        self.thrust[:] = 0
+        self.rotation_acceleration[:] = 0
+        speed = numpy.abs(self.velocity)
+        below_ground = self.position.imag <= 0
+        moving = speed > 0
+        # safe touchdown (low velocity and almost no rotation)
+        landed = below_ground & moving & (speed < 2) & (numpy.abs(self.rotation) < 0.15)
+        if landed.any():
+            self._set_touchdown_position(landed)
+        self.crashed |= below_ground & moving & ~landed
+        self.touchdown[:] = (self.position.imag == 0) & (self.velocity == 0)
+        x, y = self.position.real, self.position.imag
+        self.crashed |= (x <= self.world_width/-2) | (x >= self.world_width/2) | (y >= self.world_height)
+        if bounce:
+            self.bounce()
+
+    def bounce(self):
+        """flip the velocity of rockets that are outside of the world area, like the performance tests do"""
+        x, y = self.position.real, self.position.imag
+        outside = ~((-self.world_width/2 < x) & (x < self.world_width/2))
+        self.velocity[outside] = -self.velocity[outside].conjugate()
+        outside = ~((0 < y) & (y < self.world_height))
+        self.velocity[outside] = self.velocity[outside].conjugate()
+
+    def screen_vertices(self):
+        """
+        Returns the screen coordinates of the hull, engine flame and thruster points of all rockets,
+        as arrays of shape (n,7,2), (n,9,2) and (n,2,2). The flame is sized by the engine throttle.
+        """
+        if kernels.BACKEND == "numba":
+            return kernels.screen_vertices(self)
+        templates = self.templates
+        args = (self.rotation, self.position, self.world_width, self.world_height, templates)
+        hull = transform_vertices(templates.hull, *args)
+        flames = templates.flame_x + 1j * (templates.flame_y * self.engine_throttle[:, numpy.newaxis])
+        flame = transform_vertices(flames, *args)
+        thrusters = transform_vertices(templates.thrusters, *args)
+        return hull, flame, thrusters
+
+    def step_and_screen_vertices(self, bounce=False):
+        """step() followed by screen_vertices(); the compiled kernels do both in a single pass over the rockets"""
+        if kernels.usable(self):
+            return kernels.step_and_screen_vertices(self, bounce)
+        self.step(bounce)
+        return self.screen_vertices()
+
+    def draw_calls(self, grouped=False):
+        """
+        The same draw calls as Rocket.draw_calls() produces for every rocket in the fleet, in fleet order.
+        If grouped is True, it returns a list with the draw calls of each rocket instead of one list.
+        """
+        calls = []
+        hull, flame, thrusters = self.screen_vertices()
+        hull, flame, thrusters = hull.tolist(), flame.tolist(), thrusters.tolist()
+        throttle = self.engine_throttle.tolist()
+        left, right = self.left_thruster_on.tolist(), self.right_thruster_on.tolist()
+        hull_colors = {"fill": "blue", "outline": "lightgrey"}
+        flame_colors = {"outline": "orange", "fill": "yellow"}
+        for i in range(self.count):
+            rocket_calls = [] if grouped else calls
+            rocket_calls.append(("create_polygon", ([tuple(xy) for xy in hull[i]],), dict(hull_colors)))
+            if throttle[i]:
+                rocket_calls.append(("create_polygon", ([tuple(xy) for xy in flame[i]],), dict(flame_colors)))
+            if left[i]:
+                x, y = thrusters[i][0]
+                rocket_calls.append(("create_oval", (x-3, y-3, x+3, y+3), dict(flame_colors)))
+            if right[i]:
+                x, y = thrusters[i][1]
+                rocket_calls.append(("create_oval", (x-3, y-3, x+3, y+3), dict(flame_colors)))
+            if grouped:
+                calls.append(rocket_calls)
+        return calls
+
+    def _set_touchdown_position(self, mask):
+        self.position[mask] = self.position.real[mask]
+        self.velocity[mask] = 0
+        self.acceleration[mask] = 0
+        self.thrust[mask] = 0
+        self.rotation[mask] = 0.0
+        self.rotation_speed[mask] = 0.0
+        self.rotation_acceleration[mask] = 0.0
+        self.crashed[mask] = False
+        self.engine_throttle[mask] = 0.0
+        self.left_thruster_on[mask] = False
+        self.right_thruster_on[mask] = False
@@ -7,8 +7,13 @@ Open source software license: MIT.
 from __future__ import print_function, division
 import time
 import math
-from vectors import Vector2D
-from tkanimation import AnimationWindow, tkinter
+import cmath
+from vectors import Vector2D, ExactRotation
+from integrators import ScalarMath
+from tkanimation import AnimationWindow, LayeredScene, tkinter
+
+
+exact_rotation = ExactRotation()
 
 
 class Rocket(object):
@@ -16,19 +21,33 @@ class Rocket(object):
     Rocket with one main engine at the tail, and two RCS thrusters on the left and right side.
     The main engine provides force to move the rocket forwards, the RCS (reaction control system)
     thrusters provide rotation around the rocket's center of mass (somewhere in the lower section)
+    The shape of the rocket is the same for all rockets, so it is defined once on the class.
+    The state uses __slots__ and is updated in place, to keep rockets small and fast in large numbers.
     """
-    def __init__(self, world_width, world_height, initial_x_position=None):
+    __slots__ = ("world_width", "world_height", "position", "velocity", "acceleration", "thrust",
+                 "rotation", "rotation_speed", "rotation_acceleration", "crashed", "touchdown",
+                 "engine_throttle", "right_thruster_on", "left_thruster_on",
+                 "previous_position", "previous_rotation", "integrator", "draw_cache")
+    rocket_vertices = [(-2, 0), (-1, 1), (-1, 7), (0, 8), (1, 7), (1, 1), (2, 0)]
+    rotation_point = (0, 2.5)
+    engine_flame_vertices = [(-1, 0), (-1.5, -2), (-0.5, -2), (-1, -4), (0, -3), (1, -4), (0.5, -2), (1.5, -2), (1, 0)]
+    thruster_positions = [(-1.5, 7), (1.5, 7)]
+    simple_rocket_vertices = [(-2, 0), (0, 8), (2, 0)]      # for the simplified level of detail, see lod.py
+    simple_engine_flame_vertices = [(0, 0), (0, -4)]
+    draw_scale = 6
+    rotation_table = None     # set to a vectors.RotationTable to draw with quantized rotation angles
+
+    def __init__(self, world_width, world_height, initial_x_position=None, integrator=None, draw_cache=None):
         self.world_width, self.world_height = world_width, world_height
-        self.rocket_vertices = [(-2, 0), (-1, 1), (-1, 7), (0, 8), (1, 7), (1, 1), (2, 0)]
-        self.rotation_point = (0, 2.5)
-        self.engine_flame_vertices = [(-1, 0), (-1.5, -2), (-0.5, -2), (-1, -4), (0, -3), (1, -4), (0.5, -2), (1.5, -2), (1, 0)]
-        self.thruster_positions = [(-1.5, 7), (1.5, 7)]
+        self.integrator = integrator    # an integrators.Integrator to use instead of the fixed unit step, or None
+        self.draw_cache = draw_cache    # a drawcache.DrawCallCache to reuse the draw calls of earlier frames, or None
         self.set_touchdown_position(initial_x_position or 0.0)
 
     def set_touchdown_position(self, x_position):
         self.position = Vector2D((x_position, 0))
         self.velocity = Vector2D((0, 0))
         self.acceleration = Vector2D((0, 0))
+        self.thrust = 0j
         self.rotation = 0.0
         self.rotation_speed = 0.0
         self.rotation_acceleration = 0.0
@@ -37,13 +56,25 @@ class Rocket(object):
         self.engine_throttle = 0.0
         self.right_thruster_on = False
         self.left_thruster_on = False
+        self.previous_position = self.position.vec
+        self.previous_rotation = self.rotation
 
     def update(self):
-        self.velocity += self.acceleration
-        self.position += self.velocity
-        self.acceleration *= 0
-        self.rotation = (self.rotation + self.rotation_speed) % (2*math.pi)
-        self.rotation_speed += self.rotation_acceleration
+        self.previous_position = self.position.vec
+        self.previous_rotation = self.rotation
+        if self.integrator:
+            self.position.vec, self.velocity.vec, self.rotation, self.rotation_speed = self.integrator.advance(
+                self.position.vec, self.velocity.vec, self.rotation, self.rotation_speed,
+                self.acceleration.vec, self.thrust, self.rotation_acceleration, ScalarMath)
+        else:
+            if self.thrust:
+                self.acceleration.vec += self.thrust * cmath.exp(self.rotation*1j)
+            self.velocity += self.acceleration
+            self.position += self.velocity
+            self.rotation = (self.rotation + self.rotation_speed) % (2*math.pi)
+            self.rotation_speed += self.rotation_acceleration
+        self.acceleration.vec = 0j
+        self.thrust = 0j
         self.rotation_acceleration = 0.0
         if self.position.y <= 0:
             if 0 < self.velocity.length < 2 and abs(self.rotation) < 0.15:
@@ -55,96 +86,263 @@ class Rocket(object):
         if self.position.x <= self.world_width/-2 or self.position.x >= self.world_width/2 or self.position.y >= self.world_height:
             self.crashed = True
 
+    def get_state(self):
+        """the complete state of the rocket as a flat tuple of numbers and flags (see set_state)"""
+        return (self.position.x, self.position.y, self.velocity.x, self.velocity.y, self.acceleration.x, self.acceleration.y,
+                self.thrust.real, self.thrust.imag, self.rotation, self.rotation_speed, self.rotation_acceleration, self.engine_throttle,
+                self.crashed, self.touchdown, self.left_thruster_on, self.right_thruster_on,
+                self.previous_position.real, self.previous_position.imag, self.previous_rotation)
+
+    def set_state(self, state):
+        (px, py, vx, vy, ax, ay, tx, ty, self.rotation, self.rotation_speed, self.rotation_acceleration, self.engine_throttle,
+         self.crashed, self.touchdown, self.left_thruster_on, self.right_thruster_on, prevx, prevy, self.previous_rotation) = state
+        self.position = Vector2D((px, py))
+        self.velocity = Vector2D((vx, vy))
+        self.acceleration = Vector2D((ax, ay))
+        self.thrust = complex(tx, ty)
+        self.previous_position = complex(prevx, prevy)
+
     def apply_force(self, force):
-        self.acceleration += force
+        """force is a Vector2D or a complex number"""
+        self.acceleration.vec += force.vec if type(force) is Vector2D else force
+
+    def apply_thrust(self, force):
+        """force along the rocket's own axes (complex number, the nose points at 1j), it turns along with the rocket"""
+        self.thrust += force
 
     def apply_rotation(self, force):
         if not self.touchdown:
             self.rotation_acceleration += force
 
-    def draw(self, canvas):
-        for c in self.draw_calls():
+    def draw(self, canvas, alpha=1.0):
+        for c in self.draw_calls(alpha):
             getattr(canvas, c[0])(*c[1], **c[2])
 
-    def draw_calls(self):
+    def interpolated_pose(self, alpha):
+        """position (complex) and rotation in between the previous and the current update (alpha 0..1)"""
+        if alpha >= 1.0:
+            return self.position.vec, self.rotation
+        rotation_delta = (self.rotation - self.previous_rotation + math.pi) % (2*math.pi) - math.pi
+        return (self.previous_position + (self.position.vec - self.previous_position) * alpha,
+                self.previous_rotation + rotation_delta * alpha)
+
+    def screen_position(self, alpha=1.0):
+        """where the rocket is on the screen, (x, y)"""
+        position, _ = self.interpolated_pose(alpha)
+        return self.world_width / 2 + position.real, self.world_height - 10 - position.imag
+
+    def draw_pose(self, alpha=1.0, simplified=False):
+        """
+        (x, y, shape): where the rocket is on the screen, and everything else its draw calls depend on.
+        The draw calls of two poses with the same shape are translated copies of each other (see framediff.py).
+        """
+        position, rotation_angle = self.interpolated_pose(alpha)
+        return (self.world_width / 2 + position.real, self.world_height - 10 - position.imag,
+                (rotation_angle, self.engine_throttle, self.left_thruster_on, self.right_thruster_on, simplified))
+
+    def draw_calls(self, alpha=1.0, simplified=False):
+        """the draw calls of the rocket; simplified is the triangle hull and flame line of the lower level of detail"""
+        position, rotation_angle = self.interpolated_pose(alpha)
+        if self.draw_cache:
+            return self.draw_cache.draw_calls(self, position, rotation_angle, simplified)
+        return self.geometry(complex(self.world_width / 2, 10) + position, self.world_height, rotation_angle,
+                             self.rotation_table or exact_rotation, simplified)
+
+    def geometry(self, screen_offset, screen_height, rotation_angle, rotation=exact_rotation, simplified=False, engine_throttle=None):
+        """
+        the draw calls of the rocket, rotated over the angle, at the screen offset (complex, y pointing up);
+        the engine flame is drawn at the given throttle instead of the rocket's own, if it is not None
+        """
         def call(method, *vargs, **kwargs):
             return method, vargs, kwargs
+
+        def to_screen(points):
+            points = [scale*v+screen_offset for v in points]
+            return [(v.real, screen_height - v.imag) for v in points]
         calls = []
-        screen_offset = Vector2D((self.world_width / 2, 10))
-        screen_offset += self.position
-        scale = 6
+        scale = self.draw_scale
+        if engine_throttle is None:
+            engine_throttle = self.engine_throttle
+        if simplified:
+            points = to_screen(rotation.rotated(self.simple_rocket_vertices, self.rotation_point, rotation_angle))
+            calls.append(call("create_polygon", points, fill="blue", outline="lightgrey"))
+            if engine_throttle:
+                points = to_screen(rotation.rotated(self.simple_engine_flame_vertices, self.rotation_point, rotation_angle, engine_throttle))
+                calls.append(call("create_line", points, fill="yellow"))
+            return calls
         # rotate and position the rocket
-        points = [Vector2D(xy) for xy in self.rocket_vertices]
-        points = [v.rotate_around(self.rotation_point, self.rotation) for v in points]
-        points = [scale*v+screen_offset for v in points]
-        points = [(v.x, self.world_height - v.y) for v in points]
+        points = to_screen(rotation.rotated(self.rocket_vertices, self.rotation_point, rotation_angle))
         calls.append(call("create_polygon", points, fill="blue", outline="lightgrey"))
-        if self.engine_throttle:
+        if engine_throttle:
             # rotate and position the engine flame
-            points = [Vector2D((x, y*self.engine_throttle)) for x, y in self.engine_flame_vertices]
-            points = [v.rotate_around(self.rotation_point, self.rotation) for v in points]
-            points = [scale*v+screen_offset for v in points]
-            points = [(v.x, self.world_height - v.y) for v in points]
+            points = to_screen(rotation.rotated(self.engine_flame_vertices, self.rotation_point, rotation_angle, engine_throttle))
             calls.append(call("create_polygon", points, outline="orange", fill="yellow"))
         # rotate and position the left and right thrusters
-        points = [Vector2D(xy) for xy in self.thruster_positions]
-        points = [v.rotate_around(self.rotation_point, self.rotation) for v in points]
-        points = [scale*v+screen_offset for v in points]
-        points = [(v.x, self.world_height - v.y) for v in points]
-        if self.left_thruster_on:
-            calls.append(call("create_oval", points[0][0]-3, points[0][1]-3, points[0][0]+3, points[0][1]+3, outline="orange", fill="yellow"))
-        if self.right_thruster_on:
-            calls.append(call("create_oval", points[1][0]-3, points[1][1]-3, points[1][0]+3, points[1][1]+3, outline="orange", fill="yellow"))
+        if self.left_thruster_on or self.right_thruster_on:
+            points = to_screen(rotation.rotated(self.thruster_positions, self.rotation_point, rotation_angle))
+            if self.left_thruster_on:
+                calls.append(call("create_oval", points[0][0]-3, points[0][1]-3, points[0][0]+3, points[0][1]+3, outline="orange", fill="yellow"))
+            if self.right_thruster_on:
+                calls.append(call("create_oval", points[1][0]-3, points[1][1]-3, points[1][0]+3, points[1][1]+3, outline="orange", fill="yellow"))
         return calls
 
     def apply_gravity(self, gravity):
         if not self.touchdown:
-            self.apply_force(Vector2D((0, -gravity)))  # gravity is a force pointing downwards
+            self.apply_force(complex(0, -gravity))  # gravity is a force pointing downwards
 
 
 class Launchpad(object):
     """
     Rocket launchpad where a rocket can safely land and takeoff from.
+    Without a canvas (headless) the world size must be given instead.
     """
     width = 50
 
-    def __init__(self, canvas, x):
+    def __init__(self, canvas, x, world_width=None, world_height=None):
         self.canvas = canvas
-        self.cwidth, self.cheight = int(canvas["width"]), int(canvas["height"])
+        if canvas is None:
+            self.cwidth, self.cheight = world_width, world_height
+        else:
+            self.cwidth, self.cheight = int(canvas["width"]), int(canvas["height"])
         self.x = x - self.width/2
 
-    def draw(self):
-        self.canvas.create_rectangle(self.x, self.cheight-11, self.x+self.width, self.cheight-5, outline="gray80", fill="gray60")
+    def draw(self, canvas=None):
+        (canvas or self.canvas).create_rectangle(self.x, self.cheight-11, self.x+self.width, self.cheight-5, outline="gray80", fill="gray60")
 
     def is_rocket_above(self, rocket):
         rocket_screen_x = self.cwidth/2 + rocket.position.x
         return self.x < rocket_screen_x < self.x+self.width
 
 
+class RocketSimulator(object):
+    """
+    The rocket landing game without its window: the rocket, the forces acting on it and the controls.
+    It can also run headless, as fast as possible.
+    """
+    def __init__(self, world_width, world_height):
+        self.world_width, self.world_height = world_width, world_height
+        self.launchpad_offset = world_width/6
+        self.initial_x_pos = self.launchpad_offset-world_width/2
+        self.rocket = Rocket(world_width, world_height, self.initial_x_pos)
+        self.launchpad_start = Launchpad(None, self.launchpad_offset, world_width, world_height)
+        self.launchpad_destination = Launchpad(None, world_width-self.launchpad_offset, world_width, world_height)
+        self.steps = 0
+        self.recorder = None    # a replay.Recorder, that records the controls
+
+    def update(self):
+        if self.rocket.crashed:
+            # the wreck sleeps until the game is restarted, it is no longer updated nor interpolated
+            self.rocket.previous_position = self.rocket.position.vec
+            self.rocket.previous_rotation = self.rocket.rotation
+        else:
+            if self.rocket.engine_throttle:
+                self.rocket.apply_thrust(complex(0, .2 * self.rocket.engine_throttle))    # accelerate along rocket's orientation
+            if self.rocket.right_thruster_on:
+                self.rocket.apply_rotation(0.005)
+            if self.rocket.left_thruster_on:
+                self.rocket.apply_rotation(-0.005)
+            self.rocket.apply_gravity(0.1)
+            self.rocket.update()
+        self.steps += 1
+        if self.recorder:
+            self.recorder.step(self)
+
+    def run_headless(self, num_steps):
+        """simulate the given number of steps (or until the rocket crashed) without any rendering"""
+        for _ in range(num_steps):
+            if self.rocket.crashed:
+                break
+            self.update()
+
+    def landing_pad(self):
+        """the name of the launchpad the rocket is above ("alpha" or "beta"), or None"""
+        if self.launchpad_start.is_rocket_above(self.rocket):
+            return "alpha"
+        if self.launchpad_destination.is_rocket_above(self.rocket):
+            return "beta"
+        return None
+
+    def keypress(self, char):
+        if self.recorder:
+            self.recorder.event(self.steps, True, char)
+        char = char.lower()
+        if char.startswith("shift"):
+            self.rocket.engine_throttle = 1.0    # regular 100% thrust
+        elif char.startswith("control"):
+            self.rocket.engine_throttle = 2.0    # 200% thrust
+        elif char == 'left':
+            self.rocket.right_thruster_on = True
+        elif char == 'right':
+            self.rocket.left_thruster_on = True
+
+    def keyrelease(self, char):
+        if self.recorder:
+            self.recorder.event(self.steps, False, char)
+        char = char.lower()
+        if char.startswith(("shift", "control")):
+            self.rocket.engine_throttle = 0.0
+        elif char == 'left':
+            self.rocket.right_thruster_on = False
+        elif char == 'right':
+            self.rocket.left_thruster_on = False
+        elif char == 'r':
+            self.rocket.set_touchdown_position(self.initial_x_pos)
+
+
 class RocketSimulatorWindow(AnimationWindow):
     """
     The actual rocket landing simulation game window!
+    The physics run at a fixed rate, independent of how fast the window can draw.
     """
+    physics_rate = 30
+
     def setup(self):
         self.cwidth, self.cheight = int(self.canvas["width"]), int(self.canvas["height"])
-        self.launchpad_offset = self.cwidth/6
-        self.initial_x_pos = self.launchpad_offset-self.cwidth/2
-        self.rocket = Rocket(self.cwidth, self.cheight, self.initial_x_pos)
-        self.launchpad_start = Launchpad(self.canvas, self.launchpad_offset)
-        self.launchpad_destination = Launchpad(self.canvas, self.cwidth-self.launchpad_offset)
+        self.simulator = RocketSimulator(self.cwidth, self.cheight)
+        self.rocket = self.simulator.rocket
+        self.launchpad_start = Launchpad(self.canvas, self.simulator.launchpad_offset)
+        self.launchpad_destination = Launchpad(self.canvas, self.cwidth-self.simulator.launchpad_offset)
+        self.scene = LayeredScene(self.canvas, ["background", "telemetry", "rocket", "messages"])
+        self.scene.static("background", self.draw_background)
         self.framecounter = 0
         self.start_time = time.time()
         self.set_frame_rate(30)
+        self.set_physics_rate(self.physics_rate)
+        # F5 starts and stops recording the flight (for replay), it is written to the file while it is recorded
+        self.recording = None
+        if self.root:
+            self.root.bind("<F5>", lambda event: self.toggle_recording("rocketflight.rkr"))
+            self.root.bind("<F6>", lambda event: self.toggle_draw_cache())
 
-    def draw(self):
-        self.update()
-        self.canvas.delete(tkinter.ALL)
+    def toggle_recording(self, filename):
+        if self.recording:
+            self.simulator.recorder.close()
+            self.recording.close()
+            self.simulator.recorder = self.recording = None
+            print("recording saved to " + filename)
+        else:
+            from replay import Recorder     # imported here because replay itself imports this module
+            self.recording = open(filename, "wb")
+            Recorder(self.simulator, self.recording)
+            print("recording to " + filename)
+
+    def toggle_draw_cache(self):
+        # F6 draws the rocket through a drawcache.DrawCallCache (a resting or hovering rocket is drawn faster)
+        if self.rocket.draw_cache:
+            print("draw cache off: " + self.rocket.draw_cache.stats_text())
+            self.rocket.draw_cache = None
+        else:
+            from drawcache import DrawCallCache
+            self.rocket.draw_cache = DrawCallCache.for_rockets(1)
+            print("draw cache on")
+
+    def draw_background(self, group):
         # ground:
-        self.canvas.create_rectangle(0, self.cheight-10, self.cwidth-1, self.cheight-1, outline="chocolate", fill="sienna")
+        group.create_rectangle(0, self.cheight-10, self.cwidth-1, self.cheight-1, outline="chocolate", fill="sienna")
         # launch pads:
-        self.launchpad_start.draw()
-        self.launchpad_destination.draw()
-        # instructions and telemetry:
+        self.launchpad_start.draw(group)
+        self.launchpad_destination.draw(group)
+        # instructions:
         instructions = """GOAL:  Launch the rocket and land it safely at the other launchpad!
 You must land the rocket slowly and upright, and must stay within the screen area, or it will crash.
 
@@ -153,10 +351,25 @@ CONTROLS:
   ctrl\t\t-  fire main engine (max throttle)
   -> (cursor right)\t-  fire right RCS thruster
   <- (cursor left)\t-  fire left RCS thruster
-  r\t\t-  start over"""
-        self.canvas.create_text(150, self.cheight/2-250, text=instructions, fill="green4", anchor=tkinter.NW)
+  r\t\t-  start over
+  F5\t\t-  start/stop recording the flight (replay.py)
+  F6\t\t-  draw cache on/off"""
+        group.create_text(150, self.cheight/2-250, text=instructions, fill="green4", anchor=tkinter.NW)
+
+    def draw(self):
+        # only the rocket and the texts that changed are updated, the background is drawn only once
+        self.framecounter += 1
+        with self.profiler.phase("drawcalls"):
+            rocket_calls = self.rocket.draw_calls(self.physics_clock.alpha)
+        with self.profiler.phase("items"):
+            self.scene.begin_frame()
+            self.draw_scene(rocket_calls)
+        with self.profiler.phase("hide"):
+            self.scene.end_frame()
+
+    def draw_scene(self, rocket_calls):
         rotation_degrees = 360 - (180 * self.rocket.rotation / math.pi)
-        rotation_speed_degrees = self.rocket.rotation_speed / math.pi * self.frame_rate * 180
+        rotation_speed_degrees = self.rocket.rotation_speed / math.pi * self.physics_clock.rate * 180
         telemetry = u"""TELEMETRY:
 rocket position = {0:.2f}, {1:.2f}
 velocity = {2:.2f}   (vx, vy = {3:.2f}, {4:.2f})
@@ -164,56 +377,36 @@ orientation = {5:.2f}\u00b0   rotation speed = {6:.2f}\u00b0/sec
 """.format(self.rocket.position.x, self.rocket.position.y,
            self.rocket.velocity.length, self.rocket.velocity.x, self.rocket.velocity.y,
            rotation_degrees, rotation_speed_degrees)
-        self.canvas.create_text(560, self.cheight/2-190, text=telemetry, fill="green3", anchor=tkinter.NW)
-        # finally the rocket
-        self.rocket.draw(self.canvas)
+        self.scene.layer("telemetry").create_text(560, self.cheight/2-190, text=telemetry, fill="green3", anchor=tkinter.NW)
+        # the rocket, interpolated between the last two physics steps
+        rocket_layer = self.scene.layer("rocket")
+        for c in rocket_calls:
+            getattr(rocket_layer, c[0])(*c[1], **c[2])
+        messages = self.scene.layer("messages")
         if self.rocket.crashed:
-            self.canvas.create_text(self.cwidth/2, self.cheight/2, text="ROCKET LOST !!!", fill="pink")
-            self.stop()
+            messages.create_text(self.cwidth/2, self.cheight/2, text="ROCKET LOST !!!", fill="pink")
         if self.rocket.touchdown:
             location = "SOMEWHERE..."
             if self.launchpad_start.is_rocket_above(self.rocket):
                 location = "ON LAUNCHPAD ALPHA - READY FOR TAKEOFF"
             if self.launchpad_destination.is_rocket_above(self.rocket):
                 location = "ON LAUNCHPAD BETA - WELL DONE!"
-            self.canvas.create_text(self.cwidth/2, self.cheight/2, text="ROCKET TOUCHDOWN\n"+location, fill="pink")
+            messages.create_text(self.cwidth/2, self.cheight/2, text="ROCKET TOUCHDOWN\n"+location, fill="pink")
         # framecounter
         fps = round(self.framecounter / (time.time() - self.start_time))
-        self.canvas.create_text(self.cwidth, 0, text="FPS: {0:d} ".format(fps), fill="blue", anchor=tkinter.NE)
+        messages.create_text(self.cwidth, 0, text="FPS: {0:d} ".format(fps), fill="blue", anchor=tkinter.NE)
 
     def update(self):
-        self.framecounter += 1
-        if self.rocket.engine_throttle:
-            engine_force = Vector2D((0, .2 * self.rocket.engine_throttle)).rotate(self.rocket.rotation)    # accelerate along rocket's orientation
-            self.rocket.apply_force(engine_force)
-        if self.rocket.right_thruster_on:
-            self.rocket.apply_rotation(0.005)
-        if self.rocket.left_thruster_on:
-            self.rocket.apply_rotation(-0.005)
-        self.rocket.apply_gravity(0.1)
-        self.rocket.update()
+        self.simulator.update()
 
     def keypress(self, char, mouseposition):
-        char = char.lower()
-        if char.startswith("shift"):
-            self.rocket.engine_throttle = 1.0    # regular 100% thrust
-        elif char.startswith("control"):
-            self.rocket.engine_throttle = 2.0    # 200% thrust
-        elif char == 'left':
-            self.rocket.right_thruster_on = True
-        elif char == 'right':
-            self.rocket.left_thruster_on = True
+        self.simulator.keypress(char)
 
     def keyrelease(self, char, mouseposition):
-        char = char.lower()
-        if char.startswith(("shift", "control")):
-            self.rocket.engine_throttle = 0.0
-        elif char == 'left':
-            self.rocket.right_thruster_on = False
-        elif char == 'right':
-            self.rocket.left_thruster_on = False
-        elif char == 'r':
-            self.rocket.set_touchdown_position(self.initial_x_pos)
+        self.simulator.keyrelease(char)
+        if char.lower() == 'r':
+            self.physics_clock.reset()
+            self.scene.invalidate()
             self.continue_animation = True
 
 
@@ -0,0 +1,69 @@
+"""
+Shared scenario generators for the performance tests and the benchmark harness.
+Pass a seeded random.Random to get reproducible scenarios.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import math
+import random
+from vectors import Vector2D
+from rocketsimulator import Rocket
+
+
+def random_rocket(cwidth, cheight, rnd=random):
+    """a rocket somewhere in the world, flying and spinning with its engine on (as in the performance tests)"""
+    rocket = Rocket(cwidth, cheight)
+    rocket.rotation_speed = rnd.uniform(-.3,.3)
+    rocket.engine_throttle = 1
+    rocket.position = Vector2D((rnd.randint(-cwidth/2,cwidth/2), rnd.randint(0,cheight)))
+    rocket.velocity = Vector2D((rnd.uniform(-10,10), rnd.uniform(-4,4)))
+    rocket.touchdown = False    # (the new rocket was standing on the ground)
+    return rocket
+
+
+def swarm(num_rockets, cwidth, cheight, seed=None):
+    """the bouncing rockets of the performance tests"""
+    rnd = random.Random(seed)
+    return [random_rocket(cwidth, cheight, rnd) for _ in range(num_rockets)]
+
+
+def thrusters(num_rockets, cwidth, cheight, seed=None):
+    """like swarm, but with random rotations, throttles and thrusters, so every kind of draw call is used"""
+    rnd = random.Random(seed)
+    rockets = [random_rocket(cwidth, cheight, rnd) for _ in range(num_rockets)]
+    for rocket in rockets:
+        rocket.rotation = rnd.uniform(0, 2*math.pi)
+        rocket.engine_throttle = rnd.choice([0.0, 1.0, 2.0])
+        rocket.left_thruster_on = rnd.random() < 0.3
+        rocket.right_thruster_on = rnd.random() < 0.3
+    return rockets
+
+
+def resting(num_rockets, cwidth, cheight, seed=None):
+    """half of the rockets fly around, the other half stands still on the ground"""
+    rnd = random.Random(seed)
+    rockets = [random_rocket(cwidth, cheight, rnd) for _ in range(num_rockets)]
+    for rocket in rockets[::2]:
+        rocket.set_touchdown_position(rnd.uniform(-cwidth/2+10, cwidth/2-10))
+    return rockets
+
+
+def hop(simulator):
+    """
+    Controls for the rocket of a RocketSimulator, call it before every update: a hop from the launchpad,
+    with a wiggle of the thrusters, and a slow descent back onto the launchpad.
+    """
+    rocket = simulator.rocket
+    step = simulator.steps
+    rocket.engine_throttle = 1.0 if step < 40 or (rocket.velocity.y < -1 and not rocket.touchdown) else 0.0
+    rocket.right_thruster_on = 40 <= step < 50 or 90 <= step < 100
+    rocket.left_thruster_on = 60 <= step < 80
+
+
+SCENARIOS = {
+    "swarm": swarm,
+    "thrusters": thrusters,
+    "resting": resting,
+}
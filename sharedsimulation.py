@@ -0,0 +1,109 @@
+"""
+Rocket simulation that is split over multiple worker processes.
+The rocket state lives in shared memory (a RocketFleet laid out in a SharedMemory buffer),
+each worker updates its own slice of the rockets in place, and the frames are synchronized
+with barriers. The renderer reads the state directly from the shared memory, nothing is pickled.
+Requires Python 3.8 or newer (multiprocessing.shared_memory).
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from rocketfleet import RocketFleet
+from scenarios import random_rocket
+
+
+def simulation_worker(shm_name, world_width, world_height, capacity, worker_index, num_workers,
+                      num_rockets, start_barrier, done_barrier):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    fleet = RocketFleet(world_width, world_height, capacity, buffer=shm.buf)
+    try:
+        while True:
+            start_barrier.wait()
+            count = num_rockets.value
+            fleet.set_count(count)
+            fleet.view(count*worker_index//num_workers, count*(worker_index+1)//num_workers).step(bounce=True)
+            done_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass    # the simulation is closed
+    finally:
+        fleet.release()
+        shm.close()
+
+
+class SharedMemorySimulation(object):
+    """
+    Drop-in simulation backend for the performance test windows, like the threaded RocketSimulation.
+    While the window draws a frame, the workers already simulate the next one.
+    """
+    def __init__(self, cwidth, cheight, start_num_rockets=10, num_workers=None, capacity=100000):
+        self.cwidth = cwidth
+        self.cheight = cheight
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.shm = shared_memory.SharedMemory(create=True, size=RocketFleet.buffer_size(capacity))
+        self.fleet = RocketFleet(cwidth, cheight, capacity, buffer=self.shm.buf)
+        self.num_rockets = multiprocessing.Value("i", 0, lock=False)
+        self.start_barrier = multiprocessing.Barrier(self.num_workers+1)
+        self.done_barrier = multiprocessing.Barrier(self.num_workers+1)
+        self.workers = [multiprocessing.Process(target=simulation_worker,
+                                                args=(self.shm.name, cwidth, cheight, capacity, i, self.num_workers,
+                                                      self.num_rockets, self.start_barrier, self.done_barrier))
+                        for i in range(self.num_workers)]
+        self.pending_rockets = 0
+        self.framecounter = 0
+        self.running = False
+        self.add_rockets(start_num_rockets)
+        self.start_time = time.time()
+
+    def __len__(self):
+        return self.num_rockets.value + self.pending_rockets
+
+    def start(self):
+        for worker in self.workers:
+            worker.daemon = True
+            worker.start()
+        self._add_pending_rockets()
+        self.start_barrier.wait()
+        self.running = True
+
+    def close(self):
+        if self.workers:
+            self.start_barrier.abort()
+            self.done_barrier.abort()
+            for worker in self.workers:
+                worker.join()
+            self.workers = []
+            self.fleet.release()
+            self.shm.close()
+            self.shm.unlink()
+
+    def add_rockets(self, count):
+        # rockets can only be added in between frames, when the workers are waiting
+        self.pending_rockets += count
+        if not self.running:
+            self._add_pending_rockets()
+
+    def next_frame(self):
+        """
+        Waits until the workers completed the frame, and starts them on the next.
+        Returns a copy of the state of the completed frame (a RocketFleet) for drawing.
+        """
+        self.done_barrier.wait()
+        frame = self.fleet.copy()
+        self._add_pending_rockets()
+        self.start_barrier.wait()
+        self.framecounter += 1
+        return frame
+
+    def _add_pending_rockets(self):
+        for _ in range(self.pending_rockets):
+            self.fleet.append(self.create_rocket())
+        self.pending_rockets = 0
+        self.num_rockets.value = self.fleet.count
+
+    def create_rocket(self):
+        return random_rocket(self.cwidth, self.cheight)
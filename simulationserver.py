@@ -0,0 +1,184 @@
+"""
+Asyncio simulation service: one simulation, many viewers.
+The server owns the simulation clock and steps the RocketFleet at a fixed rate, whether there are viewers or not.
+Any number of subscribers can connect over TCP or a Unix socket; they receive the frames in the
+framestream format, so FrameStreamClient (and performancetest_stream.py) can view them.
+
+Every subscriber has its own frame rate and its own delta chain: a subscriber always gets the most
+recent frame, encoded as the delta to the frame it got before. A slow subscriber (its socket buffer
+is full) simply skips frames, it doesn't slow down the simulation or the other subscribers.
+Subscribers that are in step share the encoded message.
+
+Commands (framestream COMMAND, struct '<4sI'):
+    b'ADDR' count       add rockets
+    b'RATE' fps         the frame rate for this subscriber (at most the simulation rate)
+    b'ENGN' percent     engine throttle of all rockets
+    b'THRL' on          left thruster of all rockets on (1) or off (0)
+    b'THRR' on          right thruster of all rockets on (1) or off (0)
+The engines and thrusters push and turn the rockets like in the game (in the default step function).
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import asyncio
+import socket
+from framestream import COMMAND, fleet_state, encode_keyframe, encode_delta
+
+
+class Subscriber(object):
+    def __init__(self, writer, frame_rate):
+        self.writer = writer
+        self.frame_interval = 1 / frame_rate
+        self.frame_ready = asyncio.Event()
+        self.previous_frame = None      # frame number and state of the last frame sent
+        self.previous_state = None
+        self.keyframe_number = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+
+class SimulationServer(object):
+    """
+    Steps the fleet with step_function (default: step_fleet()) at frame_rate,
+    and streams the frames to the subscribers. Call serve() from the asyncio event loop.
+    """
+    def __init__(self, fleet, frame_rate=60, keyframe_interval=120, step_function=None, write_buffer_size=256*1024):
+        self.fleet = fleet
+        self.frame_rate = frame_rate
+        self.keyframe_interval = keyframe_interval
+        self.step_function = step_function or self.step_fleet
+        self.write_buffer_size = write_buffer_size
+        self.add_rockets_function = None    # called with a count when a subscriber asks to add rockets
+        self.subscribers = set()
+        self.frame_number = 0
+        self.state = None
+        self.encoded = {}       # this frame's messages, by the frame number the delta is relative to (None: keyframe)
+        self.commands = {
+            b"ADDR": self.command_add_rockets,
+            b"RATE": self.command_frame_rate,
+            b"ENGN": self.command_engine,
+            b"THRL": self.command_left_thruster,
+            b"THRR": self.command_right_thruster,
+        }
+
+    async def serve(self, address=("localhost", 33446), unix_path=None):
+        """runs the simulation clock and accepts subscribers on the TCP address and/or the Unix socket path"""
+        servers = []
+        if address:
+            servers.append(await asyncio.start_server(self.handle_subscriber, *address))
+        if unix_path:
+            servers.append(await asyncio.start_unix_server(self.handle_subscriber, unix_path))
+        try:
+            await self.run_clock()
+        finally:
+            for server in servers:
+                server.close()
+
+    async def run_clock(self):
+        loop = asyncio.get_running_loop()
+        next_frame_time = loop.time()
+        while True:
+            self.step()
+            next_frame_time += 1 / self.frame_rate
+            delay = next_frame_time - loop.time()
+            if delay < 0:
+                next_frame_time = loop.time()   # too slow to keep up, don't try to catch up
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def step(self):
+        self.step_function()
+        self.frame_number += 1
+        self.state = fleet_state(self.fleet) if self.subscribers else None
+        self.encoded = {}
+        for subscriber in self.subscribers:
+            subscriber.frame_ready.set()
+
+    def step_fleet(self):
+        """the engines and thrusters of the rockets act like in the game, then the fleet is stepped (bouncing)"""
+        fleet = self.fleet
+        if fleet.engine_throttle.any():
+            fleet.apply_thrust(0.2j * fleet.engine_throttle)    # accelerate along the rockets' orientation
+        if fleet.left_thruster_on.any() or fleet.right_thruster_on.any():
+            fleet.apply_rotation(0.005 * (fleet.right_thruster_on.astype(float) - fleet.left_thruster_on))
+        fleet.step(bounce=True)
+
+    async def handle_subscriber(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        writer.transport.set_write_buffer_limits(high=self.write_buffer_size)
+        subscriber = Subscriber(writer, self.frame_rate)
+        self.subscribers.add(subscriber)
+        sender = asyncio.ensure_future(self.send_frames(subscriber))
+        try:
+            while True:
+                command, value = COMMAND.unpack(await reader.readexactly(COMMAND.size))
+                handler = self.commands.get(command)
+                if handler:
+                    handler(subscriber, value)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            sender.cancel()
+            writer.close()
+
+    async def send_frames(self, subscriber):
+        loop = asyncio.get_running_loop()
+        next_send_time = loop.time()
+        try:
+            while True:
+                await subscriber.frame_ready.wait()
+                subscriber.frame_ready.clear()
+                if self.state is None:
+                    continue    # subscribed after the last step
+                now = loop.time()
+                if now < next_send_time - 0.5 / self.frame_rate:
+                    continue    # this subscriber wants fewer frames
+                next_send_time = max(next_send_time + subscriber.frame_interval, now)
+                subscriber.writer.write(self.message_for(subscriber))
+                # backpressure: while the subscriber can't keep up, we wait here and the frames in between are skipped
+                await subscriber.writer.drain()
+        except ConnectionError:
+            pass
+
+    def message_for(self, subscriber):
+        state = self.state
+        previous_state = subscriber.previous_state
+        if previous_state is None or previous_state.shape != state.shape or \
+                self.frame_number - subscriber.keyframe_number >= self.keyframe_interval:
+            key = None
+            subscriber.keyframe_number = self.frame_number
+        else:
+            key = subscriber.previous_frame
+        message = self.encoded.get(key)
+        if message is None:
+            if key is None:
+                message = encode_keyframe(self.frame_number, state)
+            else:
+                message = encode_delta(self.frame_number, state, previous_state)
+            self.encoded[key] = message
+        if subscriber.previous_frame is not None:
+            subscriber.frames_skipped += self.frame_number - subscriber.previous_frame - 1
+        subscriber.previous_frame = self.frame_number
+        subscriber.previous_state = state
+        subscriber.frames_sent += 1
+        return message
+
+    def command_add_rockets(self, subscriber, count):
+        if self.add_rockets_function:
+            self.add_rockets_function(count)
+
+    def command_frame_rate(self, subscriber, frame_rate):
+        subscriber.frame_interval = 1 / max(1, frame_rate)
+
+    def command_engine(self, subscriber, percent):
+        self.fleet.engine_throttle[:] = percent / 100
+
+    def command_left_thruster(self, subscriber, on):
+        self.fleet.left_thruster_on[:] = bool(on)
+
+    def command_right_thruster(self, subscriber, on):
+        self.fleet.right_thruster_on[:] = bool(on)
@@ -6,6 +6,7 @@ Open source software license: MIT.
 """
 from __future__ import print_function, division
 import time
+from frameprofiler import FrameProfiler
 
 try:
     import tkinter
@@ -13,30 +14,112 @@ except ImportError:
     import Tkinter as tkinter
 
 
-class AnimationWindow(tkinter.Tk):
+class FixedTimestep(object):
     """
-    Base class for tkinter animation windows. Creates window and binds keyboard events to react upon.
+    Accumulator based clock that runs a simulation at a fixed rate, independent of the render rate.
+    advance() tells how many simulation steps are due. If the rendering lags behind, it catches up
+    with at most max_substeps steps per call, the rest of the lost time is dropped (the simulation slows down
+    instead of spiralling into ever more steps). alpha tells how far the time is between the last two steps,
+    to interpolate the displayed state.
     """
-    def __init__(self, width, height, windowtitle="animation engine"):
-        tkinter.Tk.__init__(self)
-        self.wm_title(windowtitle)
-        self.bind("<KeyPress>", lambda event: self.keypress(*self._keyevent(event)))
-        self.bind("<KeyRelease>", lambda event: self.keyrelease(*self._keyevent(event)))
-        self.canvas = tkinter.Canvas(self, width=width, height=height, background="black", borderwidth=0, highlightthickness=0)
-        self.canvas.pack()
+    def __init__(self, rate, max_substeps=5):
+        self.rate = rate
+        self.dt = 1 / rate
+        self.max_substeps = max_substeps
+        self.accumulator = 0.0
+        self.last_time = None
+        self.steps = 0
+        self.dropped_time = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def advance(self, now=None):
+        now = time.perf_counter() if now is None else now
+        if self.last_time is not None:
+            self.accumulator += now - self.last_time
+        self.last_time = now
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_substeps:
+            self.dropped_time += (steps - self.max_substeps) * self.dt
+            steps = self.max_substeps
+            self.accumulator = steps * self.dt
+        self.accumulator -= steps * self.dt
+        self.steps += steps
+        return steps
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
+
+    def run_headless(self, step, num_steps):
+        """run the simulation steps as fast as possible (no clock, no rendering), returns the steps per second"""
+        start = time.perf_counter()
+        for _ in range(num_steps):
+            step()
+        self.steps += num_steps
+        duration = time.perf_counter() - start
+        return num_steps / duration if duration else float("inf")
+
+
+class AnimationWindow(object):
+    """
+    Base class for tkinter animation windows. Creates the Tk window (self.root) with a canvas, and binds keyboard events to react upon.
+    By default, draw() is called every frame and is expected to update the simulation itself.
+    After set_physics_rate(), the subclass' update() is called by a fixed-rate clock instead, independent
+    of the frame rate, and draw() only renders (interpolating with physics_clock.alpha if it wants to).
+    The frame timings are measured by self.profiler, subclasses can time parts of their draw() with profiler.phase().
+    F2 toggles the profiler overlay, F3 writes a Chrome trace of the next frames, F4 cProfiles the next frames.
+    When a canvas is passed in (such as a raster.RasterCanvas), no Tk window is created at all (root is None),
+    and the animation is driven by run_headless() instead of by mainloop().
+    """
+    profile_num_frames = 100
+
+    def __init__(self, width, height, windowtitle="animation engine", canvas=None):
+        if canvas is None:
+            self.root = tkinter.Tk()
+            self.root.wm_title(windowtitle)
+            self.root.bind("<KeyPress>", lambda event: self.keypress(*self._keyevent(event)))
+            self.root.bind("<KeyRelease>", lambda event: self.keyrelease(*self._keyevent(event)))
+            self.root.bind("<F2>", lambda event: self.toggle_profiler_overlay())
+            self.root.bind("<F3>", lambda event: self.profiler.trace_frames(self.profile_num_frames, "frametrace.json"))
+            self.root.bind("<F4>", lambda event: self.profiler.profile_frames(self.profile_num_frames, "frameprofile.pstats"))
+            self.canvas = tkinter.Canvas(self.root, width=width, height=height, background="black", borderwidth=0, highlightthickness=0)
+            self.canvas.pack()
+        else:
+            self.root = None
+            self.canvas = canvas
         self.set_frame_rate(30)
         self.gfxupdate_starttime = time.perf_counter()
         self.graphics_update_dt = 0.0
         self.continue_animation = True
+        self.physics_clock = None
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
         self.setup()
-        self.after(10, self._frame_tick)
+        if self.root:
+            self.root.after(10, self._frame_tick)
+
+    def mainloop(self):
+        """runs the animation in the Tk event loop, until the window is closed"""
+        self.root.mainloop()
 
     def set_frame_rate(self, framerate):
         self.frame_rate = framerate
         self.frame_time = 1 / framerate
 
+    def set_physics_rate(self, rate, max_substeps=5):
+        self.physics_clock = FixedTimestep(rate, max_substeps)
+
     def _frame_tick(self):
         now = time.perf_counter()
+        if self.physics_clock:
+            steps = self.physics_clock.advance(now)
+            if self.continue_animation:
+                with self.profiler.phase("update"):
+                    for _ in range(steps):
+                        self.update()
         dt = now - self.gfxupdate_starttime
         self.graphics_update_dt += dt
         if self.graphics_update_dt > self.frame_time:
@@ -44,9 +127,55 @@ class AnimationWindow(tkinter.Tk):
             if self.graphics_update_dt >= self.frame_time:
                 print("Gfx update too slow to reach {:d} fps!".format(self.frame_rate))
             if self.continue_animation:
-                self.draw()
+                with self.profiler.phase("draw"):
+                    self.draw()
+            if self.profiler.enabled:
+                self.profiler.end_frame()
+                self._draw_profiler_overlay()
         self.gfxupdate_starttime = now
-        self.after(1000 // (self.frame_rate*2), self._frame_tick)
+        self.root.after(1000 // (self.frame_rate*2), self._frame_tick)
+
+    def run_headless(self, num_frames, frame_callback=None):
+        """
+        Runs the animation for the given number of frames as fast as possible, without the Tk event loop.
+        The animation clock advances exactly one frame time per frame, so the result doesn't depend on the speed.
+        After every frame, frame_callback(canvas) is called, for instance to render the frame and write it.
+        """
+        now = 0.0
+        if self.physics_clock:
+            self.physics_clock.reset()
+            self.physics_clock.advance(now)
+        for _ in range(num_frames):
+            now += self.frame_time
+            if self.physics_clock:
+                steps = self.physics_clock.advance(now)
+                if self.continue_animation:
+                    with self.profiler.phase("update"):
+                        for _ in range(steps):
+                            self.update()
+            if self.continue_animation:
+                with self.profiler.phase("draw"):
+                    self.draw()
+            if frame_callback:
+                with self.profiler.phase("render"):
+                    frame_callback(self.canvas)
+            self.profiler.end_frame()
+
+    def toggle_profiler_overlay(self):
+        self.show_profiler = not self.show_profiler
+        if self.show_profiler:
+            self.profiler.enable()
+        else:
+            self.profiler.disable()
+            self.canvas.delete("profiler")
+
+    def _draw_profiler_overlay(self):
+        self.canvas.delete("profiler")
+        if self.show_profiler:
+            self.canvas.create_text(4, 4, text=self.profiler.overlay_text(), fill="white", anchor=tkinter.NW,
+                                    font=("Courier", 9), tags="profiler")
+        else:
+            self.profiler.disable()    # when the trace or profile is done
 
     def _keyevent(self, event):
         c = event.char
@@ -69,3 +198,222 @@ class AnimationWindow(tkinter.Tk):
     def keyrelease(self, char, mouseposition):
         pass
 
+
+class ItemGroup(object):
+    """
+    A group of canvas items that is redrawn every frame, such as the polygons and ovals of one rocket.
+    It has the same create_... methods as the canvas, but instead of creating new items every frame,
+    it reuses the items of the previous frame and only updates their coordinates and options that changed.
+    Items that are not drawn in a frame are hidden instead of deleted; when a draw call is left out
+    (the flame of a rocket whose engine is off), the later calls reuse the items of their own kind.
+    If tags are given, they are added to all items of the group.
+    """
+    def __init__(self, canvas, tags=None):
+        self.canvas = canvas
+        self.tags = tags
+        self.items = []     # [method, item id, coords, options, visible]
+        self.cursor = 0
+        self.created = 0
+
+    def begin(self):
+        self.cursor = 0
+
+    def end(self):
+        for item in self.items[self.cursor:]:
+            if item[4]:
+                self.canvas.itemconfigure(item[1], state=tkinter.HIDDEN)
+                item[4] = False
+
+    def hide(self):
+        self.cursor = 0
+        self.end()
+
+    def delete(self):
+        for item in self.items:
+            self.canvas.delete(item[1])
+        self.items = []
+        self.cursor = 0
+
+    def create_polygon(self, *args, **options):
+        return self._item("create_polygon", args, options)
+
+    def create_oval(self, *args, **options):
+        return self._item("create_oval", args, options)
+
+    def create_rectangle(self, *args, **options):
+        return self._item("create_rectangle", args, options)
+
+    def create_line(self, *args, **options):
+        return self._item("create_line", args, options)
+
+    def create_text(self, *args, **options):
+        return self._item("create_text", args, options)
+
+    def _item(self, method, args, options):
+        if len(args) == 1:
+            args = args[0]      # a list of points or coordinates
+        coords = tuple(c for xy in args for c in xy) if args and type(args[0]) in (tuple, list) else tuple(args)
+        items = self.items
+        cursor = self.cursor
+        if cursor < len(items) and items[cursor][0] != method:
+            # an item is left out this frame (a flame or thruster that is off): reuse a later item of this kind
+            for index in range(cursor + 1, len(items)):
+                if items[index][0] == method:
+                    items[cursor], items[index] = items[index], items[cursor]
+                    break
+            else:
+                items.insert(cursor, [method, self._create(method, coords, options), coords, options, True])
+        if cursor < len(items):
+            item = items[cursor]
+            if item[2] != coords:
+                self.canvas.coords(item[1], *coords)
+                item[2] = coords
+            if item[3] != options:
+                self.canvas.itemconfigure(item[1], **options)
+                item[3] = options
+            if not item[4]:
+                self.canvas.itemconfigure(item[1], state=tkinter.NORMAL)
+                item[4] = True
+        else:
+            item = [method, self._create(method, coords, options), coords, options, True]
+            items.append(item)
+        self.cursor += 1
+        return item[1]
+
+    def _create(self, method, coords, options):
+        self.created += 1
+        if self.tags:
+            options = dict(options, tags=self.tags)
+        return getattr(self.canvas, method)(*coords, **options)
+
+
+class RetainedCanvas(object):
+    """
+    Retained-mode drawing on a canvas: keeps an ItemGroup per key (for instance one per rocket) whose items
+    are reused every frame, plus static groups that are created only once.
+    Draw a frame between begin_frame() and end_frame(); groups that were not drawn in the frame are hidden.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.groups = {}
+        self.static_groups = {}
+        self.drawn = []
+
+    def begin_frame(self):
+        self.drawn = []
+
+    def end_frame(self):
+        drawn = set()
+        for key in self.drawn:
+            self.groups[key].end()
+            drawn.add(key)
+        for key, group in self.groups.items():
+            if key not in drawn:
+                group.hide()
+
+    def group(self, key):
+        """the group to draw the items of the given key into, in this frame"""
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = ItemGroup(self.canvas)
+        group.begin()
+        self.drawn.append(key)
+        return group
+
+    def draw_calls(self, key, calls):
+        """perform (method, args, kwargs) draw calls, such as Rocket.draw_calls() returns, in the group of the key"""
+        group = self.group(key)
+        for c in calls:
+            getattr(group, c[0])(*c[1], **c[2])
+
+    def draw_grouped_calls(self, grouped_calls, prefix="rocket"):
+        """perform the draw calls of every rocket (a list of lists) in a group of its own, keyed (prefix, index)"""
+        for index, calls in enumerate(grouped_calls):
+            self.draw_calls((prefix, index), calls)
+
+    def static(self, key, calls):
+        """perform the draw calls only if the static group for this key doesn't exist yet"""
+        if key not in self.static_groups:
+            group = self.static_groups[key] = ItemGroup(self.canvas)
+            for c in calls:
+                getattr(group, c[0])(*c[1], **c[2])
+        return self.static_groups[key]
+
+    def remove(self, key):
+        for groups in (self.groups, self.static_groups):
+            group = groups.pop(key, None)
+            if group:
+                group.delete()
+
+    def remove_grouped(self, prefix="rocket"):
+        """remove all groups of draw_grouped_calls() with this prefix"""
+        for key in [key for key in self.groups if type(key) is tuple and key[0] == prefix]:
+            self.remove(key)
+
+    def clear(self):
+        for groups in (self.groups, self.static_groups):
+            for group in groups.values():
+                group.delete()
+            groups.clear()
+
+
+class LayeredScene(object):
+    """
+    A scene of named layers of canvas items, stacked bottom to top in the given order.
+    A static layer is drawn once by its draw function (which gets an ItemGroup to create the items in),
+    and only drawn again after invalidate(), or when the canvas is resized.
+    A dynamic layer is an ItemGroup that is drawn every frame between begin_frame() and end_frame();
+    its items are reused, and an item's coordinates and options (such as a text) are only updated when they changed.
+    """
+    def __init__(self, canvas, layers):
+        self.canvas = canvas
+        self.layers = list(layers)
+        self.groups = {name: ItemGroup(canvas, tags="layer:"+name) for name in self.layers}
+        self.static_layers = {}
+        self.invalid = set()
+        self.drawn = set()
+        self.created = 0
+        self.size = None
+        canvas.bind("<Configure>", self._configure, add="+")
+
+    def static(self, name, draw_function):
+        self.static_layers[name] = draw_function
+        self.invalid.add(name)
+
+    def invalidate(self, name=None):
+        self.invalid.update([name] if name else self.static_layers)
+
+    def _configure(self, event):
+        if self.size and self.size != (event.width, event.height):
+            self.invalidate()
+        self.size = (event.width, event.height)
+
+    def begin_frame(self):
+        self.drawn = set()
+        for name in self.invalid:
+            group = self.groups[name]
+            group.delete()
+            self.static_layers[name](group)
+        self.invalid.clear()
+
+    def layer(self, name):
+        """the group of the dynamic layer to draw in, in this frame"""
+        group = self.groups[name]
+        if name not in self.drawn:
+            group.begin()
+            self.drawn.add(name)
+        return group
+
+    def end_frame(self):
+        for name, group in self.groups.items():
+            if name not in self.static_layers:
+                if name in self.drawn:
+                    group.end()
+                else:
+                    group.hide()
+        created = sum(group.created for group in self.groups.values())
+        if created != self.created:
+            # new items are created on top of everything, restore the stacking order of the layers
+            for name in self.layers:
+                self.canvas.tag_raise("layer:"+name)
+            self.created = created
@@ -0,0 +1,187 @@
+"""
+Trajectory logging of large fleet runs into a preallocated memory-mapped file.
+Every recorded frame has the selected fields of every rocket as fixed-width values, written with
+a few NumPy array copies straight into the mapped file, so logging costs little more than a memcpy per frame.
+A reader maps the same file and slices it by rocket and by step range; only the pages that are
+actually read are loaded from disk.
+
+File layout (little-endian):
+    header:     b"RKTJ", version, number of fields, number of rockets, max frames, stride, recorded frames
+    fields:     for every field: length byte + name, length byte + NumPy dtype string
+    steps:      int64 per frame: the step number of the frame
+    per field:  an array of shape (max frames, number of rockets)
+Every array starts at a multiple of 64 bytes.
+The fields are RocketFleet fields (position, velocity, rotation, ...) and "status": a byte with the bits
+CRASHED, TOUCHDOWN, LEFT_THRUSTER and RIGHT_THRUSTER. The status is packed from four fleet arrays on every
+recorded frame, so it is not a default field; it costs about as much as copying the position.
+
+What recording costs is mostly the memory bandwidth of the copies, against a fleet step that takes only a few
+nanoseconds per rocket with the compiled kernels: recording every step in double precision (40 bytes per rocket
+per frame) adds tens of percents to the step time. So by default every 10th step is recorded, in single precision
+(20 bytes per rocket per frame), which keeps the overhead under a few percent at 10k rockets
+(performancetest_trajectory.py checks that). Pass stride=1 and single_precision=False for every exact step.
+
+Copyright by Irmen de Jong (irmen@razorvine.net).
+Open source software license: MIT.
+"""
+from __future__ import print_function, division
+import mmap
+import struct
+import numpy
+from rocketfleet import RocketFleet
+
+
+MAGIC = b"RKTJ"
+VERSION = 1
+header_struct = struct.Struct("<4sHHIIII")
+NUM_FRAMES_OFFSET = 20      # offset of the recorded frames count in the header
+DEFAULT_FIELDS = ["position", "velocity", "rotation"]
+CRASHED, TOUCHDOWN, LEFT_THRUSTER, RIGHT_THRUSTER = 1, 2, 4, 8
+SINGLE_PRECISION = {numpy.dtype(numpy.complex128): numpy.complex64, numpy.dtype(numpy.float64): numpy.float32}
+
+
+def _align(offset):
+    return (offset + 63) // 64 * 64
+
+
+def _layout(fields, num_rockets, max_frames):
+    """the encoded field descriptors, the offsets of the steps and the field arrays, and the file size"""
+    descriptors = b""
+    for name, dtype in fields:
+        name, dtype = name.encode("ascii"), dtype.str.encode("ascii")
+        descriptors += struct.pack("<B", len(name)) + name + struct.pack("<B", len(dtype)) + dtype
+    steps_offset = _align(header_struct.size + len(descriptors))
+    offset = _align(steps_offset + 8 * max_frames)
+    offsets = []
+    for name, dtype in fields:
+        offsets.append(offset)
+        offset = _align(offset + dtype.itemsize * max_frames * num_rockets)
+    return descriptors, steps_offset, offsets, offset
+
+
+def _arrays(mapped, fields, offsets, num_rockets, max_frames):
+    return {name: mapped[offset:offset + dtype.itemsize*max_frames*num_rockets].view(dtype).reshape(max_frames, num_rockets)
+            for (name, dtype), offset in zip(fields, offsets)}
+
+
+class TrajectoryRecorder(object):
+    """
+    Records the state of (the first) num_rockets rockets of a RocketFleet into a new file with room for max_frames
+    frames. Call record() after every step; every stride-th step is written. fields selects what is recorded,
+    single_precision stores the float and complex fields in half the space. The defaults are the cheap mode:
+    every 10th step, in single precision.
+    With prefault, every page of the file is touched up front, so that the first write to a page during the run
+    doesn't cost a page fault (that is most of the logging time otherwise).
+    """
+    def __init__(self, filename, num_rockets, max_frames, stride=10, fields=DEFAULT_FIELDS, single_precision=True, prefault=True):
+        fleet_dtypes = dict(RocketFleet.fields, status=numpy.uint8)
+        self.fields = []
+        for name in fields:
+            if name not in fleet_dtypes:
+                raise ValueError("unknown trajectory field: " + name)
+            dtype = numpy.dtype(fleet_dtypes[name])
+            if single_precision:
+                dtype = numpy.dtype(SINGLE_PRECISION.get(dtype, dtype))
+            self.fields.append((name, dtype.newbyteorder("<")))
+        self.num_rockets, self.max_frames, self.stride = num_rockets, max_frames, stride
+        descriptors, steps_offset, offsets, size = _layout(self.fields, num_rockets, max_frames)
+        with open(filename, "wb") as outfile:
+            outfile.write(header_struct.pack(MAGIC, VERSION, len(self.fields), num_rockets, max_frames, stride, 0))
+            outfile.write(descriptors)
+            outfile.truncate(size)      # preallocated (sparse, where the file system supports that)
+        self.mapped = numpy.memmap(filename, numpy.uint8, "r+", shape=(size,))
+        if prefault:
+            self.mapped[steps_offset::mmap.PAGESIZE] = 0
+        self.num_frames_view = self.mapped[NUM_FRAMES_OFFSET:NUM_FRAMES_OFFSET+4].view("<u4")
+        self.steps = self.mapped[steps_offset:steps_offset + 8*max_frames].view("<i8")
+        self.arrays = _arrays(self.mapped, self.fields, offsets, num_rockets, max_frames)
+        self.copied_fields = [(name, array) for name, array in self.arrays.items() if name != "status"]
+        self.status = self.arrays.get("status")
+        self.status_scratch = numpy.empty(num_rockets, numpy.uint8)
+        self.num_frames = 0
+        self.calls = 0
+
+    def record(self, fleet, step=None):
+        """
+        Call after every step of the fleet; writes a frame every stride-th call, and returns whether it did.
+        step is the step number to store with the frame (default: the number of calls before this one).
+        """
+        if step is None:
+            step = self.calls
+        self.calls += 1
+        if (self.calls - 1) % self.stride:
+            return False
+        frame = self.num_frames
+        if frame >= self.max_frames:
+            raise ValueError("trajectory file is full")
+        count = min(fleet.count, self.num_rockets)
+        arrays = fleet.arrays
+        for name, array in self.copied_fields:
+            array[frame, :count] = arrays[name][:count]
+        if self.status is not None:
+            self._pack_status(fleet, self.status[frame, :count], self.status_scratch[:count])
+        self.steps[frame] = step
+        self.num_frames = frame + 1
+        self.num_frames_view[0] = self.num_frames
+        return True
+
+    @staticmethod
+    def _pack_status(fleet, row, scratch):
+        # the status bits, with in-place ufuncs so that no temporary arrays are allocated
+        count = len(row)
+        row[:] = fleet.arrays["crashed"][:count].view(numpy.uint8)
+        for name, bit in (("touchdown", 1), ("left_thruster_on", 2), ("right_thruster_on", 3)):
+            numpy.left_shift(fleet.arrays[name][:count].view(numpy.uint8), bit, out=scratch)
+            numpy.bitwise_or(row, scratch, out=row)
+
+    def close(self):
+        self.mapped.flush()
+        self.arrays = self.steps = self.num_frames_view = self.mapped = None
+
+
+class Trajectory(object):
+    """
+    Reads a trajectory file without loading it: field() gives a memory-mapped (frames, rockets) array,
+    read() copies out the part for some rockets and a step range.
+    """
+    def __init__(self, filename):
+        with open(filename, "rb") as infile:
+            header = infile.read(header_struct.size)
+            magic, version, num_fields, self.num_rockets, self.max_frames, self.stride, self.num_frames = header_struct.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("not a trajectory file or unsupported version")
+            self.fields = []
+            for _ in range(num_fields):
+                name = infile.read(ord(infile.read(1))).decode("ascii")
+                dtype = numpy.dtype(infile.read(ord(infile.read(1))).decode("ascii"))
+                self.fields.append((name, dtype))
+        descriptors, steps_offset, offsets, size = _layout(self.fields, self.num_rockets, self.max_frames)
+        self.mapped = numpy.memmap(filename, numpy.uint8, "r", shape=(size,))
+        self.steps = self.mapped[steps_offset:steps_offset + 8*self.max_frames].view("<i8")[:self.num_frames]
+        self.arrays = _arrays(self.mapped, self.fields, offsets, self.num_rockets, self.max_frames)
+
+    @property
+    def field_names(self):
+        return [name for name, _ in self.fields]
+
+    def field(self, name):
+        """the recorded frames of the field, as a memory-mapped array of shape (frames, rockets)"""
+        return self.arrays[name][:self.num_frames]
+
+    def frames(self, start_step=None, stop_step=None):
+        """the slice of the frames with a step number in the range start_step:stop_step"""
+        start = 0 if start_step is None else int(numpy.searchsorted(self.steps, start_step))
+        stop = self.num_frames if stop_step is None else int(numpy.searchsorted(self.steps, stop_step))
+        return slice(start, stop)
+
+    def read(self, fields=None, rockets=slice(None), start_step=None, stop_step=None):
+        """
+        Copies the frames in the step range of the given rockets (an index, slice or index array) out of the file.
+        Returns the steps of those frames and a dict with an array per field (default: all fields).
+        """
+        frames = self.frames(start_step, stop_step)
+        data = {name: numpy.array(self.arrays[name][frames][:, rockets]) for name in (fields or self.field_names)}
+        return numpy.array(self.steps[frames]), data
+
+    def close(self):
+        self.arrays = self.steps = self.mapped = None
@@ -5,10 +5,75 @@ Copyright by Irmen de Jong (irmen@razorvine.net).
 Open source software license: MIT.
 """
 from __future__ import division
+import math
 import cmath
 
 
+class ExactRotation(object):
+    """
+    Rotates points over the exact angle. Interface shared with the quantized RotationTable.
+    """
+    steps = None
+
+    def rotor(self, angle):
+        return cmath.exp(angle*1j)
+
+    def rotated(self, vertices, pivot, angle, yscale=1.0):
+        """
+        rotate the (x,y) vertices around the (x,y) pivot, returns a list of complex numbers.
+        The y coordinates of the vertices are first scaled by yscale (the engine flame is sized by the throttle).
+        """
+        rotor = self.rotor(angle)
+        pivot = complex(*pivot)
+        return [rotor*(complex(x, y*yscale)-pivot)+pivot for x, y in vertices]
+
+
+class RotationTable(ExactRotation):
+    """
+    Quantized rotation: angles are rounded to the nearest of a number of steps over a full circle,
+    and the unit rotor for every step is precomputed. The rotated vertices are cached as well,
+    per vertex list and angle step, so rotating a template again only costs a lookup.
+    The vertex lists should be long-lived (such as the shapes on the Rocket class); at most capacity
+    rotated templates are kept, the oldest are dropped first. The yscale is applied after the lookup,
+    so any engine throttle shares the same cached flame.
+    The rotated vertices are equal to ExactRotation's (up to rounding) for angles that are exactly on a step.
+    It is opt-in (Rocket.rotation_table is None by default), because the win is small: the rotation is only a part
+    of Rocket.draw_calls(). performancetest_rotation.py measures it 1.1 to 1.3 times faster with the table,
+    whatever the number of steps; with 1024 steps the drawn points are off by at most 0.19 pixels.
+    """
+    def __init__(self, steps=1024, capacity=16384):
+        self.steps = steps
+        self.capacity = capacity
+        self.step_angle = 2*math.pi/steps
+        self.rotors = [cmath.exp(step*self.step_angle*1j) for step in range(steps)]
+        self.templates = {}
+
+    def bucket(self, angle):
+        return int(round(angle/self.step_angle)) % self.steps
+
+    def rotor(self, angle):
+        return self.rotors[self.bucket(angle)]
+
+    def rotated(self, vertices, pivot, angle, yscale=1.0):
+        bucket = self.bucket(angle)
+        entry = self.templates.get((id(vertices), bucket))
+        if entry is None or entry[0] is not vertices or entry[1] != pivot:
+            rotor = self.rotors[bucket]
+            complex_pivot = complex(*pivot)
+            # the rotated vertices, and for other y scales: the rotated x parts (around the pivot) and y parts
+            entry = (vertices, pivot, [rotor*(complex(*xy)-complex_pivot)+complex_pivot for xy in vertices],
+                     [rotor*(x-complex_pivot)+complex_pivot for x, _ in vertices], [rotor*y*1j for _, y in vertices])
+            if len(self.templates) >= self.capacity:
+                del self.templates[next(iter(self.templates))]
+            self.templates[id(vertices), bucket] = entry
+        if yscale == 1.0:
+            return entry[2]
+        return [x+y*yscale for x, y in zip(entry[3], entry[4])]
+
+
 class Vector2D(object):
+    __slots__ = ("vec",)
+
     def __init__(self, value):
         if type(value) is complex:
             self.vec = value
@@ -59,13 +124,13 @@ class Vector2D(object):
     def flipy(self):
         self.vec = self.vec.conjugate()
 
-    def rotate(self, angle):
-        self.vec *= cmath.exp(angle*1j)
+    def rotate(self, angle, table=None):
+        self.vec *= table.rotor(angle) if table else cmath.exp(angle*1j)
         return self
 
-    def rotate_around(self, xy, angle):
+    def rotate_around(self, xy, angle, table=None):
         point = complex(xy[0], xy[1])
-        self.vec = cmath.exp(angle*1j) * (self.vec-point) + point
+        self.vec = (table.rotor(angle) if table else cmath.exp(angle*1j)) * (self.vec-point) + point
         return self
 
     def __mul__(self, value):
@@ -78,6 +143,12 @@ class Vector2D(object):
     def __rmul__(self, other):
         return self.__mul__(other)
 
+    def __imul__(self, value):
+        if type(value) is Vector2D or type(value) is complex:
+            return self.__mul__(value)
+        self.vec *= value
+        return self
+
     def __add__(self, other):
         return Vector2D(self.vec + other.vec)
 